@@ -0,0 +1 @@
+splunk_correlation_search.py
\ No newline at end of file
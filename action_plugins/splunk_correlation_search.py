@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""
+Action plugin shared by the single object modules of this role, the other
+action plugins are symlinks to this file.
+
+Run through the normal module path, every item of a looped task builds and
+ships an AnsiballZ payload and starts a new Python interpreter, which costs a
+lot more than the REST call the module makes. With a persistent httpapi
+connection the module runs on the controller anyway, so this plugin runs it
+inside the worker process instead: the module source and its module_utils
+are imported once per worker and every loop item only pays for argument
+validation and the HTTP round trips, over one Connection to the httpapi
+socket that all the items share. The result goes through the same post
+processing _execute_module gives it.
+"""
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import io
+import json
+import os
+import sys
+
+from ansible.module_utils._text import to_bytes
+from ansible.module_utils.common._collections_compat import Sequence
+from ansible.module_utils.six import string_types
+from ansible.plugins.action import ActionBase
+
+import ansible.module_utils
+
+ROLE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+# Let the modules resolve ansible.module_utils.splunk to the role's copy
+if os.path.join(ROLE_DIR, 'module_utils') not in ansible.module_utils.__path__:
+    ansible.module_utils.__path__.append(os.path.join(ROLE_DIR, 'module_utils'))
+
+# Loaded module sources, kept for the life of the worker process
+_MODULES = {}
+
+
+def _load_module(name):
+    if name not in _MODULES:
+        path = os.path.join(ROLE_DIR, 'library', '{0}.py'.format(name))
+        try:
+            from importlib.util import spec_from_file_location, module_from_spec
+        except ImportError:
+            # Python 2
+            import imp
+            _MODULES[name] = imp.load_source('ansible_splunk_{0}'.format(name), path)
+        else:
+            spec = spec_from_file_location('ansible_splunk_{0}'.format(name), path)
+            module = module_from_spec(spec)
+            spec.loader.exec_module(module)
+            _MODULES[name] = module
+    return _MODULES[name]
+
+
+def _reset_warnings():
+    """
+    Forget the warnings and deprecations recorded by a module run. They are
+    kept at module level in ansible.module_utils.common.warnings, which
+    AnsibleModule expects to live for a single module run, and would
+    otherwise show up again in the result of every later loop item
+    """
+    try:
+        from ansible.module_utils.common import warnings
+    except ImportError:
+        return
+    for name in ('_global_warnings', '_global_deprecations'):
+        recorded = getattr(warnings, name, None)
+        if isinstance(recorded, dict):
+            recorded.clear()
+        elif isinstance(recorded, list):
+            del recorded[:]
+
+
+def _run_in_process(name, module_args):
+    """
+    Run the main() of a module of this role in this process and return what
+    it wrote to stdout, the arguments are handed over the same way AnsiballZ
+    would
+    """
+    from ansible.module_utils import basic
+
+    module = _load_module(name)
+
+    _reset_warnings()
+    basic._ANSIBLE_ARGS = to_bytes(json.dumps({'ANSIBLE_MODULE_ARGS': module_args}))
+    if hasattr(basic, '_ANSIBLE_PROFILE'):
+        basic._ANSIBLE_PROFILE = 'legacy'
+
+    out = io.BytesIO() if sys.version_info[0] == 2 else io.StringIO()
+    stdout = sys.stdout
+    sys.stdout = out
+    try:
+        module.main()
+    except SystemExit:
+        pass
+    finally:
+        sys.stdout = stdout
+        basic._ANSIBLE_ARGS = None
+        _reset_warnings()
+
+    return out.getvalue()
+
+
+class ActionModule(ActionBase):
+
+    def run(self, tmp=None, task_vars=None):
+        if task_vars is None:
+            task_vars = dict()
+
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp  # tmp no longer has any effect
+
+        module_name = self._task.action.split('.')[-1]
+        module_args = self._task.args.copy()
+
+        self._update_module_args(module_name, module_args, task_vars)
+
+        # Without a persistent connection socket or the module source at hand
+        # there is nothing to gain, run the module the usual way
+        if not module_args.get('_ansible_socket') \
+                or not os.path.exists(os.path.join(ROLE_DIR, 'library', '{0}.py'.format(module_name))):
+            result.update(self._execute_module(module_name=module_name, module_args=self._task.args.copy(), task_vars=task_vars))
+            return result
+
+        result.update(self._module_result(_run_in_process(module_name, module_args)))
+        return result
+
+    def _module_result(self, stdout):
+        """
+        Parse the output of a module run in process into its result and clean
+        it up the way _execute_module does
+        """
+        from ansible.vars.clean import remove_internal_keys
+
+        res = {'rc': 0, 'stdout': stdout, 'stderr': ''}
+        try:
+            # Ansible 2.19 and later decode the result by serialization
+            # profile, the modules are run with the legacy one
+            data = self._parse_returned_data(res, 'legacy')
+        except TypeError:
+            data = self._parse_returned_data(res)
+
+        data.pop('_ansible_suppress_tmpdir_delete', None)
+        if 'results' in data and (not isinstance(data['results'], Sequence) or isinstance(data['results'], string_types)):
+            data['ansible_module_results'] = data.pop('results')
+        remove_internal_keys(data)
+
+        for key in ('stdout', 'stderr'):
+            if key in data and '{0}_lines'.format(key) not in data:
+                data['{0}_lines'.format(key)] = (data[key] or u'').splitlines()
+        return data
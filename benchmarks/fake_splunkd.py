@@ -0,0 +1,356 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""
+A local stand-in for the parts of the splunkd REST API the modules use: the
+ES saved/searches collection and the monitor, tcp and udp data inputs. Like
+splunkd it keeps udp inputs in a single collection.
+
+Entries are kept in memory, collections honor output_mode=json, offset,
+count and f= field filters, missing entries answer with a 404 "Object not
+found" body and every request can be slowed down by a fixed latency. The
+server counts requests and bytes so benchmarks can report them.
+
+With a capacity set, requests beyond that many in flight are turned away
+with a 503 the way a busy splunkd does.
+
+Given a search head cluster layout it answers the shcluster status and
+member info endpoints as that member, otherwise it is a standalone search
+head.
+
+KV store collections can be created, read with an equality or $or query,
+written with batch_save and have documents deleted by key. Like splunkd, a
+batch_save not sent as application/json is turned away.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+from ansible.module_utils.six.moves import BaseHTTPServer, socketserver
+from ansible.module_utils.six.moves.urllib.parse import urlsplit, parse_qs, unquote_plus
+
+import fnmatch
+import json
+import re
+import threading
+import time
+
+
+COLLECTIONS = [
+    'servicesNS/nobody/SplunkEnterpriseSecuritySuite/saved/searches',
+    'servicesNS/nobody/search/data/inputs/monitor',
+    'servicesNS/nobody/search/data/inputs/tcp/raw',
+    'servicesNS/nobody/search/data/inputs/tcp/cooked',
+    'servicesNS/nobody/search/data/inputs/udp',
+]
+
+# A real saved search entry carries a few hundred content keys, pad entries
+# so response sizes are in the same ballpark
+PADDING_KEYS = 200
+
+KVSTORE_PATH = re.compile(r'^servicesNS/[^/]+/[^/]+/storage/collections/(config|data)(?:/([^/]+))?(?:/([^/]+))?$')
+
+
+class FakeSplunkd(object):
+    """
+    In memory state of the fake splunkd, shared by the request handlers
+    """
+
+    def __init__(self, latency=0.0, padding_keys=PADDING_KEYS, capacity=0):
+        self.latency = latency
+        self.padding_keys = padding_keys
+        self.capacity = capacity
+        self.inflight = 0
+        self.lock = threading.Lock()
+        self.collections = dict((path, {}) for path in COLLECTIONS)
+        self.kvstore = {}
+        # (label of this member, label of the captain, labels of every member)
+        self.shcluster = None
+        self.reset_counters()
+
+    def reset_counters(self):
+        with self.lock:
+            self.requests = 0
+            self.bytes_in = 0
+            self.bytes_out = 0
+            self.methods = {}
+            self.busy = 0
+            self.peak_inflight = 0
+
+    def counters(self):
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'methods': dict(self.methods),
+                'busy': self.busy,
+                'peak_inflight': self.peak_inflight,
+            }
+
+    def clear(self):
+        with self.lock:
+            for path in self.collections:
+                self.collections[path] = {}
+            self.kvstore = {}
+
+    def seed(self, collection, name, content):
+        """
+        Put an entry straight into a collection without counting a request
+        """
+        with self.lock:
+            self._store(collection, name, content)
+
+    def _store(self, collection, name, content):
+        entry = self.collections[collection].get(name)
+        if entry is None:
+            padding = dict(('padding.key{0}'.format(i), 'value{0}'.format(i)) for i in range(self.padding_keys))
+            entry = {'name': name, 'content': padding}
+            self.collections[collection][name] = entry
+        entry['content'].update(content)
+        entry['updated'] = '{0:.6f}'.format(time.time())
+
+    def _render(self, collection, entry, fields):
+        content = entry['content']
+        if fields:
+            content = dict(
+                (key, value) for key, value in content.items()
+                if any(fnmatch.fnmatchcase(key, field) for field in fields)
+            )
+        return {
+            'name': entry['name'],
+            'id': '/{0}/{1}'.format(collection, entry['name']),
+            'updated': entry['updated'],
+            'author': 'nobody',
+            'acl': {'app': 'search', 'owner': 'nobody', 'sharing': 'global', 'perms': {'read': ['*'], 'write': ['admin']}},
+            'links': {'alternate': '/{0}/{1}'.format(collection, entry['name']), 'edit': '', 'remove': ''},
+            'content': content,
+        }
+
+    def _locate(self, path):
+        """
+        Split a request path into its collection and entry name
+        """
+        path = path.strip('/')
+        if path in self.collections:
+            return path, None
+        collection, _, name = path.rpartition('/')
+        if collection in self.collections:
+            return collection, unquote_plus(name)
+        return None, None
+
+    def _matches(self, document, query):
+        if '$or' in query:
+            return any(self._matches(document, q) for q in query['$or'])
+        return all(document.get(key) == value for key, value in query.items())
+
+    def handle_kvstore(self, method, match, query, body, content_type):
+        """
+        Answer a KV store request, the caller holds the lock
+        """
+        endpoint, collection, action = match.groups()
+        if endpoint == 'config':
+            if method == 'POST' and collection is None:
+                name = parse_qs(body).get('name', [''])[0]
+                if name in self.kvstore:
+                    return 409, {'messages': [{'type': 'ERROR', 'text': 'An object with name={0} already exists'.format(name)}]}
+                self.kvstore[name] = {}
+                return 201, {'entry': [{'name': name, 'content': {}}]}
+            return 405, {'messages': [{'type': 'ERROR', 'text': 'Method not allowed'}]}
+
+        collection = unquote_plus(collection or '')
+        if collection not in self.kvstore:
+            return 404, {'messages': [{'type': 'ERROR', 'text': 'Collection: {0} does not exist'.format(collection)}]}
+        documents = self.kvstore[collection]
+
+        if method == 'GET' and action is None:
+            filters = json.loads(query['query'][0]) if 'query' in query else {}
+            return 200, [document for key, document in sorted(documents.items()) if self._matches(document, filters)]
+        if method == 'POST' and action == 'batch_save':
+            if (content_type or '').split(';')[0].strip() != 'application/json':
+                return 400, {'messages': [{'type': 'ERROR', 'text': 'Content-Type must be application/json'}]}
+            keys = []
+            for document in json.loads(body):
+                documents[document['_key']] = document
+                keys.append(document['_key'])
+            return 200, keys
+        if method == 'DELETE' and action is not None:
+            documents.pop(unquote_plus(action), None)
+            return 200, {}
+        return 405, {'messages': [{'type': 'ERROR', 'text': 'Method not allowed'}]}
+
+    def handle_shcluster(self, path):
+        """
+        Answer the shcluster status and member info endpoints
+        """
+        if self.shcluster is None:
+            return 503, {'messages': [{'type': 'ERROR', 'text': 'Search head clustering is not enabled on this node'}]}
+        label, captain, members = self.shcluster
+
+        def uri(member):
+            return 'https://{0}:8089'.format(member)
+
+        if path == 'services/shcluster/status':
+            content = {
+                'captain': {'label': captain, 'mgmt_uri': uri(captain), 'dynamic_captain': True},
+                'peers': dict(
+                    ('guid-{0}'.format(member), {'label': member, 'mgmt_uri': uri(member), 'status': 'Up'})
+                    for member in members
+                ),
+            }
+        elif path == 'services/shcluster/member/info':
+            content = {'label': label, 'mgmt_uri': uri(label), 'status': 'Up'}
+        else:
+            return 404, {'messages': [{'type': 'ERROR', 'text': 'Not Found'}]}
+        return 200, {'entry': [{'name': path.rpartition('/')[2], 'content': content}]}
+
+    def handle(self, method, raw_path, body, content_type='application/x-www-form-urlencoded'):
+        """
+        Answer a request, returning the status code and the json body
+        """
+        url = urlsplit(raw_path)
+        query = parse_qs(url.query)
+        fields = query.get('f', [])
+        collection, name = self._locate(url.path)
+
+        if url.path.strip('/').startswith('services/shcluster/'):
+            return self.handle_shcluster(url.path.strip('/'))
+
+        kvstore = KVSTORE_PATH.match(url.path.strip('/'))
+        if kvstore:
+            with self.lock:
+                return self.handle_kvstore(method, kvstore, query, body, content_type)
+
+        with self.lock:
+            if collection is None:
+                return 404, {'messages': [{'type': 'ERROR', 'text': 'Not Found'}]}
+
+            entries = self.collections[collection]
+
+            if name is None and method == 'GET':
+                offset = int(query.get('offset', ['0'])[0])
+                count = int(query.get('count', ['30'])[0])
+                names = sorted(entries)
+                page = names[offset:] if count == 0 else names[offset:offset + count]
+                return 200, {
+                    'entry': [self._render(collection, entries[n], fields) for n in page],
+                    'paging': {'total': len(names), 'perPage': count, 'offset': offset},
+                }
+
+            if name is None and method == 'POST':
+                data = dict((key, values[-1]) for key, values in parse_qs(body, keep_blank_values=True).items())
+                new_name = data.pop('name', None)
+                if not new_name:
+                    return 400, {'messages': [{'type': 'ERROR', 'text': 'name is required'}]}
+                if new_name in entries:
+                    return 409, {'messages': [{'type': 'ERROR', 'text': 'An object with name={0} already exists'.format(new_name)}]}
+                self._store(collection, new_name, data)
+                return 201, {'entry': [self._render(collection, entries[new_name], fields)]}
+
+            if name not in entries:
+                return 404, {'messages': [{'type': 'ERROR', 'text': 'Object not found'}]}
+
+            if method == 'GET':
+                return 200, {'entry': [self._render(collection, entries[name], fields)]}
+            if method == 'POST':
+                data = dict((key, values[-1]) for key, values in parse_qs(body, keep_blank_values=True).items())
+                self._store(collection, name, data)
+                return 200, {'entry': [self._render(collection, entries[name], fields)]}
+            if method == 'DELETE':
+                del entries[name]
+                return 200, {'entry': []}
+
+        return 405, {'messages': [{'type': 'ERROR', 'text': 'Method not allowed'}]}
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _serve(self, method):
+        splunkd = self.server.splunkd
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else ''
+
+        with splunkd.lock:
+            splunkd.inflight += 1
+            splunkd.peak_inflight = max(splunkd.peak_inflight, splunkd.inflight)
+            busy = splunkd.capacity and splunkd.inflight > splunkd.capacity
+        try:
+            if splunkd.latency:
+                time.sleep(splunkd.latency)
+            if busy:
+                code, response = 503, {'messages': [{'type': 'ERROR', 'text': 'Server is busy, try again later'}]}
+            else:
+                code, response = splunkd.handle(method, self.path, body, self.headers.get('Content-Type'))
+        finally:
+            with splunkd.lock:
+                splunkd.inflight -= 1
+        if isinstance(response, dict) and 'entry' in response:
+            # Like splunkd, the feed carries the server time it was rendered at
+            response['updated'] = '{0:.6f}'.format(time.time())
+        payload = json.dumps(response).encode('utf-8')
+
+        with splunkd.lock:
+            splunkd.requests += 1
+            splunkd.bytes_in += length
+            splunkd.bytes_out += len(payload)
+            splunkd.methods[method] = splunkd.methods.get(method, 0) + 1
+            if busy:
+                splunkd.busy += 1
+
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self._serve('GET')
+
+    def do_POST(self):
+        self._serve('POST')
+
+    def do_DELETE(self):
+        self._serve('DELETE')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _ThreadingServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+def serve(splunkd, host='127.0.0.1', port=0):
+    """
+    Start serving splunkd from a background thread, returns the http server,
+    whose server_address holds the port picked when port is 0
+    """
+    server = _ThreadingServer((host, port), _Handler)
+    server.splunkd = splunkd
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a stand-in splunkd REST server')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every request')
+    parser.add_argument('--capacity', type=int, default=0, help='requests in flight before answering 503, 0 for no limit')
+    args = parser.parse_args()
+
+    server = serve(FakeSplunkd(latency=args.latency, capacity=args.capacity), port=args.port)
+    print('fake splunkd listening on http://127.0.0.1:{0}'.format(server.server_address[1]))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,141 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""
+Report the startup cost of every module of the role: how long importing it
+takes in a fresh interpreter, on top of ansible.module_utils.basic which
+every module pays for anyway, and the size of the AnsiballZ payload Ansible
+builds for it along with the number of files zipped into it.
+
+    python benchmarks/module_startup.py --repeat 5 --json startup.json
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import base64
+import glob
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import zipfile
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROLE_DIR = os.path.dirname(BENCHMARK_DIR)
+
+# Run in a fresh interpreter, prints the seconds spent importing basic and
+# then the module itself
+IMPORT_TIMER = '''
+import sys, time
+start = time.time()
+import ansible.module_utils.basic
+basic_done = time.time()
+import ansible.module_utils
+ansible.module_utils.__path__.append({module_utils!r})
+sys.path.insert(0, {library!r})
+import {module}
+print(basic_done - start, time.time() - basic_done)
+'''
+
+
+def import_time(module, repeat):
+    """
+    Best of repeat runs of the time to import basic and the module on top
+    """
+    best = None
+    for i in range(repeat):
+        code = IMPORT_TIMER.format(
+            module_utils=os.path.join(ROLE_DIR, 'module_utils'),
+            library=os.path.join(ROLE_DIR, 'library'),
+            module=module,
+        )
+        output = subprocess.check_output([sys.executable, '-c', code])
+        basic, own = [float(value) for value in output.decode('utf-8').split()]
+        if best is None or own < best[1]:
+            best = (basic, own)
+    return best
+
+
+def setup_plugin_loader():
+    from ansible.plugins.loader import module_utils_loader
+
+    try:
+        from ansible.plugins.loader import init_plugin_loader
+        init_plugin_loader()
+    except ImportError:
+        # Older Ansible sets its plugin loaders up on import
+        pass
+    module_utils_loader.add_directory(os.path.join(ROLE_DIR, 'module_utils'))
+
+
+def payload(module):
+    """
+    Size of the AnsiballZ payload of a module and the files zipped into it
+    """
+    from ansible.executor import module_common
+    from ansible.parsing.dataloader import DataLoader
+    from ansible.template import Templar
+
+    kwargs = dict(
+        module_name=module,
+        module_path=os.path.join(ROLE_DIR, 'library', '{0}.py'.format(module)),
+        module_args={},
+        templar=Templar(loader=DataLoader()),
+        task_vars={'ansible_python_interpreter': sys.executable},
+    )
+    built = module_common.modify_module(**kwargs)
+    data = getattr(built, 'b_module_data', None)
+    if data is None:
+        data = built[0]
+
+    # The zip is embedded base64 encoded, the wrapper around it changes
+    # between Ansible versions
+    blob = max(re.findall(br'[A-Za-z0-9+/=]{1024,}', data), key=len)
+    files = zipfile.ZipFile(io.BytesIO(base64.b64decode(blob))).namelist()
+    return len(data), sorted(name for name in files if not name.endswith('/'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report import time and AnsiballZ payload size of the role modules')
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters per module, the best run is kept')
+    parser.add_argument('--modules', nargs='+', default=None, help='modules to measure, all of them by default')
+    parser.add_argument('--files', action='store_true', help='also list the files zipped into each payload')
+    parser.add_argument('--json', dest='json_path', default=None, help='also write the results as json to this path')
+    args = parser.parse_args()
+
+    modules = args.modules or sorted(
+        os.path.basename(path)[:-3] for path in glob.glob(os.path.join(ROLE_DIR, 'library', '*.py'))
+    )
+
+    header = '{0:<40} {1:>10} {2:>12} {3:>13} {4:>6}'.format('module', 'basic (ms)', 'module (ms)', 'payload (B)', 'files')
+    print(header)
+    print('-' * len(header))
+
+    setup_plugin_loader()
+
+    results = []
+    for module in modules:
+        basic, own = import_time(module, args.repeat)
+        size, files = payload(module)
+        result = dict(module=module, basic_import=round(basic, 4), module_import=round(own, 4),
+                      payload_bytes=size, payload_files=files)
+        results.append(result)
+        print('{0:<40} {1:>10.1f} {2:>12.1f} {3:>13} {4:>6}'.format(module, basic * 1000, own * 1000, size, len(files)))
+        if args.files:
+            for name in files:
+                print('    {0}'.format(name))
+        sys.stdout.flush()
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""
+Run the role's modules against the fake splunkd and report, per module and
+object count, the wall time, number of requests and bytes transferred.
+
+Modules are run in-process, the way ansible-playbook would run them over an
+httpapi connection, with the persistent connection replaced by a small HTTP
+client talking to the fake splunkd. The single object modules are run once
+per object, as a looped task would, the list modules once per scenario.
+
+The stand-in sends one request at a time, as ansible-connection does, and
+hands out the host and credentials list modules open their own sessions to
+splunkd with. It does not pay for the JSON-RPC round trip over the
+ansible-connection socket or for starting a module process, so the figures
+are best cases: the wall times a lower bound of what a playbook sees, the
+request counts and bytes exact.
+
+    python benchmarks/run_benchmarks.py --sizes 10 1000 10000 --latency 0.002
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import importlib
+import io
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROLE_DIR = os.path.dirname(BENCHMARK_DIR)
+
+# Make the role's module_utils and library importable the same way Ansible does
+import ansible.module_utils
+ansible.module_utils.__path__.append(os.path.join(ROLE_DIR, 'module_utils'))
+sys.path.insert(0, os.path.join(ROLE_DIR, 'library'))
+sys.path.insert(0, BENCHMARK_DIR)
+
+from ansible.module_utils import basic
+from ansible.module_utils._text import to_bytes, to_text
+from ansible.module_utils.six.moves import http_client
+
+import ansible.module_utils.splunk as splunk
+
+from fake_splunkd import FakeSplunkd, serve
+
+
+class HttpConnection(object):
+    """
+    Plays the part of the httpapi persistent connection: send_request returns
+    the status code and the decoded json body, like the splunk httpapi plugin.
+    Like ansible-connection it holds a single HTTP connection and answers one
+    request at a time, whatever the number of threads sending them
+    """
+
+    address = None
+    _lock = threading.Lock()
+    _http = None
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+
+    def get_option(self, name):
+        options = {
+            'host': self.address[0],
+            'port': self.address[1],
+            'remote_user': 'admin',
+            'password': 'changeme',
+            'use_ssl': False,
+            'validate_certs': False,
+        }
+        return options.get(name)
+
+    def _conn(self):
+        if HttpConnection._http is None:
+            conn = http_client.HTTPConnection(*self.address)
+            conn.connect()
+            # Headers and body go out in separate writes, don't let Nagle
+            # hold the body back waiting for a delayed ack
+            conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            HttpConnection._http = conn
+        return HttpConnection._http
+
+    def send_request(self, method, path, payload=None, headers=None):
+        with self._lock:
+            return self._send_request(method, path, payload, headers)
+
+    def _send_request(self, method, path, payload=None, headers=None):
+        if '?' in path:
+            path = '{0}&output_mode=json'.format(path)
+        else:
+            path = '{0}?output_mode=json'.format(path)
+
+        headers = headers or {'Content-Type': 'application/x-www-form-urlencoded'}
+        body = to_bytes(payload) if payload else None
+        conn = self._conn()
+        try:
+            conn.request(method, '/' + path.lstrip('/'), body=body, headers=headers)
+            response = conn.getresponse()
+        except (http_client.HTTPException, IOError):
+            # Stale keep-alive socket, reconnect once
+            conn.close()
+            HttpConnection._http = None
+            conn = self._conn()
+            conn.request(method, '/' + path.lstrip('/'), body=body, headers=headers)
+            response = conn.getresponse()
+
+        data = to_text(response.read())
+        try:
+            return response.status, json.loads(data)
+        except ValueError:
+            return response.status, data
+
+
+def run_module(name, args, check_mode=False):
+    """
+    Run a module's main() in-process and return its json result
+    """
+    args = dict(args)
+    args['_ansible_check_mode'] = check_mode
+    args['_ansible_remote_tmp'] = '/tmp'
+    args['_ansible_keep_remote_files'] = False
+    if hasattr(basic, '_ANSIBLE_PROFILE'):
+        basic._ANSIBLE_PROFILE = 'legacy'
+    basic._ANSIBLE_ARGS = to_bytes(json.dumps({'ANSIBLE_MODULE_ARGS': args}))
+    basic.AnsibleModule._socket_path = '/dev/null'
+
+    module = importlib.import_module(name)
+    out = io.BytesIO() if sys.version_info[0] == 2 else io.StringIO()
+    stdout = sys.stdout
+    sys.stdout = out
+    try:
+        module.main()
+    except SystemExit:
+        pass
+    finally:
+        sys.stdout = stdout
+    return json.loads(out.getvalue())
+
+
+def correlation_searches(count, changed=0):
+    return [
+        dict(
+            name='bench correlation search {0}'.format(i),
+            description='changed description' if i < changed else 'benchmark correlation search',
+            search='index=main sourcetype=bench{0} | stats count by host'.format(i),
+            cron_schedule='*/5 * * * *',
+            state='present',
+        )
+        for i in range(count)
+    ]
+
+
+def monitor_inputs(count, changed=0):
+    return [
+        dict(
+            name='/var/log/bench/{0}.log'.format(i),
+            index='changed' if i < changed else 'main',
+            sourcetype='bench',
+            state='present',
+        )
+        for i in range(count)
+    ]
+
+
+def network_inputs(count, changed=0):
+    return [
+        dict(
+            name=str(10000 + i),
+            protocol='tcp',
+            datatype='raw',
+            index='changed' if i < changed else 'network',
+            sourcetype='bench',
+            state='present',
+        )
+        for i in range(count)
+    ]
+
+
+# module name, list option (None for single object modules), item factory
+MODULES = [
+    ('splunk_correlation_search', None, correlation_searches),
+    ('splunk_correlation_searches', 'searches', correlation_searches),
+    ('splunk_data_input_monitor', None, monitor_inputs),
+    ('splunk_data_input_monitors', 'inputs', monitor_inputs),
+    ('splunk_data_input_network', None, network_inputs),
+    ('splunk_data_input_networks', 'inputs', network_inputs),
+]
+
+# scenario name, fraction of the objects whose desired state differs
+SCENARIOS = [
+    ('create', None),
+    ('converged', 0),
+    ('update_10pct', 0.1),
+]
+
+
+def run_scenario(module, option, factory, count, changed, extra_args):
+    """
+    Run one module over count objects, returning the failures seen
+    """
+    items = factory(count, changed)
+    failures = 0
+    if option is None:
+        for item in items:
+            args = dict(item)
+            args.update(extra_args)
+            if run_module(module, args).get('failed'):
+                failures += 1
+    else:
+        args = {option: items}
+        args.update(extra_args)
+        if run_module(module, args).get('failed'):
+            failures += 1
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Splunk ES role modules against a fake splunkd')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000],
+                        help='object counts to benchmark')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds the fake splunkd waits before answering each request')
+    parser.add_argument('--padding-keys', type=int, default=200,
+                        help='extra content keys stored on every entry to mimic real entry sizes')
+    parser.add_argument('--capacity', type=int, default=0,
+                        help='requests the fake splunkd takes at once before answering 503, 0 for no limit')
+    parser.add_argument('--modules', nargs='+', default=[m[0] for m in MODULES],
+                        help='modules to benchmark')
+    parser.add_argument('--max-loop', type=int, default=None,
+                        help='skip single object modules for sizes above this count')
+    parser.add_argument('--module-args', default='{}',
+                        help='json dict of extra module arguments, e.g. {"request_concurrency": 8}')
+    parser.add_argument('--json', dest='json_path', default=None,
+                        help='also write the results as json to this path')
+    args = parser.parse_args()
+
+    extra_args = json.loads(args.module_args)
+
+    splunkd = FakeSplunkd(latency=args.latency, padding_keys=args.padding_keys, capacity=args.capacity)
+    server = serve(splunkd)
+    HttpConnection.address = server.server_address
+    splunk.Connection = HttpConnection
+
+    results = []
+    header = '{0:<30} {1:>7} {2:<13} {3:>10} {4:>9} {5:>6} {6:>13} {7:>13} {8:>6}'.format(
+        'module', 'objects', 'scenario', 'wall (s)', 'requests', 'busy', 'bytes sent', 'bytes recv', 'failed')
+    print('Best case figures: the ansible-connection JSON-RPC hop and module startup are not measured.')
+    print(header)
+    print('-' * len(header))
+
+    for count in args.sizes:
+        for module, option, factory in MODULES:
+            if module not in args.modules:
+                continue
+            if option is None and args.max_loop is not None and count > args.max_loop:
+                continue
+
+            splunkd.clear()
+            for scenario, fraction in SCENARIOS:
+                if fraction is None:
+                    changed = 0
+                else:
+                    changed = int(count * fraction)
+
+                splunkd.reset_counters()
+                start = time.time()
+                failures = run_scenario(module, option, factory, count, changed, extra_args)
+                wall = time.time() - start
+                counters = splunkd.counters()
+
+                result = dict(
+                    module=module,
+                    objects=count,
+                    scenario=scenario,
+                    wall_time=round(wall, 4),
+                    requests=counters['requests'],
+                    methods=counters['methods'],
+                    busy=counters['busy'],
+                    bytes_sent=counters['bytes_in'],
+                    bytes_received=counters['bytes_out'],
+                    failed=failures,
+                )
+                results.append(result)
+                print('{module:<30} {objects:>7} {scenario:<13} {wall_time:>10.3f} {requests:>9} {busy:>6} '
+                      '{bytes_sent:>13} {bytes_received:>13} {failed:>6}'.format(**result))
+                sys.stdout.flush()
+
+    server.shutdown()
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(dict(latency=args.latency, padding_keys=args.padding_keys, capacity=args.capacity,
+                           best_case=True, results=results), f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
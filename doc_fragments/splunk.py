@@ -0,0 +1,193 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+
+class ModuleDocFragment(object):
+    # Options of the REST requests, shared by every module
+    DOCUMENTATION = r'''
+options:
+  request_concurrency:
+    description:
+      - Maximum number of requests sent to splunkd at the same time when many objects are written in one pass.
+        The default sends every request through the httpapi connection plugin, one after the other.
+      - Above C(1) the requests go over HTTP(S) sessions of their own opened straight to splunkd, since
+        ansible-connection sends the requests of its socket one at a time. The sessions use basic authentication
+        with the host, port, user and password of the httpapi connection and honour its I(validate_certs),
+        I(ca_path), I(client_cert), I(client_key), I(ciphers) and I(use_proxy) options, with the proxy taken from
+        the C(https_proxy), C(http_proxy) and C(no_proxy) environment variables. Any other login the plugin does,
+        such as a session token, is not used. When the connection holds no user or password the requests still
+        go through the plugin one after the other.
+    type: int
+    required: false
+    default: 1
+  request_rate_limit:
+    description:
+      - Maximum number of requests per second sent to splunkd when many objects are written in one pass, C(0) means no limit.
+    type: float
+    required: false
+    default: 0
+  request_metrics:
+    description:
+      - Return a C(splunk_metrics) block with the number of REST requests made, their p50, p95 and total latency,
+        the failed requests and the bytes received, to tell where the time of a slow task goes.
+    type: bool
+    required: false
+    default: false
+  request_metrics_log:
+    description:
+      - Path of a JSON-lines file on the controller that gets one line per REST request, with its method, path,
+        status code, latency and response size, to follow REST cost across runs.
+    type: path
+    required: false
+  request_retries:
+    description:
+      - Number of times a request is sent again when splunkd answers busy (429 or 503). A request that hit a
+        connection error or a gateway timeout (502 or 504) is only sent again when doing so is harmless, which
+        excludes creating an object.
+      - When many objects are written in one pass, fewer requests are sent at the same time while splunkd is
+        busy, and more again once it recovers, up to I(request_concurrency).
+    type: int
+    required: false
+    default: 3
+  request_retry_delay:
+    description:
+      - Number of seconds to wait before the first retry of a request. The wait doubles with every retry, up to a
+        minute, and half of it is picked at random.
+      - A busy answer's C(Retry-After) header takes precedence, capped at a minute. Only the sessions opened for
+        I(request_concurrency) above 1 can read it, the httpapi plugin doesn't pass response headers on.
+    type: float
+    required: false
+    default: 1.0
+  host_request_rate_limit:
+    description:
+      - Maximum number of requests per second sent to the splunkd host by every task running on the controller at
+        the same time, whatever fork it runs in, C(0) means no limit.
+      - Tasks only count against each other when they all set it, use C(module_defaults) or group variables to set
+        it for every task that targets the same search head.
+    type: float
+    required: false
+    default: 0
+  host_request_concurrency:
+    description:
+      - Maximum number of requests in flight to the splunkd host from every task running on the controller at the
+        same time, whatever fork it runs in, C(0) means no limit.
+    type: int
+    required: false
+    default: 0
+  host_limits_dir:
+    description:
+      - Directory on the controller holding the lock files the tasks share to enforce I(host_request_rate_limit)
+        and I(host_request_concurrency). Defaults to C(ansible-splunk-limits) in the temporary directory.
+    type: path
+    required: false
+'''
+
+    # Options of the snapshot cache, for the modules reading REST collections
+    SNAPSHOT_CACHE = r'''
+options:
+  snapshot_cache_dir:
+    description:
+      - Directory on the controller to keep snapshots of Splunk REST collections in. When set, reads are served
+        from the snapshot and only the entries whose C(updated) timestamp changed are fetched again from splunkd.
+      - The snapshot cache is disabled when unset.
+    type: path
+    required: false
+  snapshot_cache_ttl:
+    description:
+      - Number of seconds a snapshot is used for. Every read lists the C(updated) timestamps of the collection
+        and only fetches the entries that changed, a snapshot older than this is read again in full.
+    type: int
+    required: false
+    default: 300
+  snapshot_cache_max_size:
+    description:
+      - Maximum size in megabytes of the snapshot cache directory, least recently used snapshots are evicted first.
+    type: int
+    required: false
+    default: 100
+'''
+
+    # Options of the module result, for the modules writing Splunk objects
+    RETURN_CONTENT = r'''
+options:
+  return_content:
+    description:
+      - How much of the Splunk objects to return in the module result.
+      - C(full) returns the complete REST responses as C(splunk_data).
+      - With C(changed_fields) and C(none) objects are read with a field filter, so splunkd only sends back the
+        fields the module compares.
+      - C(changed_fields) returns only the fields that differed as C(changed_fields), each with its C(before) and C(after) value.
+      - C(none) returns neither.
+    type: str
+    required: false
+    choices: [ "full", "changed_fields", "none" ]
+    default: "full"
+'''
+
+    # Options of search head cluster members, for the modules writing configuration that replicates
+    SHC_CAPTAIN_ONLY = r'''
+options:
+  shc_captain_only:
+    description:
+      - Only act when the host is the captain of its search head cluster, the task is skipped on the other members.
+        Configuration written on any member replicates to the others, so a task run against every member writes
+        once. Hosts that are not cluster members always act.
+    type: bool
+    required: false
+    default: false
+'''
+
+    # Options of the SPL lint, for the correlation search modules
+    SPL_LINT = r'''
+options:
+  spl_lint:
+    description:
+      - Inspect the SPL and schedule of the searches to deploy for known costly patterns before anything is sent
+        to Splunk. Findings are reported as warnings with C(warn), with C(fail) the task fails when any search has
+        a finding of warning or error severity, in check mode too.
+      - The rules are C(no-index) for a raw search naming no index or C(index=*), C(leading-wildcard) for terms
+        starting with a wildcard, C(transaction), C(join) and C(map) for those commands, C(tstats) for searches
+        C(tstats) could answer from indexed fields or data model summaries, C(realtime) for real-time dispatch
+        windows and C(wide-window) for a dispatch window of all time or more than six times the time between two
+        runs of I(cron_schedule). C(cron) notes a I(cron_schedule) that can't be read, the window is then not checked.
+      - The defaults of I(time_earliest) and I(cron_schedule), C(-24h) every five minutes, read each event 288 times
+        over and are reported by C(wide-window) too. Set I(time_earliest) to the interval plus the indexing lag of
+        the events, such as C(-10m), or add C(wide-window) to I(spl_lint_ignore) to keep them.
+    type: str
+    required: false
+    default: none
+    choices: ['none', 'warn', 'fail']
+  spl_lint_ignore:
+    description:
+      - Rules of I(spl_lint) to leave out.
+    type: list
+    elements: str
+    required: false
+    default: []
+'''
+
+    # Options of the list modules converging many objects in one pass
+    BULK_CHANGES = r'''
+options:
+  plan_file:
+    description:
+      - Path of a plan file on the controller. When set nothing is changed in Splunk, the operations needed are
+        written to this file instead, each with its exact payload, the fields it changes and the C(updated)
+        timestamp of the object it touches, for review and for M(splunk_apply_plan) to run later.
+    type: path
+    required: false
+  state_ledger:
+    description:
+      - Name of a KV store collection in the Splunk Enterprise Security app to keep a ledger of the managed objects in,
+        created when missing. It records the hash of the desired state last applied to each object and the C(updated)
+        timestamp the object got right after.
+      - A run reads the ledger and lists the C(updated) timestamps of the objects, then skips every object whose hash
+        and timestamp both still match without reading it, a fully converged run makes no other request.
+      - The ledger records are sent as JSON. Over the persistent connection that takes an httpapi plugin whose
+        C(send_request) accepts C(headers), with any other the ledger can't be saved and the task warns.
+    type: str
+    required: false
+'''
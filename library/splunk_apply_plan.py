@@ -0,0 +1,169 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'community'}
+
+
+DOCUMENTATION = '''
+---
+module: splunk_apply_plan
+short_description: Apply a plan of Splunk changes written by the list modules
+description:
+  - This module runs the operations of a plan file written by the I(plan_file) option of M(splunk_correlation_searches),
+    M(splunk_data_input_monitors) or M(splunk_data_input_networks).
+  - The objects the plan leaves alone are not read again. Each object the plan touches gets a cheap guard request
+    first, asking splunkd only for its C(updated) timestamp, so that objects changed since the plan was made
+    are not overwritten.
+version_added: "2.8"
+options:
+  plan_file:
+    description:
+      - Path of the plan file on the controller.
+    required: true
+    type: path
+  on_conflict:
+    description:
+      - What to do when objects changed in Splunk since the plan was made, or an object the plan creates already exists.
+      - C(fail) applies nothing and fails listing the conflicts.
+      - C(skip) applies the operations of the objects that did not change and reports the others as skipped.
+    type: str
+    required: false
+    choices: [ "fail", "skip" ]
+    default: "fail"
+
+extends_documentation_fragment:
+  - splunk
+  - splunk.shc_captain_only
+
+author: "Ansible Security Automation Team (https://github.com/ansible-security)"
+'''
+
+EXAMPLES = '''
+- name: plan the correlation search changes
+  splunk_correlation_searches:
+    searches: "{{ correlation_searches }}"
+    plan_file: "/tmp/correlation_searches.plan"
+
+- name: apply the reviewed plan
+  splunk_apply_plan:
+    plan_file: "/tmp/correlation_searches.plan"
+'''
+
+RETURN = '''
+applied:
+  description: Names of the objects whose operation was applied
+  returned: always
+  type: list
+skipped:
+  description: Names of the objects left alone because of a conflict, when I(on_conflict=skip)
+  returned: always
+  type: list
+conflicts:
+  description: Why each conflicting object was not applied, keyed by name
+  returned: always
+  type: dict
+  sample: {"Excessive Failed Logins": "updated changed from 2019-05-08T10:39:30-04:00 to 2019-05-09T08:12:01-04:00"}
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+
+from ansible.module_utils._text import to_text
+from ansible.module_utils.splunk import SplunkRequest, splunk_request_argspec
+
+import json
+
+
+def main():
+
+    argspec = dict(
+        plan_file=dict(required=True, type='path'),
+        on_conflict=dict(required=False, type='str', default='fail', choices=['fail', 'skip']),
+    )
+
+    argspec.update(splunk_request_argspec())
+    # Plans are run as they were written, there is no collection to snapshot
+    # or splunk_data to return
+    for key in ('snapshot_cache_dir', 'snapshot_cache_ttl', 'snapshot_cache_max_size', 'return_content'):
+        del argspec[key]
+
+    module = AnsibleModule(
+        argument_spec=argspec,
+        supports_check_mode=True
+    )
+
+    splunk_request = SplunkRequest(module)
+
+    try:
+        with open(module.params['plan_file'], 'r') as f:
+            plan = json.load(f)
+        operations = plan['operations']
+    except (IOError, OSError, ValueError, KeyError, TypeError) as e:
+        module.fail_json(msg="Unable to read plan file {0}: {1}".format(module.params['plan_file'], to_text(e)))
+
+    if plan.get('host') != splunk_request.host:
+        module.fail_json(msg="Plan file {0} was made for {1}, not {2}.".format(
+            module.params['plan_file'], plan.get('host'), splunk_request.host))
+
+    if not operations:
+        module.exit_json(changed=False, msg="Nothing to do.", applied=[], skipped=[], conflicts={},
+                         **splunk_request.metrics_content())
+
+    # Guard every touched object with a GET of its updated timestamp alone,
+    # the object an operation creates must still be missing
+    guards = [('GET', operation['entry_path'], None, ['updated']) for operation in operations]
+
+    conflicts = {}
+    for operation, guard in zip(operations, splunk_request.run_batch(guards)):
+        if guard['failed']:
+            conflicts[operation['name']] = guard['msg']
+            continue
+        entries = guard['response'].get('entry', []) if guard['response'] else []
+        current = entries[0].get('updated') if entries else None
+        if operation['updated'] is None and current is not None:
+            conflicts[operation['name']] = "already exists"
+        elif operation['updated'] is not None and current is None:
+            conflicts[operation['name']] = "no longer exists"
+        elif current != operation['updated']:
+            conflicts[operation['name']] = "updated changed from {0} to {1}".format(operation['updated'], current)
+
+    if conflicts and module.params['on_conflict'] == 'fail':
+        module.fail_json(msg="{0} objects changed since the plan was made, nothing was applied.".format(len(conflicts)),
+                         applied=[], skipped=sorted(conflicts), conflicts=conflicts, **splunk_request.metrics_content())
+
+    todo = [operation for operation in operations if operation['name'] not in conflicts]
+    applied = []
+    errors = {}
+    if todo and not module.check_mode:
+        writes = [(operation['method'], operation['path'], operation['payload']) for operation in todo]
+        for operation, result in zip(todo, splunk_request.run_batch(writes)):
+            if result['failed']:
+                errors[operation['name']] = result['msg']
+            else:
+                applied.append(operation['name'])
+    elif module.check_mode:
+        applied = [operation['name'] for operation in todo]
+
+    if errors:
+        module.fail_json(msg="{0} of {1} changes failed.".format(len(errors), len(todo)), errors=errors,
+                         applied=applied, skipped=sorted(conflicts), conflicts=conflicts,
+                         **splunk_request.metrics_content())
+
+    if module.check_mode:
+        msg = "A change would have been made if not in check mode."
+    else:
+        msg = "{0} applied, {1} skipped.".format(len(applied), len(conflicts))
+
+    module.exit_json(changed=bool(applied), msg=msg, applied=applied, skipped=sorted(conflicts),
+                     conflicts=conflicts, **splunk_request.metrics_content())
+
+if __name__ == '__main__':
+    main()
@@ -152,114 +152,200 @@ options:
     type: bool
     required: False
     default: False
+  notable:
+    description:
+      - Notable event adaptive response to attach to the correlation search, it takes the same options as
+        M(splunk_adaptive_response_notable_event) other than I(correlation_search_name) and I(state).
+      - The search and its notable action are compared and written together, costing one read and at most one write.
+    type: dict
+    required: False
+    suboptions:
+      name:
+        description:
+          - Name of notable event
+        required: true
+        type: str
+      description:
+        description:
+          - Description of the notable event, this will populate the description field for the web console
+        required: true
+        type: str
+      security_domain:
+        description:
+          - Splunk Security Domain
+        type: str
+        choices: [ "access", "endpoint", "network", "threat", "identity", "audit" ]
+        default: "threat"
+      severity:
+        description:
+          - Severity rating
+        type: str
+        choices: [ "informational", "low", "medium", "high", "critical", "unknown" ]
+        default: "high"
+      default_owner:
+        description:
+          - Default owner of the notable event, if unset it will default to Splunk System Defaults
+        type: str
+      default_status:
+        description:
+          - Default status of the notable event, if unset it will default to Splunk System Defaults
+        type: str
+        choices: [ "unassigned", "new", "in progress", "pending", "resolved", "closed", "" ]
+        default: ""
+      drill_down_name:
+        description:
+          - Name for drill down search, Supports variable substitution with fields from the matching event.
+        type: str
+      drill_down_search:
+        description:
+          - Drill down search, Supports variable substitution with fields from the matching event.
+        type: str
+      drill_down_earliest_offset:
+        description:
+          - 'Set the amount of time before the triggering event to search for related events. For example, 2h. Use "$info_min_time$" to set the drill-down time to match the earliest time of the search'
+        type: str
+        default: "$info_min_time$"
+      drill_down_latest_offset:
+        description:
+          - 'Set the amount of time after the triggering event to search for related events. For example, 1m. Use "$info_max_time$" to set the drill-down time to match the latest time of the search'
+        type: str
+        default: "$info_max_time$"
+      investigation_profiles:
+        description:
+          - Investigation profile to assiciate the notable event with.
+        type: str
+      next_steps:
+        description:
+          - List of adaptive responses that should be run next
+        type: list
+        default: []
+      recommended_actions:
+        description:
+          - List of adaptive responses that are recommended to be run next
+        type: list
+        default: []
+      asset_extraction:
+        description:
+          - list of assets to extract, select any one or many of the available choices
+        type: list
+        choices: [ "src", "dest", "dvc", "orig_host" ]
+        default: [ "src", "dest", "dvc", "orig_host" ]
+      identity_extraction:
+        description:
+          - list of identity fields to extract, select any one or many of the available choices
+        type: list
+        choices: [ "user", "src_user" ]
+        default: [ "user", "src_user" ]
+  fingerprint:
+    description:
+      - Keep a hash of the desired state of each correlation search in its C(action.ansible.param.fingerprint)
+        setting. The next run reads only that setting and skips the search when the hash matches and the search
+        was not updated since, the full comparison only happens when the desired state changed or the search
+        was changed outside of Ansible.
+      - The first run with this enabled, and the first run after a search was changed outside of Ansible,
+        write the fingerprint and report a change.
+      - A search skipped this way is returned as C(splunk_data) holding its fingerprint setting only.
+    type: bool
+    required: false
+    default: false
 
 NOTES:
   - The following options are not yet supported: throttle_window_duration, throttle_fields_to_group_by, and adaptive_response_actions
 
+extends_documentation_fragment:
+  - splunk
+  - splunk.snapshot_cache
+  - splunk.return_content
+  - splunk.shc_captain_only
+  - splunk.spl_lint
 
 author: "Ansible Security Automation Team (https://github.com/ansible-security)
 '''
 #FIXME - adaptive response action association is probaby going to need to be a separate module we stitch together in a role
 
 EXAMPLES = '''
+- name: correlation search with its notable event in a single write
+  splunk_correlation_search:
+    name: "Excessive Failed Logins"
+    description: "Excessive failed logins from a single source"
+    search: '| tstats count from datamodel=Authentication where Authentication.action=failure by Authentication.src'
+    state: "present"
+    notable:
+      name: "Excessive Failed Logins from $src$"
+      description: "A single source failed to log in too many times"
+      severity: "medium"
+      security_domain: "access"
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils._text import to_text
 
-from ansible.module_utils.urls import Request
 from ansible.module_utils.six.moves.urllib.parse import urlencode, quote_plus
-from ansible.module_utils.six.moves.urllib.error import HTTPError
-from ansible.module_utils.splunk import SplunkRequest, parse_splunk_args
-
-import copy
+from ansible.module_utils.splunk import SplunkRequest, diff_content, splunk_request_argspec, correlation_search_argspec, correlation_search_data, CORRELATION_SEARCH_FIELDS
+from ansible.module_utils.splunk import fingerprint, fingerprint_changes, fingerprint_matches, spl_lint_argspec, FINGERPRINT_FIELD
 
 def main():
 
-    argspec = dict(
-        name=dict(required=True, type='str'),
-        description=dict(required=True, type='str'),
-        state=dict(choices=['present', 'absent'], required=True),
-        search=dict(required=True, type='str'),
-        app=dict(type="str", required=False, default="SplunkEnterpriseSecuritySuite"),
-        ui_dispatch_context=dict(type="str", required=False),
-        time_earliest=dict(type="str", required=False, default="-24h"),
-        time_latest=dict(type="str", required=False, default="now"),
-        cron_schedule=dict(type="str", required=False, default="*/5 * * * *"),
-        scheduling=dict(type="str", required=False, default="real-time", choices=["real-time", "continuous"]),
-        schedule_window=dict(type="str", required=False, default="0"),
-        schedule_priority=dict(type="str", required=False, default="Default", choices=["Default", "Higher", "Highest"]),
-        trigger_alert_when=dict(type="str", required=False, default="number of events",
-                                choices=["number of events", "number of results", "number of hosts", "number of sources"]),
-        trigger_alert_when_condition=dict(type="str", required=False, default="greater than",
-                                choices=["greater than", "less than", "equal to", "not equal to", "drops by", "rises by"]),
-        trigger_alert_when_value=dict(type="str", required=False, default="10"),
-        throttle_window_duration=dict(type="str", required=False),
-        throttle_fields_to_group_by=dict(type="str", required=False),
-        suppress_alert=dict(type=bool, required=False, default=False),
-    )
+    argspec = correlation_search_argspec()
+    argspec['fingerprint'] = dict(type='bool', required=False, default=False)
+
+    argspec.update(splunk_request_argspec())
+    argspec.update(spl_lint_argspec())
 
     module = AnsibleModule(
         argument_spec=argspec,
         supports_check_mode=True
     )
 
+    # Lint the search before anything is sent to Splunk
+    if module.params['spl_lint'] != 'none':
+        from ansible.module_utils.splunk_spl import spl_lint_gate
+        spl_lint_gate(module, [module.params])
+
     splunk_request = SplunkRequest(
         module,
         headers={"Content-Type": "application/x-www-form-urlencoded"},
-        not_rest_data_keys=['state']
+        not_rest_data_keys=['state', 'fingerprint', 'spl_lint', 'spl_lint_ignore'],
+        fields=CORRELATION_SEARCH_FIELDS
     )
 
-    try:
-        query_dict = splunk_request.get_by_path(
-            'servicesNS/nobody/SplunkEnterpriseSecuritySuite/saved/searches/{0}'.format(
-                quote_plus(module.params['name'])
-            )
+    # The fingerprint alone tells if the correlation search is still in the
+    # state it was last written in, only then is the full entry skipped
+    stamp = None
+    if module.params['fingerprint'] and module.params['state'] == 'present':
+        digest = fingerprint(correlation_search_data(module.params))
+        stamp_dict = splunk_request.get_by_path(
+            'servicesNS/nobody/SplunkEnterpriseSecuritySuite/saved/searches/{0}'.format(quote_plus(module.params['name'])),
+            fields=[FINGERPRINT_FIELD]
         )
-    except HTTPError as e:
-        # the data monitor doesn't exist
-        query_dict = {}
-
+        if stamp_dict:
+            stamp = stamp_dict['entry'][0]
+            if fingerprint_matches(stamp, digest):
+                module.exit_json(changed=False, msg="Nothing to do.", **splunk_request.result_content(stamp_dict))
 
+    # An empty dict when the correlation search doesn't exist
+    query_dict = splunk_request.get_by_name(
+        'servicesNS/nobody/SplunkEnterpriseSecuritySuite/saved/searches',
+        module.params['name']
+    )
 
     # Have to custom craft the data here because they overload the saved searches
     # endpoint in the rest api and we want to hide the nuance from the user
-    request_post_data = {}
-    request_post_data['name'] = module.params['name']
-    request_post_data['action.correlationsearch.enabled'] = "1"
-    request_post_data['is_scheduled'] = True
-    request_post_data['dispatch.rt_backfill'] = True
-    request_post_data['action.correlationsearch.label'] = module.params['name']
-    request_post_data['description'] = module.params['description']
-    request_post_data['search'] = module.params['search']
-    request_post_data['request.ui_dispatch_app'] = module.params['app']
-    if module.params['ui_dispatch_context']:
-        request_post_data['request.ui_dispatch_context'] = module.params['ui_dispatch_context']
-    request_post_data['dispatch.earliest_time'] = module.params['time_earliest']
-    request_post_data['dispatch.latest_time'] = module.params['time_latest']
-    request_post_data['cron_schedule'] = module.params['cron_schedule']
-    if module.params['scheduling'] == 'real-time':
-        request_post_data['realtime_schedule'] = True
-    else:
-        request_post_data['realtime_schedule'] = False
-    request_post_data['schedule_window'] = module.params['schedule_window']
-    request_post_data['schedule_priority'] = module.params['schedule_priority'].lower()
-    request_post_data['alert_type'] = module.params['trigger_alert_when']
-    request_post_data['alert_comparator'] = module.params['trigger_alert_when_condition']
-    request_post_data['alert_threshold'] = module.params['trigger_alert_when_value']
-    request_post_data['alert.suppress'] = module.params['suppress_alert']
+    request_post_data = correlation_search_data(module.params, query_dict['entry'][0]['content'] if query_dict else None)
+    if module.params['fingerprint'] and module.params['state'] == 'present':
+        fingerprint_change = fingerprint_changes(stamp if query_dict else None, digest, splunk_request.server_time())
+        request_post_data[FINGERPRINT_FIELD] = fingerprint_change[FINGERPRINT_FIELD]['after']
 
     if module.params['state'] == 'present':
         if query_dict:
-            needs_change = False
-            for arg in request_post_data:
-                if arg in query_dict['entry'][0]['content']:
-                    if to_text(query_dict['entry'][0]['content'][arg]) != to_text(request_post_data[arg]):
-                        needs_change = True
+            changes = diff_content(query_dict['entry'][0]['content'], request_post_data)
+            if module.params['fingerprint']:
+                changes.update(fingerprint_change)
+            needs_change = bool(changes)
             if not needs_change:
-                module.exit_json(changed=False, msg="Nothing to do.", splunk_data=query_dict)
+                module.exit_json(changed=False, msg="Nothing to do.", **splunk_request.result_content(query_dict))
             if module.check_mode and needs_change:
-                module.exit_json(changed=True, msg="A change would have been made if not in check mode.", splunk_data=query_dict)
+                module.exit_json(changed=True, msg="A change would have been made if not in check mode.",
+                                 **splunk_request.result_content(query_dict, changes))
             if needs_change:
                 # FIXME - need to find a reasonable way to deal with action.correlationsearch.enabled
                 del request_post_data['name'] # If this is present, splunk assumes we're trying to create a new one wit the same name
@@ -267,18 +353,20 @@ def main():
                     'servicesNS/nobody/SplunkEnterpriseSecuritySuite/saved/searches/{0}'.format(quote_plus(module.params['name'])),
                         data=urlencode(request_post_data)
                 )
-                module.exit_json(changed=True, msg="{0} updated.", splunk_data=splunk_data)
+                module.exit_json(changed=True, msg="{0} updated.", **splunk_request.result_content(splunk_data, changes))
         else:
             # Create it
             splunk_data = splunk_request.create_update('servicesNS/nobody/SplunkEnterpriseSecuritySuite/saved/searches', data=urlencode(request_post_data))
-            module.exit_json(changed=True, msg="{0} created.", splunk_data=splunk_data)
+            module.exit_json(changed=True, msg="{0} created.",
+                             **splunk_request.result_content(splunk_data, diff_content(None, request_post_data)))
 
     if module.params['state'] == 'absent':
         if query_dict:
-            splunk_data = splunk_request.delete_by_path('services/saved/searches/{0}'.format(quote_plus(module.params['name'])))
-            module.exit_json(changed=True, msg="Deleted {0}.".format(module.params['name']), splunk_data=splunk_data)
+            splunk_data = splunk_request.delete_by_path('servicesNS/nobody/SplunkEnterpriseSecuritySuite/saved/searches/{0}'.format(quote_plus(module.params['name'])))
+            module.exit_json(changed=True, msg="Deleted {0}.".format(module.params['name']),
+                             **splunk_request.result_content(splunk_data, diff_content(query_dict['entry'][0]['content'], None)))
 
-    module.exit_json(changed=False, msg="Nothing to do.", splunk_data=query_dict)
+    module.exit_json(changed=False, msg="Nothing to do.", **splunk_request.result_content(query_dict))
 
 if __name__ == '__main__':
     main()
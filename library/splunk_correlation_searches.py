@@ -0,0 +1,492 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'community'}
+
+
+DOCUMENTATION = '''
+---
+module: splunk_correlation_searches
+short_description: Manage many Splunk Enterprise Security Correlation Searches at once
+description:
+  - This module allows for creation, deletion, and modification of a list of Splunk Enterprise Security Correlation Searches
+  - The saved searches collection is listed once and every search is compared in memory, only the searches
+    that need a change are written back to Splunk.
+version_added: "2.8"
+options:
+  searches:
+    description:
+      - List of correlation search definitions, each one takes the same options as M(splunk_correlation_search)
+    required: true
+    type: list
+    elements: dict
+    suboptions:
+      name:
+        description:
+          - Name of coorelation search
+        required: true
+        type: str
+      description:
+        description:
+          - Description of the coorelation search, this will populate the description field for the web console
+        required: true
+        type: str
+      state:
+        description:
+          - Add or remove the correlation search.
+        required: false
+        choices: [ "present", "absent" ]
+        default: "present"
+      search:
+        description:
+          - SPL search string
+        type: str
+        required: True
+      app:
+        description:
+          - Splunk app to associate the correlation seach with
+        type: str
+        default: "SplunkEnterpriseSecuritySuite"
+      ui_dispatch_context:
+        description:
+          - Set an app to use for links such as the drill-down search in a notable event.
+        type: str
+      time_earliest:
+        description:
+          - Earliest time using relative time modifiers.
+        type: str
+        default: "-24h"
+      time_latest:
+        description:
+          - Latest time using relative time modifiers.
+        type: str
+        default: "now"
+      cron_schedule:
+        description:
+          - Enter a cron-style schedule.
+        type: str
+        default: "*/5 * * * *"
+      scheduling:
+        description:
+          - Controls the way the scheduler computes the next execution time of a scheduled search.
+        type: str
+        default: "real-time"
+        choices: [ "real-time", "continuous" ]
+      schedule_window:
+        description:
+          - Let report run at any time within a window that opens at its scheduled run time.
+        type: str
+        default: "0"
+      schedule_priority:
+        description:
+          - Raise the scheduling priority of a report.
+        type: str
+        default: "Default"
+        choices: [ "Default", "Higher", "Highest" ]
+      trigger_alert_when:
+        description:
+          - What to trigger the alert on.
+        type: str
+        default: "number of events"
+        choices: [ "number of events", "number of results", "number of hosts", "number of sources" ]
+      trigger_alert_when_condition:
+        description:
+          - Conditional to pass to C(trigger_alert_when)
+        type: str
+        default: "greater than"
+        choices: [ "greater than", "less than", "equal to", "not equal to", "drops by", "rises by" ]
+      trigger_alert_when_value:
+        description:
+          - Value to pass to C(trigger_alert_when)
+        type: str
+        default: "10"
+      throttle_window_duration:
+        description:
+          - "How much time to ignore other events that match the field values specified in Fields to group by."
+        type: str
+      throttle_fields_to_group_by:
+        description:
+          - "Type the fields to consider for matching events for throttling."
+        type: str
+      suppress_alert:
+        description:
+          - "To suppress alerts from this correlation search or not"
+        type: bool
+        default: False
+      notable:
+        description:
+          - Notable event adaptive response to attach to the correlation search, it takes the same options as
+            M(splunk_adaptive_response_notable_event) other than I(correlation_search_name) and I(state).
+          - The search and its notable action are compared and written together, costing one read and at most one write.
+        type: dict
+        required: False
+        suboptions:
+          name:
+            description:
+              - Name of notable event
+            required: true
+            type: str
+          description:
+            description:
+              - Description of the notable event, this will populate the description field for the web console
+            required: true
+            type: str
+          security_domain:
+            description:
+              - Splunk Security Domain
+            type: str
+            choices: [ "access", "endpoint", "network", "threat", "identity", "audit" ]
+            default: "threat"
+          severity:
+            description:
+              - Severity rating
+            type: str
+            choices: [ "informational", "low", "medium", "high", "critical", "unknown" ]
+            default: "high"
+          default_owner:
+            description:
+              - Default owner of the notable event, if unset it will default to Splunk System Defaults
+            type: str
+          default_status:
+            description:
+              - Default status of the notable event, if unset it will default to Splunk System Defaults
+            type: str
+            choices: [ "unassigned", "new", "in progress", "pending", "resolved", "closed", "" ]
+            default: ""
+          drill_down_name:
+            description:
+              - Name for drill down search, Supports variable substitution with fields from the matching event.
+            type: str
+          drill_down_search:
+            description:
+              - Drill down search, Supports variable substitution with fields from the matching event.
+            type: str
+          drill_down_earliest_offset:
+            description:
+              - 'Set the amount of time before the triggering event to search for related events. For example, 2h. Use "$info_min_time$" to set the drill-down time to match the earliest time of the search'
+            type: str
+            default: "$info_min_time$"
+          drill_down_latest_offset:
+            description:
+              - 'Set the amount of time after the triggering event to search for related events. For example, 1m. Use "$info_max_time$" to set the drill-down time to match the latest time of the search'
+            type: str
+            default: "$info_max_time$"
+          investigation_profiles:
+            description:
+              - Investigation profile to assiciate the notable event with.
+            type: str
+          next_steps:
+            description:
+              - List of adaptive responses that should be run next
+            type: list
+            default: []
+          recommended_actions:
+            description:
+              - List of adaptive responses that are recommended to be run next
+            type: list
+            default: []
+          asset_extraction:
+            description:
+              - list of assets to extract, select any one or many of the available choices
+            type: list
+            choices: [ "src", "dest", "dvc", "orig_host" ]
+            default: [ "src", "dest", "dvc", "orig_host" ]
+          identity_extraction:
+            description:
+              - list of identity fields to extract, select any one or many of the available choices
+            type: list
+            choices: [ "user", "src_user" ]
+            default: [ "user", "src_user" ]
+  fingerprint:
+    description:
+      - Keep a hash of the desired state of each correlation search in its C(action.ansible.param.fingerprint)
+        setting. The next run reads only that setting and skips the search when the hash matches and the search
+        was not updated since, the full comparison only happens when the desired state changed or the search
+        was changed outside of Ansible.
+      - The first run with this enabled, and the first run after a search was changed outside of Ansible,
+        write the fingerprint and report a change.
+    type: bool
+    required: false
+    default: false
+  stagger:
+    description:
+      - Spread the launches of the searches evenly over the day instead of having every search with the same
+        schedule start in the same minute. Each search whose I(cron_schedule) fires at a regular interval keeps
+        that interval, only the minute it first fires at within one interval is moved.
+      - A search running hourly or less often keeps its hours and days and only gets another minute of the hour,
+        C(0 2 * * *) becomes a time between 02:00 and 02:59.
+      - The minute depends on a hash of the search name and on the searches placed before it, the same list always
+        gets the same schedules and adding or removing a search only moves a few others.
+      - A real-time scheduled search left with a I(schedule_window) of C(0) gets a window of half its interval, up
+        to 30 minutes, for the scheduler to push a run back while it is busy.
+      - Months and days of the week may be given by name, such as C(0 6 * * MON-FRI). A I(cron_schedule) that can't
+        be read is left as it is, with a warning.
+    type: bool
+    required: false
+    default: false
+
+extends_documentation_fragment:
+  - splunk
+  - splunk.snapshot_cache
+  - splunk.return_content
+  - splunk.shc_captain_only
+  - splunk.spl_lint
+  - splunk.bulk_changes
+
+author: "Ansible Security Automation Team (https://github.com/ansible-security)"
+'''
+
+EXAMPLES = '''
+- name: manage all correlation searches in one pass
+  splunk_correlation_searches:
+    searches:
+      - name: "Excessive Failed Logins"
+        description: "Excessive failed logins from a single source"
+        search: '| tstats count from datamodel=Authentication where Authentication.action=failure by Authentication.src'
+        scheduling: "continuous"
+      - name: "Old Demo Search"
+        description: "No longer needed"
+        search: 'source="/var/log/snort.log"'
+        state: "absent"
+
+- name: spread every search of the list over its interval
+  splunk_correlation_searches:
+    stagger: true
+    searches: "{{ correlation_searches }}"
+  register: searches
+
+- name: show the busiest minute before and after
+  debug:
+    msg: "{{ searches.stagger.before.peak }} -> {{ searches.stagger.after.peak }} launches per minute"
+'''
+
+RETURN = '''
+created:
+  description: Names of the correlation searches that were created
+  returned: always
+  type: list
+updated:
+  description: Names of the correlation searches that were updated
+  returned: always
+  type: list
+deleted:
+  description: Names of the correlation searches that were deleted
+  returned: always
+  type: list
+written:
+  description:
+    - The fields each search written was sent and a hash of the values splunkd gave them, by collection rest path
+      and name, C(null) for the deleted ones. Feed it to M(splunk_wait_for_replication) on the other search head
+      cluster members.
+  returned: always
+  type: dict
+  sample: {"servicesNS/nobody/SplunkEnterpriseSecuritySuite/saved/searches": {"Web Uptime Alert": {"fields": ["cron_schedule", "search"], "fingerprint": "353b9570498b73bc2979282bc6de1f170edccb405ea5219a21c813cbd8231b64"}}}
+stagger:
+  description:
+    - The cron schedule given to each search by I(stagger) and the searches launched in each minute of the day
+      before and after, with the busiest minute, the mean and the number of minutes with a launch.
+  returned: when I(stagger=true)
+  type: dict
+  sample: {"schedules": {"Excessive Failed Logins": "3-59/5 * * * *"},
+           "before": {"peak": 254, "mean": 35.36, "busy_minutes": 288, "launches_per_minute": [254, 0, 0]},
+           "after": {"peak": 37, "mean": 35.36, "busy_minutes": 1440, "launches_per_minute": [36, 35, 36]}}
+splunk_metrics:
+  description:
+    - Number, latency and size of the REST requests the module made
+  returned: when I(request_metrics=true)
+  type: dict
+  sample: {"requests": 3, "methods": {"GET": 1, "POST": 2}, "failed": 0, "latency_total": 0.091,
+           "latency_p50": 0.024, "latency_p95": 0.051, "latency_max": 0.051, "bytes": 48211}
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+
+from ansible.module_utils.six.moves.urllib.parse import urlencode, quote_plus
+from ansible.module_utils.splunk import SplunkRequest, diff_content, splunk_request_argspec, correlation_search_argspec, correlation_search_data, CORRELATION_SEARCH_FIELDS
+from ansible.module_utils.splunk import BulkChanges, fingerprint, fingerprint_changes, fingerprint_matches, spl_lint_argspec
+
+
+def main():
+
+    search_spec = correlation_search_argspec()
+    search_spec['state'] = dict(choices=['present', 'absent'], required=False, default='present')
+
+    argspec = dict(
+        searches=dict(required=True, type='list', elements='dict', options=search_spec),
+        plan_file=dict(type='path', required=False),
+        fingerprint=dict(type='bool', required=False, default=False),
+        state_ledger=dict(type='str', required=False),
+        stagger=dict(type='bool', required=False, default=False),
+    )
+
+    argspec.update(splunk_request_argspec())
+    argspec.update(spl_lint_argspec())
+
+    module = AnsibleModule(
+        argument_spec=argspec,
+        supports_check_mode=True
+    )
+
+    # Lint the searches before anything is sent to Splunk
+    if module.params['spl_lint'] != 'none':
+        from ansible.module_utils.splunk_spl import spl_lint_gate
+        spl_lint_gate(module, module.params['searches'])
+
+    # Staggered schedules replace the requested ones before anything is
+    # compared, fingerprints and ledger included
+    extra = {}
+    if module.params['stagger']:
+        from ansible.module_utils.splunk_schedule import stagger, stagger_window, launch_histogram, histogram_summary, parse_cron
+
+        present = [search for search in module.params['searches'] if search['state'] == 'present']
+        before = launch_histogram(search['cron_schedule'] for search in present)
+        schedules = stagger(dict((search['name'], search['cron_schedule']) for search in present))
+        unreadable = sorted(search['name'] for search in present if parse_cron(search['cron_schedule']) is None)
+        if unreadable:
+            module.warn("The cron_schedule of {0} can't be read, they are left out of stagger.".format(', '.join(unreadable)))
+        for search in present:
+            if search['name'] not in schedules:
+                continue
+            search['cron_schedule'] = schedules[search['name']]
+            if search['schedule_window'] == '0' and search['scheduling'] == 'real-time':
+                window = stagger_window(search['cron_schedule'])
+                if window:
+                    search['schedule_window'] = str(window)
+        extra['stagger'] = dict(
+            schedules=schedules,
+            before=histogram_summary(before),
+            after=histogram_summary(launch_histogram(search['cron_schedule'] for search in present)),
+        )
+
+    splunk_request = SplunkRequest(
+        module,
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+        not_rest_data_keys=['state', 'fingerprint', 'spl_lint', 'spl_lint_ignore'],
+        fields=CORRELATION_SEARCH_FIELDS
+    )
+
+    bulk = BulkChanges(splunk_request)
+    bulk.open_ledger(['servicesNS/nobody/SplunkEnterpriseSecuritySuite/saved/searches'])
+
+    digests = {}
+    if module.params['fingerprint'] or bulk.ledger is not None:
+        for search in module.params['searches']:
+            if search['state'] == 'present':
+                digests[search['name']] = fingerprint(correlation_search_data(search))
+
+    converged = bulk.skipped(
+        'servicesNS/nobody/SplunkEnterpriseSecuritySuite/saved/searches', digests,
+        [search['name'] for search in module.params['searches'] if search['state'] == 'absent']
+    )
+
+    # With fingerprints a listing of nothing but the fingerprint of every search
+    # tells which searches are still in the state they were last written in,
+    # only the others need their full content
+    stamps = {}
+    if module.params['fingerprint']:
+        names = [search['name'] for search in module.params['searches'] if search['name'] not in converged]
+        if names:
+            stamps = splunk_request.get_fingerprints(
+                'servicesNS/nobody/SplunkEnterpriseSecuritySuite/saved/searches',
+                names=names
+            )
+        for name in names:
+            if name in digests and name in stamps and fingerprint_matches(stamps[name], digests[name]):
+                converged.add(name)
+                bulk.in_state('servicesNS/nobody/SplunkEnterpriseSecuritySuite/saved/searches', name,
+                                 stamps[name].get('updated'))
+    written_at = splunk_request.server_time()
+
+    # One listing of the whole collection instead of a GET per correlation search,
+    # streamed page by page keeping only the searches in the list
+    existing = {}
+    existing_updated = {}
+    snapshot = bulk.snapshot(
+        'servicesNS/nobody/SplunkEnterpriseSecuritySuite/saved/searches',
+        [search['name'] for search in module.params['searches'] if search['name'] not in converged]
+    )
+    for name in snapshot:
+        existing[name] = snapshot[name]['content']
+        existing_updated[name] = snapshot[name].get('updated')
+
+    created = []
+    updated = []
+    deleted = []
+
+    for search in module.params['searches']:
+        name = search['name']
+
+        if name in converged:
+            continue
+
+        if search['state'] == 'absent':
+            if name in existing:
+                deleted.append(name)
+                bulk.queue(
+                    name, 'servicesNS/nobody/SplunkEnterpriseSecuritySuite/saved/searches', name, 'DELETE',
+                    'servicesNS/nobody/SplunkEnterpriseSecuritySuite/saved/searches/{0}'.format(quote_plus(name)),
+                    None, diff_content(existing[name], None), updated=existing_updated[name]
+                )
+            continue
+
+        request_post_data = correlation_search_data(search, existing.get(name))
+        if module.params['fingerprint']:
+            fingerprint_change = fingerprint_changes(stamps.get(name) if name in existing else None, digests[name], written_at)
+            request_post_data.update((key, change['after']) for key, change in fingerprint_change.items())
+
+        if name in existing:
+            field_changes = diff_content(existing[name], request_post_data)
+            if module.params['fingerprint']:
+                field_changes.update(fingerprint_change)
+            if not field_changes:
+                bulk.in_state('servicesNS/nobody/SplunkEnterpriseSecuritySuite/saved/searches', name,
+                                 existing_updated[name])
+                continue
+            updated.append(name)
+            del request_post_data['name'] # If this is present, splunk assumes we're trying to create a new one wit the same name
+            bulk.queue(
+                name, 'servicesNS/nobody/SplunkEnterpriseSecuritySuite/saved/searches', name, 'POST',
+                'servicesNS/nobody/SplunkEnterpriseSecuritySuite/saved/searches/{0}'.format(quote_plus(name)),
+                urlencode(request_post_data), field_changes, updated=existing_updated[name]
+            )
+        else:
+            created.append(name)
+            bulk.queue(
+                name, 'servicesNS/nobody/SplunkEnterpriseSecuritySuite/saved/searches', name, 'POST',
+                'servicesNS/nobody/SplunkEnterpriseSecuritySuite/saved/searches',
+                urlencode(request_post_data), diff_content(None, request_post_data)
+            )
+
+    changed = bool(created or updated or deleted)
+    bulk.apply()
+
+    result = splunk_request.result_content(bulk.splunk_data, bulk.field_changes)
+    result.update(extra)
+
+    if bulk.errors:
+        module.fail_json(msg="{0} of {1} changes failed.".format(len(bulk.errors), len(bulk.operations)),
+                         errors=bulk.errors, written=bulk.written,
+                         created=created, updated=updated, deleted=deleted, **result)
+
+    if module.params['plan_file']:
+        msg = "Plan of {0} operations written to {1}.".format(len(bulk.operations), module.params['plan_file'])
+    elif not changed:
+        msg = "Nothing to do."
+    elif module.check_mode:
+        msg = "A change would have been made if not in check mode."
+    else:
+        msg = "{0} created, {1} updated, {2} deleted.".format(len(created), len(updated), len(deleted))
+
+    module.exit_json(changed=changed, msg=msg, created=created, updated=updated, deleted=deleted, written=bulk.written, **result)
+
+if __name__ == '__main__':
+    main()
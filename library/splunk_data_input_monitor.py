@@ -109,6 +109,12 @@ options:
     required: false
     type: str
 
+extends_documentation_fragment:
+  - splunk
+  - splunk.snapshot_cache
+  - splunk.return_content
+  - splunk.shc_captain_only
+
 author: "Ansible Security Automation Team (https://github.com/ansible-security)
 '''
 
@@ -116,97 +122,64 @@ EXAMPLES = '''
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils._text import to_text
 
-from ansible.module_utils.urls import Request
 from ansible.module_utils.six.moves.urllib.parse import urlencode, quote_plus
-from ansible.module_utils.six.moves.urllib.error import HTTPError
-from ansible.module_utils.splunk import SplunkRequest, parse_splunk_args
-
-import copy
+from ansible.module_utils.splunk import SplunkRequest, diff_content, splunk_request_argspec, monitor_input_argspec, MONITOR_INPUT_KEYMAP, MONITOR_INPUT_FIELDS
 
 def main():
 
-    argspec = dict(
-        name=dict(required=True, type='str'),
-        state=dict(choices=['present', 'absent'], required=True),
-        blacklist=dict(required=False, type='str', default=None),
-        check_indexed=dict(required=False, type='bool', default=None),
-        check_path=dict(required=False, type='bool', default=None),
-        crc_salt=dict(required=False, type='str', default=None),
-        disabled=dict(required=False, type='str', default=None),
-        followTail=dict(required=False, type='str', default=None),
-        host=dict(required=False, type='str', default=None),
-        host_segment=dict(required=False, type='int', default=None),
-        host_regex=dict(required=False, type='int', default=None),
-        ignore_older_than=dict(required=False, type='str', default=None),
-        index=dict(required=False, type='str', default=None),
-        recursive=dict(required=False, type='str', default=None),
-        rename_source=dict(required=False, type='str', default=None),
-        sourcetype=dict(required=False, type='str', default=None),
-        time_before_close=dict(required=False, type='int', default=None),
-        whitelist=dict(required=False, type='str', default=None),
-    )
+    argspec = monitor_input_argspec()
+
+    argspec.update(splunk_request_argspec())
 
     module = AnsibleModule(
         argument_spec=argspec,
         supports_check_mode=True
     )
 
-    # map of keys for the splunk REST API that aren't pythonic so we have to
-    # handle the substitutes
-    keymap = {
-        'check_index': 'check-index',
-        'check_path': 'check-path',
-        'crc_salt': 'crc-salt',
-        'ignore_older_than': 'ignore-older-than',
-        'rename_source': 'rename-source',
-        'time_before_close': 'time-before-close'
-
-    }
-
     splunk_request = SplunkRequest(
         module,
         headers={"Content-Type": "application/x-www-form-urlencoded"},
-        keymap=keymap,
-        not_rest_data_keys=['state']
+        keymap=MONITOR_INPUT_KEYMAP,
+        not_rest_data_keys=['state'],
+        fields=MONITOR_INPUT_FIELDS
     )
     # This is where the splunk_* args are processed
     request_data = splunk_request.get_data()
 
-    query_dict = splunk_request.get_by_path('servicesNS/nobody/search/data/inputs/monitor/{0}'.format(quote_plus(module.params['name'])))
+    query_dict = splunk_request.get_by_name('servicesNS/nobody/search/data/inputs/monitor', module.params['name'])
 
     if module.params['state'] == 'present':
         if query_dict:
-            needs_change = False
-            for arg in request_data:
-                if arg in query_dict['entry'][0]['content']:
-                    if to_text(query_dict['entry'][0]['content'][arg]) != to_text(request_data[arg]):
-                        needs_change = True
+            changes = diff_content(query_dict['entry'][0]['content'], request_data)
+            needs_change = bool(changes)
             if not needs_change:
-                module.exit_json(changed=False, msg="Nothing to do.", splunk_data=query_dict)
+                module.exit_json(changed=False, msg="Nothing to do.", **splunk_request.result_content(query_dict))
             if module.check_mode and needs_change:
-                module.exit_json(changed=True, msg="A change would have been made if not in check mode.", splunk_data=query_dict)
+                module.exit_json(changed=True, msg="A change would have been made if not in check mode.",
+                                 **splunk_request.result_content(query_dict, changes))
             if needs_change:
                 splunk_data = splunk_request.create_update(
                     'servicesNS/nobody/search/data/inputs/monitor/{0}'.format(
                         quote_plus(module.params['name'])
                     )
                 )
-                module.exit_json(changed=True, msg="{0} updated.", splunk_data=splunk_data)
+                module.exit_json(changed=True, msg="{0} updated.", **splunk_request.result_content(splunk_data, changes))
         else:
             # Create it
             _data = splunk_request.get_data()
             _data['name'] = module.params['name']
             splunk_data = splunk_request.create_update('servicesNS/nobody/search/data/inputs/monitor', data=urlencode(_data))
-            module.exit_json(changed=True, msg="{0} created.", splunk_data=splunk_data)
+            module.exit_json(changed=True, msg="{0} created.",
+                             **splunk_request.result_content(splunk_data, diff_content(None, _data)))
 
     if module.params['state'] == 'absent':
         if query_dict:
             splunk_data = splunk_request.delete_by_path('servicesNS/nobody/search/data/inputs/monitor/{0}'.format(quote_plus(module.params['name'])))
-            module.exit_json(changed=True, msg="Deleted {0}.".format(module.params['name']), splunk_data=splunk_data)
+            module.exit_json(changed=True, msg="Deleted {0}.".format(module.params['name']),
+                             **splunk_request.result_content(splunk_data, diff_content(query_dict['entry'][0]['content'], None)))
 
-    module.exit_json(changed=False, msg="Nothing to do.", splunk_data=query_dict)
+    module.exit_json(changed=False, msg="Nothing to do.", **splunk_request.result_content(query_dict))
 
 if __name__ == '__main__':
     main()
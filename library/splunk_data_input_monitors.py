@@ -0,0 +1,404 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'community'}
+
+
+DOCUMENTATION = '''
+---
+module: splunk_data_input_monitors
+short_description: Manage many Splunk Data Inputs of type Monitor at once
+description:
+  - This module allows for addition, modification and deletion of a list of File and Directory Monitor Data Inputs in Splunk.
+  - The monitor inputs collection is listed once and every input is compared in memory, only the inputs
+    that need a change are written back to Splunk.
+  - With I(app_dir) the inputs are rendered to the C(local/inputs.conf) file of an app instead, for a
+    deployment server to push to the forwarders.
+version_added: "2.8"
+options:
+  inputs:
+    description:
+      - List of monitor input definitions, each one takes the same options as M(splunk_data_input_monitor)
+    required: true
+    type: list
+    elements: dict
+    suboptions:
+      name:
+        description:
+         - The file or directory path to monitor on the system.
+        required: true
+        type: str
+      state:
+        description:
+          - Add or remove the data input.
+        required: false
+        choices: [ "present", "absent" ]
+        default: "present"
+      blacklist:
+        description:
+          - Specify a regular expression for a file path. The file path that matches this regular expression is not indexed.
+        type: str
+      check_indexed:
+        description:
+          - If set to C(true), the index value is checked to ensure that it is the name of a valid index.
+        type: bool
+      check_path:
+        description:
+          - If set to C(true), the name value is checked to ensure that it exists.
+        type: bool
+      crc_salt:
+        description:
+          - A string that modifies the file tracking identity for files in this input.
+        type: str
+      disabled:
+        description:
+          - Indicates if input monitoring is disabled.
+        type: str
+      followTail:
+        description:
+          - If set to C(true), files that are seen for the first time is read from the end.
+        type: str
+      host:
+        description:
+          - The value to populate in the host field for events from this data input.
+        type: str
+      host_regex:
+        description:
+          - Regular expression whose capture group populates the host field for events from this data input.
+        type: int
+      host_segment:
+        description:
+          - Use the specified slash-separate segment of the filepath as the host field value.
+        type: int
+      ignore_older_than:
+        description:
+          - Files whose modification time falls outside of this rolling time window are no longer monitored.
+        type: str
+      index:
+        description:
+          - Which index events from this input should be stored in. Defaults to default.
+        type: str
+      recursive:
+        description:
+          - Setting this to false prevents monitoring of any subdirectories encountered within this data input.
+        type: str
+      rename_source:
+        description:
+          - The value to populate in the source field for events from this data input.
+        type: str
+      sourcetype:
+        description:
+          - The value to populate in the sourcetype field for incoming events.
+        type: str
+      time_before_close:
+        description:
+          - Minimum number of seconds a file is kept open after reaching its end.
+        type: int
+      whitelist:
+        description:
+          - Specify a regular expression for a file path. Only file paths that match this regular expression are indexed.
+        type: str
+  app_dir:
+    description:
+      - Directory of an app on the controller, typically under a deployment server's C(deployment-apps). When
+        set nothing is sent to Splunk, the present inputs are rendered to the C(local/inputs.conf) file of the
+        app, one C([monitor://<name>]) stanza per input with the options under their C(inputs.conf) names.
+      - Stanzas are sorted by path and settings by name, the file is only rewritten when its content changes so
+        its checksum, and the deployment server's, stays the same when nothing changed.
+      - The I(check_path) and I(check_indexed) options only steer the REST API and are left out of the file.
+    type: path
+    required: false
+
+extends_documentation_fragment:
+  - splunk
+  - splunk.snapshot_cache
+  - splunk.return_content
+  - splunk.shc_captain_only
+  - splunk.bulk_changes
+
+author: "Ansible Security Automation Team (https://github.com/ansible-security)"
+'''
+
+EXAMPLES = '''
+- name: render every monitored path into a deployment app
+  splunk_data_input_monitors:
+    app_dir: /opt/splunk/etc/deployment-apps/org_all_inputs
+    inputs:
+      - name: "/var/log/messages"
+        index: "os"
+        sourcetype: "syslog"
+      - name: "/var/log/httpd"
+        recursive: True
+        whitelist: '\\.log$'
+        crc_salt: "<SOURCE>"
+  delegate_to: deployment-server.example.com
+
+- name: manage every monitored path in one pass
+  splunk_data_input_monitors:
+    inputs:
+      - name: "/var/log/messages"
+        index: "os"
+        sourcetype: "syslog"
+      - name: "/var/log/httpd"
+        recursive: True
+        whitelist: '\\.log$'
+        crc_salt: "<SOURCE>"
+      - name: "/var/log/demo.log"
+        state: "absent"
+'''
+
+RETURN = '''
+path:
+  description: Path of the rendered C(inputs.conf)
+  returned: when I(app_dir) is set
+  type: str
+  sample: /opt/splunk/etc/deployment-apps/org_all_inputs/local/inputs.conf
+checksum:
+  description: SHA1 checksum of the rendered C(inputs.conf)
+  returned: when I(app_dir) is set
+  type: str
+created:
+  description: Paths of the monitor inputs that were created
+  returned: always
+  type: list
+updated:
+  description: Paths of the monitor inputs that were updated
+  returned: always
+  type: list
+deleted:
+  description: Paths of the monitor inputs that were deleted
+  returned: always
+  type: list
+written:
+  description:
+    - The fields each input written was sent and a hash of the values splunkd gave them, by collection rest path
+      and name, C(null) for the deleted ones. Feed it to M(splunk_wait_for_replication) on the other search head
+      cluster members.
+  returned: always
+  type: dict
+  sample: {"servicesNS/nobody/search/data/inputs/monitor": {"/var/log/messages": {"fields": ["index", "sourcetype"], "fingerprint": "353b9570498b73bc2979282bc6de1f170edccb405ea5219a21c813cbd8231b64"}}}
+splunk_metrics:
+  description:
+    - Number, latency and size of the REST requests the module made
+  returned: when I(request_metrics=true)
+  type: dict
+  sample: {"requests": 3, "methods": {"GET": 1, "POST": 2}, "failed": 0, "latency_total": 0.091,
+           "latency_p50": 0.024, "latency_p95": 0.051, "latency_max": 0.051, "bytes": 48211}
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+
+from ansible.module_utils._text import to_bytes, to_text
+from ansible.module_utils.six.moves.urllib.parse import urlencode, quote_plus
+from ansible.module_utils.splunk import SplunkRequest, diff_content, splunk_request_argspec, monitor_input_argspec, monitor_input_conf, MONITOR_INPUT_KEYMAP, MONITOR_INPUT_FIELDS
+from ansible.module_utils.splunk import BulkChanges, fingerprint
+
+import hashlib
+import os
+import tempfile
+
+INPUTS_CONF_HEADER = '# Rendered by splunk_data_input_monitors, local changes are overwritten'
+
+
+def render_inputs_conf(inputs):
+    """
+    inputs.conf text of the present monitor inputs, the same inputs always
+    render to the same bytes: stanzas are sorted by path and settings by
+    name. The last definition of a path wins, like it would over REST
+    """
+    stanzas = {}
+    for monitor_input in inputs:
+        if monitor_input['state'] == 'present':
+            stanzas[monitor_input['name']] = monitor_input_conf(monitor_input)
+        else:
+            stanzas.pop(monitor_input['name'], None)
+
+    lines = [INPUTS_CONF_HEADER]
+    for name in sorted(stanzas):
+        lines.append('')
+        lines.append('[monitor://{0}]'.format(name))
+        for key in sorted(stanzas[name]):
+            lines.append('{0} = {1}'.format(key, stanzas[name][key]))
+    return '\n'.join(lines) + '\n', len(stanzas)
+
+
+def render_app(module):
+    """
+    Render the inputs to the local/inputs.conf of app_dir, only writing the
+    file when its content changes
+    """
+    for monitor_input in module.params['inputs']:
+        for value in [monitor_input['name']] + list(monitor_input_conf(monitor_input).values()):
+            if '\n' in value or '\r' in value:
+                module.fail_json(msg="{0}: inputs.conf values can't span lines.".format(monitor_input['name']))
+
+    content, count = render_inputs_conf(module.params['inputs'])
+    content = to_bytes(content)
+    path = os.path.join(module.params['app_dir'], 'local', 'inputs.conf')
+
+    current = None
+    try:
+        with open(path, 'rb') as f:
+            current = f.read()
+    except (IOError, OSError):
+        pass
+
+    changed = current != content
+    result = dict(changed=changed, path=path, checksum=hashlib.sha1(content).hexdigest())
+    if module._diff:
+        result['diff'] = dict(before=to_text(current or b''), after=to_text(content), before_header=path, after_header=path)
+
+    if changed and not module.check_mode:
+        # Write to a temporary file and rename it into place so the
+        # deployment server never picks up a half written file
+        directory = os.path.dirname(path)
+        try:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.chmod(tmp_path, 0o644)
+            os.rename(tmp_path, path)
+        except (IOError, OSError) as e:
+            module.fail_json(msg="Unable to write {0}: {1}".format(path, to_text(e)))
+
+    if not changed:
+        msg = "Nothing to do."
+    elif module.check_mode:
+        msg = "A change would have been made if not in check mode."
+    else:
+        msg = "{0} monitor inputs rendered to {1}.".format(count, path)
+    module.exit_json(msg=msg, **result)
+
+
+def main():
+
+    input_spec = monitor_input_argspec()
+    input_spec['state'] = dict(choices=['present', 'absent'], required=False, default='present')
+
+    argspec = dict(
+        inputs=dict(required=True, type='list', elements='dict', options=input_spec),
+        plan_file=dict(type='path', required=False),
+        state_ledger=dict(type='str', required=False),
+        app_dir=dict(type='path', required=False),
+    )
+
+    argspec.update(splunk_request_argspec())
+
+    module = AnsibleModule(
+        argument_spec=argspec,
+        mutually_exclusive=[('app_dir', 'plan_file'), ('app_dir', 'state_ledger')],
+        supports_check_mode=True
+    )
+
+    # Rendering an app needs no connection to Splunk
+    if module.params['app_dir']:
+        render_app(module)
+
+    splunk_request = SplunkRequest(
+        module,
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+        keymap=MONITOR_INPUT_KEYMAP,
+        not_rest_data_keys=['state'],
+        fields=MONITOR_INPUT_FIELDS
+    )
+
+    bulk = BulkChanges(splunk_request)
+    bulk.open_ledger(['servicesNS/nobody/search/data/inputs/monitor'])
+
+    digests = {}
+    if bulk.ledger is not None:
+        for monitor_input in module.params['inputs']:
+            if monitor_input['state'] == 'present':
+                digests[monitor_input['name']] = fingerprint(splunk_request.get_data(monitor_input))
+    skipped = bulk.skipped(
+        'servicesNS/nobody/search/data/inputs/monitor', digests,
+        [monitor_input['name'] for monitor_input in module.params['inputs'] if monitor_input['state'] == 'absent']
+    )
+
+    # One listing of the whole collection instead of a GET per monitored path,
+    # streamed page by page keeping only the inputs in the list
+    existing = {}
+    existing_updated = {}
+    snapshot = bulk.snapshot(
+        'servicesNS/nobody/search/data/inputs/monitor',
+        [monitor_input['name'] for monitor_input in module.params['inputs'] if monitor_input['name'] not in skipped]
+    )
+    for name in snapshot:
+        existing[name] = snapshot[name]['content']
+        existing_updated[name] = snapshot[name].get('updated')
+
+    created = []
+    updated = []
+    deleted = []
+
+    for monitor_input in module.params['inputs']:
+        name = monitor_input['name']
+
+        if name in skipped:
+            continue
+
+        if monitor_input['state'] == 'absent':
+            if name in existing:
+                deleted.append(name)
+                bulk.queue(
+                    name, 'servicesNS/nobody/search/data/inputs/monitor', name, 'DELETE',
+                    'servicesNS/nobody/search/data/inputs/monitor/{0}'.format(quote_plus(name)),
+                    None, diff_content(existing[name], None), updated=existing_updated[name]
+                )
+            continue
+
+        # This is where the keymap translation of each input happens
+        request_data = splunk_request.get_data(monitor_input)
+
+        if name in existing:
+            field_changes = diff_content(existing[name], request_data)
+            if not field_changes:
+                bulk.in_state('servicesNS/nobody/search/data/inputs/monitor', name, existing_updated[name])
+                continue
+            updated.append(name)
+            del request_data['name']
+            bulk.queue(
+                name, 'servicesNS/nobody/search/data/inputs/monitor', name, 'POST',
+                'servicesNS/nobody/search/data/inputs/monitor/{0}'.format(quote_plus(name)),
+                urlencode(request_data), field_changes, updated=existing_updated[name]
+            )
+        else:
+            created.append(name)
+            bulk.queue(
+                name, 'servicesNS/nobody/search/data/inputs/monitor', name, 'POST',
+                'servicesNS/nobody/search/data/inputs/monitor', urlencode(request_data), diff_content(None, request_data)
+            )
+
+    changed = bool(created or updated or deleted)
+    bulk.apply()
+
+    if bulk.errors:
+        module.fail_json(msg="{0} of {1} changes failed.".format(len(bulk.errors), len(bulk.operations)),
+                         errors=bulk.errors, written=bulk.written, created=created, updated=updated, deleted=deleted,
+                         **splunk_request.result_content(bulk.splunk_data, bulk.field_changes))
+
+    if module.params['plan_file']:
+        msg = "Plan of {0} operations written to {1}.".format(len(bulk.operations), module.params['plan_file'])
+    elif not changed:
+        msg = "Nothing to do."
+    elif module.check_mode:
+        msg = "A change would have been made if not in check mode."
+    else:
+        msg = "{0} created, {1} updated, {2} deleted.".format(len(created), len(updated), len(deleted))
+
+    module.exit_json(changed=changed, msg=msg, created=created, updated=updated, deleted=deleted, written=bulk.written,
+                     **splunk_request.result_content(bulk.splunk_data, bulk.field_changes))
+
+if __name__ == '__main__':
+    main()
@@ -100,6 +100,12 @@ options:
       - "sourcetype=" is automatically prepended to <string>.
       - Defaults to audittrail (if signedaudit=true) or fschange (if signedaudit=false).
 
+extends_documentation_fragment:
+  - splunk
+  - splunk.snapshot_cache
+  - splunk.return_content
+  - splunk.shc_captain_only
+
 author: "Ansible Security Automation Team (https://github.com/ansible-security)
 '''
 
@@ -108,32 +114,15 @@ EXAMPLES = '''
 
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils._text import to_text
 
-from ansible.module_utils.urls import Request
 from ansible.module_utils.six.moves.urllib.parse import urlencode, quote_plus
-from ansible.module_utils.six.moves.urllib.error import HTTPError
-from ansible.module_utils.splunk import SplunkRequest, parse_splunk_args
-
-import copy
+from ansible.module_utils.splunk import SplunkRequest, diff_content, splunk_request_argspec, network_input_argspec, NETWORK_INPUT_FIELDS
 
 def main():
 
-    argspec = dict(
-        state=dict(required=False, choices=[ 'present', 'absent', 'enabled', 'disable' ], default='present', type='str'),
-        connection_host=dict(required=False, choices=['ip', 'dns', 'none'], default='none', type='str'),
-        host=dict(required=False, type='str', default=None),
-        index=dict(required=False, type='str', default=None),
-        name=dict(required=True, type='str'),
-        protocol=dict(required=True, type='str', choices=['tcp', 'udp']),
-        queue=dict(required=False, type='str', choices=['parsingQueue', 'indexQueue'], default='parsingQueue'),
-        rawTcpDoneTimeout=dict(required=False, type='int', default=10),
-        restrictToHost=dict(required=False, type='str', default=None),
-        ssl=dict(required=False, type='bool', default=None),
-        source=dict(required=False, type='str', default=None),
-        sourcetype=dict(required=False, type='str', default=None),
-        datatype=dict(required=False, choices=[ "cooked", "raw" ], default="raw")
-    )
+    argspec = network_input_argspec()
+
+    argspec.update(splunk_request_argspec())
 
     module = AnsibleModule(
         argument_spec=argspec,
@@ -143,17 +132,18 @@ def main():
     splunk_request = SplunkRequest(
         module,
         headers={"Content-Type": "application/x-www-form-urlencoded"},
-        not_rest_data_keys = [ 'state', 'datatype', 'protocol' ]
+        not_rest_data_keys = [ 'state', 'datatype', 'protocol' ],
+        fields=NETWORK_INPUT_FIELDS
     )
     # This is where the splunk_* args are processed
     request_data = splunk_request.get_data()
 
-    query_dict = splunk_request.get_by_path(
-        'servicesNS/nobody/search/data/inputs/{0}/{1}/{2}'.format(
+    query_dict = splunk_request.get_by_name(
+        'servicesNS/nobody/search/data/inputs/{0}/{1}'.format(
             quote_plus(module.params['protocol']),
             quote_plus(module.params['datatype']),
-            quote_plus(module.params['name']),
-        )
+        ),
+        module.params['name']
     )
 
     if module.params['state'] in ['present', 'enabled', 'disabled']:
@@ -163,15 +153,13 @@ def main():
         else:
             _data['disabled'] = True
         if query_dict:
-            needs_change = False
-            for arg in request_data:
-                if arg in query_dict['entry'][0]['content']:
-                    if to_text(query_dict['entry'][0]['content'][arg]) != to_text(request_data[arg]):
-                        needs_change = True
+            changes = diff_content(query_dict['entry'][0]['content'], request_data)
+            needs_change = bool(changes)
             if not needs_change:
-                module.exit_json(changed=False, msg="Nothing to do.", splunk_data=query_dict)
+                module.exit_json(changed=False, msg="Nothing to do.", **splunk_request.result_content(query_dict))
             if module.check_mode and needs_change:
-                module.exit_json(changed=True, msg="A change would have been made if not in check mode.", splunk_data=query_dict)
+                module.exit_json(changed=True, msg="A change would have been made if not in check mode.",
+                                 **splunk_request.result_content(query_dict, changes))
             if needs_change:
                 splunk_data = splunk_request.create_update(
                     'servicesNS/nobody/search/data/inputs/{0}/{1}/{2}'.format(
@@ -182,9 +170,9 @@ def main():
                     )
                 )
             if module.params['state'] in ['present', 'enabled']:
-                module.exit_json(changed=True, msg="{0} updated.", splunk_data=splunk_data)
+                module.exit_json(changed=True, msg="{0} updated.", **splunk_request.result_content(splunk_data, changes))
             else:
-                module.exit_json(changed=True, msg="{0} disabled.", splunk_data=splunk_data)
+                module.exit_json(changed=True, msg="{0} disabled.", **splunk_request.result_content(splunk_data, changes))
         else:
             # Create it
             splunk_data = splunk_request.create_update(
@@ -194,7 +182,8 @@ def main():
                 ),
                 data=urlencode(_data)
             )
-            module.exit_json(changed=True, msg="{0} created.", splunk_data=splunk_data)
+            module.exit_json(changed=True, msg="{0} created.",
+                             **splunk_request.result_content(splunk_data, diff_content(None, _data)))
     elif module.params['state'] == 'absent':
         if query_dict:
             splunk_data = splunk_request.delete_by_path(
@@ -204,9 +193,10 @@ def main():
                     quote_plus(module.params['name']),
                 )
             )
-            module.exit_json(changed=True, msg="Deleted {0}.".format(module.params['name']), splunk_data=splunk_data)
+            module.exit_json(changed=True, msg="Deleted {0}.".format(module.params['name']),
+                             **splunk_request.result_content(splunk_data, diff_content(query_dict['entry'][0]['content'], None)))
 
-    module.exit_json(changed=False, msg="Nothing to do.", splunk_data={})
+    module.exit_json(changed=False, msg="Nothing to do.", **splunk_request.result_content({}))
 
 
 if __name__ == '__main__':
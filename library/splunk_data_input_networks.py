@@ -0,0 +1,282 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'community'}
+
+
+DOCUMENTATION = '''
+---
+module: splunk_data_input_networks
+short_description: Manage many Splunk Data Inputs of type TCP or UDP at once
+description:
+  - This module allows for addition, modification, enabling, disabling and deletion of a list of TCP and UDP Data Inputs in Splunk.
+  - Each of the tcp/raw, tcp/cooked, udp/raw and udp/cooked collections used by the list is read at most once and
+    every port is compared in memory, only the ports that need a change are written back to Splunk.
+version_added: "2.8"
+options:
+  inputs:
+    description:
+      - List of network input definitions, each one takes the same options as M(splunk_data_input_network)
+    required: true
+    type: list
+    elements: dict
+    suboptions:
+      name:
+        description:
+          - The input port which receives raw data.
+        required: true
+        type: str
+      protocol:
+        description:
+          - Choose between tcp or udp
+        required: true
+        choices: ['tcp', 'udp']
+      datatype:
+        description:
+          - Forwarders can transmit three types of data, raw, unparsed, or parsed. "Cooked" data refers to parsed and unparsed formats.
+        choices: [ "cooked", "raw" ]
+        default: "raw"
+      state:
+        description:
+          - Enable, disable, create, or destroy
+        choices: [ "present", "absent", "enabled", "disabled" ]
+        default: "present"
+      connection_host:
+        description:
+          - Set the host for the remote server that is sending data.
+        choices: [ "ip", "dns", "none" ]
+        default: "none"
+      host:
+        description:
+          - Host from which the indexer gets data.
+        type: str
+      index:
+        description:
+          - default Index to store generated events.
+        type: str
+      queue:
+        description:
+          - Specifies where the input processor should deposit the events it reads.
+        choices: [ "parsingQueue", "indexQueue" ]
+        default: "parsingQueue"
+      rawTcpDoneTimeout:
+        description:
+          - Specifies in seconds the timeout value for adding a Done-key.
+        type: int
+        default: 10
+      restrictToHost:
+        description:
+          - Allows for restricting this input to only accept data from the host specified here.
+        type: str
+      ssl:
+        description:
+          - Enable or disble ssl for the data stream
+        type: bool
+      source:
+        description:
+          - Sets the source key/field for events from this input.
+        type: str
+      sourcetype:
+        description:
+          - Set the source type for events from this input.
+        type: str
+
+extends_documentation_fragment:
+  - splunk
+  - splunk.snapshot_cache
+  - splunk.return_content
+  - splunk.shc_captain_only
+  - splunk.bulk_changes
+
+author: "Ansible Security Automation Team (https://github.com/ansible-security)"
+'''
+
+EXAMPLES = '''
+- name: manage the syslog tier port map in one pass
+  splunk_data_input_networks:
+    inputs:
+      - name: "514"
+        protocol: "udp"
+        sourcetype: "syslog"
+      - name: "9001"
+        protocol: "tcp"
+        index: "network"
+      - name: "9997"
+        protocol: "tcp"
+        datatype: "cooked"
+      - name: "9002"
+        protocol: "tcp"
+        state: "disabled"
+'''
+
+RETURN = '''
+changes:
+  description:
+    - Per port summary of what was done, keyed by C(protocol/datatype/name), ports that were left alone are not listed
+    - Each item holds the action, one of created, updated, enabled, disabled or deleted, and the fields that differed
+  returned: always
+  type: dict
+  sample: {"tcp/raw/9001": {"action": "updated", "fields": ["index"]}}
+written:
+  description:
+    - The fields each port written was sent and a hash of the values splunkd gave them, by collection rest path
+      and name, C(null) for the deleted ones. Feed it to M(splunk_wait_for_replication) on the other search head
+      cluster members.
+  returned: always
+  type: dict
+  sample: {"servicesNS/nobody/search/data/inputs/tcp/raw": {"9001": {"fields": ["disabled", "index"], "fingerprint": "353b9570498b73bc2979282bc6de1f170edccb405ea5219a21c813cbd8231b64"}}}
+splunk_metrics:
+  description:
+    - Number, latency and size of the REST requests the module made
+  returned: when I(request_metrics=true)
+  type: dict
+  sample: {"requests": 3, "methods": {"GET": 1, "POST": 2}, "failed": 0, "latency_total": 0.091,
+           "latency_p50": 0.024, "latency_p95": 0.051, "latency_max": 0.051, "bytes": 48211}
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+
+from ansible.module_utils.six.moves.urllib.parse import urlencode, quote_plus
+from ansible.module_utils.splunk import SplunkRequest, diff_content, splunk_request_argspec, network_input_argspec, NETWORK_INPUT_FIELDS
+from ansible.module_utils.splunk import BulkChanges, fingerprint
+
+
+def input_collection(network_input):
+    """
+    Rest path of the collection of the protocol and datatype of an input
+    """
+    return 'servicesNS/nobody/search/data/inputs/{0}/{1}'.format(
+        quote_plus(network_input['protocol']),
+        quote_plus(network_input['datatype']),
+    )
+
+
+def main():
+
+    input_spec = network_input_argspec()
+    input_spec['state'] = dict(required=False, choices=['present', 'absent', 'enabled', 'disabled'], default='present', type='str')
+
+    argspec = dict(
+        inputs=dict(required=True, type='list', elements='dict', options=input_spec),
+        plan_file=dict(type='path', required=False),
+        state_ledger=dict(type='str', required=False),
+    )
+
+    argspec.update(splunk_request_argspec())
+
+    module = AnsibleModule(
+        argument_spec=argspec,
+        supports_check_mode=True
+    )
+
+    splunk_request = SplunkRequest(
+        module,
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+        not_rest_data_keys=['state', 'datatype', 'protocol'],
+        fields=NETWORK_INPUT_FIELDS
+    )
+
+    # List each of the protocol/datatype collections in use at most once,
+    # keeping only the ports in the list
+    wanted = {}
+    for network_input in module.params['inputs']:
+        wanted.setdefault(input_collection(network_input), []).append(network_input)
+
+    bulk = BulkChanges(splunk_request)
+    bulk.open_ledger(sorted(wanted))
+
+    skipped = {}
+    existing = {}
+    existing_updated = {}
+    for collection, network_inputs in wanted.items():
+        digests = {}
+        if bulk.ledger is not None:
+            for network_input in network_inputs:
+                if network_input['state'] != 'absent':
+                    request_data = splunk_request.get_data(network_input)
+                    request_data['disabled'] = network_input['state'] == 'disabled'
+                    digests[network_input['name']] = fingerprint(request_data)
+        skipped[collection] = bulk.skipped(
+            collection, digests,
+            [network_input['name'] for network_input in network_inputs if network_input['state'] == 'absent']
+        )
+
+        snapshot = bulk.snapshot(collection, sorted(set(
+            network_input['name'] for network_input in network_inputs
+            if network_input['name'] not in skipped[collection]
+        )))
+        existing[collection] = dict((name, snapshot[name]['content']) for name in snapshot)
+        existing_updated[collection] = dict((name, snapshot[name].get('updated')) for name in snapshot)
+
+    changes = {}
+
+    for network_input in module.params['inputs']:
+        name = network_input['name']
+        collection = input_collection(network_input)
+        key = '{0}/{1}/{2}'.format(network_input['protocol'], network_input['datatype'], name)
+        if name in skipped[collection]:
+            continue
+        current = existing[collection].get(name)
+        updated = existing_updated[collection].get(name)
+
+        if network_input['state'] == 'absent':
+            if current is not None:
+                changes[key] = {'action': 'deleted', 'fields': []}
+                bulk.queue(key, collection, name, 'DELETE', '{0}/{1}'.format(collection, quote_plus(name)), None,
+                           diff_content(current, None), updated=updated)
+            continue
+
+        request_data = splunk_request.get_data(network_input)
+        request_data['disabled'] = network_input['state'] == 'disabled'
+
+        if current is None:
+            changes[key] = {'action': 'created', 'fields': sorted(request_data)}
+            bulk.queue(key, collection, name, 'POST', collection, urlencode(request_data), diff_content(None, request_data))
+            continue
+
+        field_changes = diff_content(current, request_data)
+        fields = sorted(field_changes)
+        if not fields:
+            bulk.in_state(collection, name, updated)
+            continue
+
+        if fields == ['disabled']:
+            action = 'disabled' if request_data['disabled'] else 'enabled'
+        else:
+            action = 'updated'
+        changes[key] = {'action': action, 'fields': fields}
+
+        del request_data['name']
+        bulk.queue(key, collection, name, 'POST', '{0}/{1}'.format(collection, quote_plus(name)), urlencode(request_data),
+                   field_changes, updated=updated)
+
+    bulk.apply()
+
+    if bulk.errors:
+        module.fail_json(msg="{0} of {1} changes failed.".format(len(bulk.errors), len(bulk.operations)), errors=bulk.errors,
+                         written=bulk.written, changes=changes,
+                         **splunk_request.result_content(bulk.splunk_data, bulk.field_changes))
+
+    if module.params['plan_file']:
+        msg = "Plan of {0} operations written to {1}.".format(len(bulk.operations), module.params['plan_file'])
+    elif not changes:
+        msg = "Nothing to do."
+    elif module.check_mode:
+        msg = "A change would have been made if not in check mode."
+    else:
+        msg = "{0} ports changed.".format(len(changes))
+
+    module.exit_json(changed=bool(changes), msg=msg, changes=changes, written=bulk.written,
+                     **splunk_request.result_content(bulk.splunk_data, bulk.field_changes))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'community'}
+
+
+DOCUMENTATION = '''
+---
+module: splunk_es_facts
+short_description: Gather a compact index of Splunk Enterprise Security correlation searches and data inputs
+description:
+  - This module gathers the correlation searches, their notable event adaptive response parameters, the monitor
+    data inputs and the network data inputs of a Splunk Enterprise Security deployment in one pass.
+  - Each object is indexed by name and only holds the fields the other modules of this role manage, along with
+    its C(updated) timestamp.
+  - In incremental mode only the entries whose C(updated) timestamp is newer than the I(since) watermark are
+    fetched again, the rest are carried over from the I(previous) facts.
+version_added: "2.8"
+options:
+  gather_subset:
+    description:
+      - Which objects to gather.
+    type: list
+    required: false
+    default: [ "all" ]
+    choices: [ "all", "correlation_searches", "notable_events", "monitor_inputs", "network_inputs" ]
+  app:
+    description:
+      - Splunk app whose correlation searches are gathered
+    type: str
+    required: false
+    default: "SplunkEnterpriseSecuritySuite"
+  since:
+    description:
+      - Watermark returned as C(watermark) by an earlier run. When set only the entries updated after it are
+        fetched again, the collections themselves are still listed to find new and removed entries.
+    type: str
+    required: false
+  previous:
+    description:
+      - The C(splunk_es) facts of the run that returned I(since). Entries that did not change since then are
+        copied from here, without it the indexes only hold the entries that changed.
+    type: dict
+    required: false
+
+extends_documentation_fragment:
+  - splunk
+  - splunk.snapshot_cache
+
+author: "Ansible Security Automation Team (https://github.com/ansible-security)"
+'''
+
+EXAMPLES = '''
+- name: gather the Splunk ES inventory
+  splunk_es_facts:
+
+- name: list the real-time correlation searches
+  debug:
+    msg: "{{ ansible_facts.splunk_es.correlation_searches | dict2items
+             | selectattr('value.realtime_schedule', 'equalto', true) | map(attribute='key') | list }}"
+
+- name: refresh the inventory, only fetching what changed since the last run
+  splunk_es_facts:
+    since: "{{ ansible_facts.splunk_es.watermark }}"
+    previous: "{{ ansible_facts.splunk_es }}"
+'''
+
+RETURN = '''
+ansible_facts:
+  description: Facts gathered from Splunk
+  returned: always
+  type: complex
+  contains:
+    splunk_es:
+      description: Compact index of the gathered objects
+      returned: always
+      type: complex
+      contains:
+        correlation_searches:
+          description: Correlation searches keyed by name, without their notable event parameters
+          returned: when gathered
+          type: dict
+          sample: {"Excessive Failed Logins": {"search": "| tstats ...", "cron_schedule": "*/5 * * * *", "updated": "2019-05-08T10:39:30-04:00"}}
+        notable_events:
+          description: Notable event adaptive response parameters keyed by correlation search name, without the action.notable.param. prefix
+          returned: when gathered
+          type: dict
+          sample: {"Excessive Failed Logins": {"rule_title": "Excessive Failed Logins", "severity": "medium"}}
+        monitor_inputs:
+          description: Monitor data inputs keyed by path
+          returned: when gathered
+          type: dict
+          sample: {"/var/log/messages": {"index": "os", "sourcetype": "syslog"}}
+        network_inputs:
+          description: Network data inputs keyed by C(tcp/raw/name), C(tcp/cooked/name) or C(udp/name)
+          returned: when gathered
+          type: dict
+          sample: {"tcp/raw/9001": {"index": "network", "disabled": false}}
+        watermark:
+          description: Newest C(updated) timestamp seen, to pass back as I(since)
+          returned: always
+          type: str
+        refetched:
+          description: Number of entries fetched again in incremental mode
+          returned: always
+          type: int
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+
+from ansible.module_utils.six.moves.urllib.parse import quote_plus
+from ansible.module_utils.splunk import SplunkRequest, splunk_request_argspec, updated_epoch, CORRELATION_SEARCH_FIELDS, MONITOR_INPUT_FIELDS, NETWORK_INPUT_FIELDS
+
+NOTABLE_PARAM_PREFIX = 'action.notable.param.'
+
+# Network input collections under data/inputs, splunkd keeps udp inputs in a
+# single collection. A collection splunkd doesn't have is gathered as empty
+NETWORK_INPUT_COLLECTIONS = ['tcp/raw', 'tcp/cooked', 'udp']
+
+
+def compact(entry):
+    """
+    The content of an entry without splunkd's own eai: keys, along with the
+    entry updated timestamp
+    """
+    item = dict((key, value) for key, value in entry['content'].items() if not key.startswith('eai:'))
+    item['updated'] = entry.get('updated')
+    return item
+
+
+def gather(splunk_request, rest_path, fields, since, previous, missing_ok=False):
+    """
+    Compact items of a collection keyed by entry name and the number of
+    entries read from splunkd. Without a since watermark the whole collection
+    is read, otherwise only the entries updated after it while the others
+    are copied from previous. With missing_ok a collection splunkd doesn't
+    have is empty
+    """
+    splunk_request.fields = fields
+
+    if since is None:
+        entries = splunk_request.get_snapshot(rest_path, missing_ok=missing_ok)
+        return dict((name, compact(entries[name])) for name in entries), len(entries)
+
+    items = {}
+    refetched = 0
+    # The field filter matches no content key, leaving only the entry name
+    # and updated timestamp in the listing
+    for entry in splunk_request.iter_collection(rest_path, query={'f': 'updated'}, missing_ok=missing_ok):
+        name = entry['name']
+        updated = updated_epoch(entry.get('updated'))
+        # updated only has a one second resolution, entries updated in the
+        # same second as the watermark are fetched again to be safe
+        if updated is not None and updated < since:
+            if name in previous:
+                items[name] = previous[name]
+            continue
+        response = splunk_request.get_by_path('{0}/{1}'.format(rest_path, quote_plus(name)), fields=fields)
+        if response:
+            items[name] = compact(response['entry'][0])
+            refetched += 1
+    return items, refetched
+
+
+def main():
+
+    argspec = dict(
+        gather_subset=dict(
+            type='list', required=False, default=['all'],
+            choices=['all', 'correlation_searches', 'notable_events', 'monitor_inputs', 'network_inputs']
+        ),
+        app=dict(type='str', required=False, default='SplunkEnterpriseSecuritySuite'),
+        since=dict(type='str', required=False),
+        previous=dict(type='dict', required=False),
+    )
+
+    argspec.update(splunk_request_argspec())
+    # Facts never carry splunk_data and every search head cluster member
+    # reports the same objects
+    del argspec['return_content']
+    del argspec['shc_captain_only']
+
+    module = AnsibleModule(
+        argument_spec=argspec,
+        supports_check_mode=True
+    )
+
+    splunk_request = SplunkRequest(module)
+
+    subset = set(module.params['gather_subset'])
+    if 'all' in subset:
+        subset = set(['correlation_searches', 'notable_events', 'monitor_inputs', 'network_inputs'])
+
+    since = None
+    if module.params['since']:
+        since = updated_epoch(module.params['since'])
+        if since is None:
+            module.fail_json(msg="Unable to parse since watermark: {0}".format(module.params['since']))
+
+    previous = module.params['previous'] or {}
+    facts = {}
+    refetched = 0
+
+    if subset & set(['correlation_searches', 'notable_events']):
+        # Put the notable params back on the searches they were split from
+        previous_searches = {}
+        for name, item in (previous.get('correlation_searches') or {}).items():
+            previous_searches[name] = dict(item)
+            for key, value in ((previous.get('notable_events') or {}).get(name) or {}).items():
+                previous_searches[name][NOTABLE_PARAM_PREFIX + key] = value
+
+        searches, count = gather(
+            splunk_request,
+            'servicesNS/nobody/{0}/saved/searches'.format(quote_plus(module.params['app'])),
+            CORRELATION_SEARCH_FIELDS + ['disabled'],
+            since,
+            previous_searches,
+        )
+        refetched += count
+
+        correlation_searches = {}
+        notable_events = {}
+        for name, item in searches.items():
+            if str(item.get('action.correlationsearch.enabled')).lower() not in ('1', 'true'):
+                continue
+            correlation_searches[name] = dict(
+                (key, value) for key, value in item.items() if not key.startswith(NOTABLE_PARAM_PREFIX)
+            )
+            if 'notable' in [action.strip() for action in (item.get('actions') or '').split(',')]:
+                notable_events[name] = dict(
+                    (key[len(NOTABLE_PARAM_PREFIX):], value) for key, value in item.items()
+                    if key.startswith(NOTABLE_PARAM_PREFIX)
+                )
+
+        if 'correlation_searches' in subset:
+            facts['correlation_searches'] = correlation_searches
+        if 'notable_events' in subset:
+            facts['notable_events'] = notable_events
+
+    if 'monitor_inputs' in subset:
+        facts['monitor_inputs'], count = gather(
+            splunk_request,
+            'servicesNS/nobody/search/data/inputs/monitor',
+            MONITOR_INPUT_FIELDS,
+            since,
+            previous.get('monitor_inputs') or {},
+        )
+        refetched += count
+
+    if 'network_inputs' in subset:
+        facts['network_inputs'] = {}
+        for collection in NETWORK_INPUT_COLLECTIONS:
+            prefix = '{0}/'.format(collection)
+            previous_inputs = dict(
+                (key[len(prefix):], item) for key, item in (previous.get('network_inputs') or {}).items()
+                if key.startswith(prefix)
+            )
+            inputs, count = gather(
+                splunk_request,
+                'servicesNS/nobody/search/data/inputs/{0}'.format(collection),
+                NETWORK_INPUT_FIELDS,
+                since,
+                previous_inputs,
+                missing_ok=True,
+            )
+            refetched += count
+            for name, item in inputs.items():
+                facts['network_inputs'][prefix + name] = item
+
+    # The newest updated timestamp seen becomes the watermark of the next run
+    watermark = module.params['since']
+    for index in facts.values():
+        for item in index.values():
+            updated = updated_epoch(item.get('updated'))
+            if updated is not None and (watermark is None or updated > updated_epoch(watermark)):
+                watermark = item['updated']
+
+    facts['watermark'] = watermark
+    facts['refetched'] = refetched
+
+    module.exit_json(changed=False, ansible_facts={'splunk_es': facts}, **splunk_request.metrics_content())
+
+if __name__ == '__main__':
+    main()
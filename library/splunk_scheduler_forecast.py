@@ -0,0 +1,341 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'community'}
+
+
+DOCUMENTATION = '''
+---
+module: splunk_scheduler_forecast
+short_description: Forecast the skipped searches of the Splunk search scheduler
+description:
+  - This module reads the schedule of every correlation search, or every scheduled search, along with the run
+    durations of their recent jobs, and plays a day of the search scheduler against its concurrency limit.
+  - It reports the share of runs the scheduler would skip and the searches taking up the most search slot time, so
+    capacity problems show before searches are added rather than in production. Nothing is changed on Splunk.
+version_added: "2.8"
+options:
+  scope:
+    description:
+      - C(correlation) forecasts the correlation searches of the Splunk Enterprise Security app, C(scheduled) every
+        enabled scheduled search of every app, which all share the same scheduler.
+    type: str
+    required: false
+    default: correlation
+    choices: ['correlation', 'scheduled']
+  concurrency_limit:
+    description:
+      - Number of scheduled searches splunkd runs at once. Defaults to the limit of the host as C(limits.conf) sets
+        it by default, half of 6 plus one search per CPU core of C(server/info).
+    type: int
+    required: false
+  run_duration_percentile:
+    description:
+      - Percentile of the run durations of the recent jobs of a search taken as its run duration.
+    type: int
+    required: false
+    default: 90
+  default_run_duration:
+    description:
+      - Run duration in seconds of the searches that have no recent job to take it from.
+    type: float
+    required: false
+    default: 30
+  additional_searches:
+    description:
+      - Searches about to be added, forecast along with the existing ones. A search of the same name replaces the
+        existing one, to forecast a schedule change.
+    type: list
+    elements: dict
+    required: false
+    suboptions:
+      name:
+        description:
+          - Name of the search.
+        type: str
+        required: true
+      cron_schedule:
+        description:
+          - Cron schedule of the search.
+        type: str
+        required: false
+        default: "*/5 * * * *"
+      scheduling:
+        description:
+          - C(real-time) runs are skipped when no slot frees up in time, C(continuous) ones wait for a slot.
+        type: str
+        required: false
+        default: real-time
+        choices: ['real-time', 'continuous']
+      schedule_window:
+        description:
+          - Minutes a run may be pushed back while the scheduler is busy, or C(auto).
+        type: str
+        required: false
+        default: "0"
+      schedule_priority:
+        description:
+          - Priority of the search over the others due at the same time.
+        type: str
+        required: false
+        default: Default
+        choices: ['Default', 'Higher', 'Highest']
+      run_duration:
+        description:
+          - Expected run duration in seconds, I(default_run_duration) when not set.
+        type: float
+        required: false
+  top:
+    description:
+      - Number of searches listed in C(offenders).
+    type: int
+    required: false
+    default: 10
+  max_skip_ratio:
+    description:
+      - Fail when the forecast skip ratio is above this share of the runs, to hold off a deployment that would get
+        searches skipped.
+    type: float
+    required: false
+  shc_captain_only:
+    description:
+      - Only act when the host is the captain of its search head cluster, the task is skipped on the other members.
+        The captain dispatches the scheduled searches of the whole cluster, so one forecast covers it.
+    type: bool
+    required: false
+    default: false
+
+extends_documentation_fragment:
+  - splunk
+
+author: "Ansible Security Automation Team (https://github.com/ansible-security)"
+'''
+
+EXAMPLES = '''
+- name: forecast the scheduler with the new correlation searches added
+  splunk_scheduler_forecast:
+    additional_searches: "{{ new_correlation_searches }}"
+    max_skip_ratio: 0.01
+  register: forecast
+
+- name: show the searches taking up the most scheduler time
+  debug:
+    var: forecast.offenders
+'''
+
+RETURN = '''
+skip_ratio:
+  description: Share of the runs of a day the scheduler would skip
+  returned: always
+  type: float
+  sample: 0.0421
+forecast:
+  description:
+    - Outcome of the day played, the concurrency limit used, the runs due, skipped and started late, the mean
+      delay of a run in seconds, the most searches running at once and the share of the search slot time used.
+  returned: always
+  type: dict
+  sample: {"limit": 11, "searches": 212, "runs": 51840, "skipped": 2183, "skip_ratio": 0.0421, "delayed": 8032,
+           "delay_mean": 6.3, "peak_running": 11, "utilization": 0.74}
+offenders:
+  description:
+    - The searches taking up the most search slot time over the day, with the run duration used, the number of
+      recent jobs it was taken from, their runs and skipped runs and their share of the slot time used.
+  returned: always
+  type: list
+  sample: [{"name": "Excessive Failed Logins", "cron_schedule": "*/5 * * * *", "schedule_priority": "default",
+            "realtime_schedule": true, "schedule_window": 0, "run_duration": 41.2, "history": 12, "runs": 288,
+            "skipped": 31, "slot_seconds": 10587.2, "slot_share": 0.1152}]
+splunk_metrics:
+  description:
+    - Number, latency and size of the REST requests the module made
+  returned: when I(request_metrics=true)
+  type: dict
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+
+from ansible.module_utils._text import to_text
+from ansible.module_utils.splunk import SplunkRequest, splunk_request_argspec
+from ansible.module_utils.splunk_schedule import simulate_scheduler, stagger_window, parse_cron
+
+import math
+
+# limits.conf defaults the scheduler limit derives from: base_max_searches,
+# max_searches_per_cpu and max_searches_perc
+BASE_MAX_SEARCHES = 6
+MAX_SEARCHES_PER_CPU = 1
+MAX_SEARCHES_PERC = 50
+
+# Saved search settings the forecast needs
+SCHEDULE_FIELDS = [
+    'action.correlationsearch.enabled', 'cron_schedule', 'disabled', 'is_scheduled',
+    'realtime_schedule', 'schedule_priority', 'schedule_window',
+]
+
+
+def is_true(value):
+    return to_text(value).strip().lower() in ('1', 'true', 't', 'yes', 'y', 'on')
+
+
+def window_minutes(window, cron_schedule):
+    """
+    Minutes of a schedule_window, auto lets the scheduler pick one from the
+    interval of the search
+    """
+    if to_text(window).strip().lower() == 'auto':
+        return stagger_window(cron_schedule) or 0
+    try:
+        return max(0, int(window))
+    except (TypeError, ValueError):
+        return 0
+
+
+def run_duration(durations, percentile, default):
+    """
+    Nearest rank percentile of the run durations of the recent jobs of a
+    search, default without any
+    """
+    if not durations:
+        return default
+    durations = sorted(durations)
+    rank = int(math.ceil(percentile / 100.0 * len(durations))) - 1
+    return durations[min(max(rank, 0), len(durations) - 1)]
+
+
+def concurrency_limit(splunk_request):
+    """
+    Scheduler concurrency limit of the host with the limits.conf defaults
+    """
+    info = splunk_request.get_by_path('services/server/info', fields=['numberOfVirtualCores', 'numberOfCores'])
+    content = info['entry'][0]['content'] if info and info.get('entry') else {}
+    cores = int(content.get('numberOfVirtualCores') or content.get('numberOfCores') or 1)
+    return max(1, (MAX_SEARCHES_PER_CPU * cores + BASE_MAX_SEARCHES) * MAX_SEARCHES_PERC // 100)
+
+
+def main():
+
+    argspec = dict(
+        scope=dict(type='str', required=False, default='correlation', choices=['correlation', 'scheduled']),
+        concurrency_limit=dict(type='int', required=False),
+        run_duration_percentile=dict(type='int', required=False, default=90),
+        default_run_duration=dict(type='float', required=False, default=30),
+        additional_searches=dict(type='list', elements='dict', required=False, options=dict(
+            name=dict(type='str', required=True),
+            cron_schedule=dict(type='str', required=False, default='*/5 * * * *'),
+            scheduling=dict(type='str', required=False, default='real-time', choices=['real-time', 'continuous']),
+            schedule_window=dict(type='str', required=False, default='0'),
+            schedule_priority=dict(type='str', required=False, default='Default', choices=['Default', 'Higher', 'Highest']),
+            run_duration=dict(type='float', required=False),
+        )),
+        top=dict(type='int', required=False, default=10),
+        max_skip_ratio=dict(type='float', required=False),
+    )
+
+    request_argspec = splunk_request_argspec()
+    # Collections are only listed once, there is no snapshot to cache or
+    # splunk_data to return
+    for key in ('snapshot_cache_dir', 'snapshot_cache_ttl', 'snapshot_cache_max_size', 'return_content'):
+        del request_argspec[key]
+    argspec.update(request_argspec)
+
+    module = AnsibleModule(
+        argument_spec=argspec,
+        supports_check_mode=True
+    )
+
+    splunk_request = SplunkRequest(module)
+
+    if module.params['scope'] == 'correlation':
+        rest_path = 'servicesNS/nobody/SplunkEnterpriseSecuritySuite/saved/searches'
+    else:
+        rest_path = 'servicesNS/-/-/saved/searches'
+
+    searches = {}
+    for entry in splunk_request.iter_collection(rest_path, fields=SCHEDULE_FIELDS):
+        content = entry['content']
+        if not is_true(content.get('is_scheduled')) or is_true(content.get('disabled')):
+            continue
+        if module.params['scope'] == 'correlation' and not is_true(content.get('action.correlationsearch.enabled')):
+            continue
+        searches[entry['name']] = dict(
+            name=entry['name'],
+            cron_schedule=content.get('cron_schedule'),
+            schedule_priority=to_text(content.get('schedule_priority') or 'default').lower(),
+            realtime_schedule=is_true(content.get('realtime_schedule', True)),
+            schedule_window=window_minutes(content.get('schedule_window'), content.get('cron_schedule')),
+            run_duration=None,
+        )
+
+    for search in module.params['additional_searches'] or []:
+        searches[search['name']] = dict(
+            name=search['name'],
+            cron_schedule=search['cron_schedule'],
+            schedule_priority=search['schedule_priority'].lower(),
+            realtime_schedule=search['scheduling'] == 'real-time',
+            schedule_window=window_minutes(search['schedule_window'], search['cron_schedule']),
+            run_duration=search['run_duration'],
+        )
+
+    # The jobs splunkd still keeps are the dispatch history of every search,
+    # one listing of them all instead of the history of each search
+    durations = {}
+    for entry in splunk_request.iter_collection('services/search/jobs', fields=['label', 'runDuration', 'isDone']):
+        content = entry['content']
+        if content.get('label') in searches and is_true(content.get('isDone')) and content.get('runDuration') is not None:
+            durations.setdefault(content['label'], []).append(float(content['runDuration']))
+
+    for name, search in searches.items():
+        search['history'] = len(durations.get(name, []))
+        if search['run_duration'] is None:
+            search['run_duration'] = run_duration(
+                durations.get(name), module.params['run_duration_percentile'], module.params['default_run_duration']
+            )
+
+    unreadable = sorted(name for name in searches if parse_cron(searches[name]['cron_schedule']) is None)
+    if unreadable:
+        module.warn("The cron_schedule of {0} can't be read, they are left out of the forecast.".format(', '.join(unreadable)))
+
+    limit = module.params['concurrency_limit'] or concurrency_limit(splunk_request)
+    ordered = [searches[name] for name in sorted(searches)]
+    outcome = simulate_scheduler(ordered, limit)
+
+    slot_seconds = {}
+    for search in ordered:
+        slot_seconds[search['name']] = outcome['searches'][search['name']]['started'] * search['run_duration']
+    total = sum(slot_seconds.values())
+
+    offenders = []
+    for name in sorted(slot_seconds, key=lambda name: (-slot_seconds[name], name))[:module.params['top']]:
+        offender = dict(searches[name])
+        offender.update(
+            runs=outcome['searches'][name]['runs'],
+            skipped=outcome['searches'][name]['skipped'],
+            slot_seconds=round(slot_seconds[name], 2),
+            slot_share=round(slot_seconds[name] / total, 4) if total else 0.0,
+        )
+        offenders.append(offender)
+
+    forecast = dict((key, value) for key, value in outcome.items() if key != 'searches')
+    forecast['searches'] = len(ordered)
+    result = dict(skip_ratio=outcome['skip_ratio'], forecast=forecast, offenders=offenders)
+    result.update(splunk_request.metrics_content())
+
+    if module.params['max_skip_ratio'] is not None and outcome['skip_ratio'] > module.params['max_skip_ratio']:
+        module.fail_json(msg="Forecast skip ratio {0:.2%} is above {1:.2%}.".format(outcome['skip_ratio'], module.params['max_skip_ratio']),
+                         **result)
+
+    module.exit_json(changed=False, msg="{0} of {1} runs skipped at a concurrency limit of {2}.".format(
+        outcome['skipped'], outcome['runs'], limit), **result)
+
+if __name__ == '__main__':
+    main()
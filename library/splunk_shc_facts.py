@@ -0,0 +1,112 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'community'}
+
+
+DOCUMENTATION = '''
+---
+module: splunk_shc_facts
+short_description: Gather the layout of the Splunk search head cluster a host belongs to
+description:
+  - This module gathers the captain and the members of the search head cluster the host is a member of, and
+    whether the host is the captain.
+  - Configuration written on any member is replicated to the others, run the list modules on the captain only
+    and M(splunk_wait_for_replication) on the other members instead of writing to every member.
+version_added: "2.8"
+options:
+
+extends_documentation_fragment:
+  - splunk
+
+author: "Ansible Security Automation Team (https://github.com/ansible-security)"
+'''
+
+EXAMPLES = '''
+- name: find the search head cluster captain
+  splunk_shc_facts:
+
+- name: write the monitor inputs once, on the captain
+  splunk_data_input_monitors:
+    inputs: "{{ monitor_inputs }}"
+  when: ansible_facts.splunk_shc.is_captain
+'''
+
+RETURN = '''
+ansible_facts:
+  description: Facts gathered from Splunk
+  returned: always
+  type: complex
+  contains:
+    splunk_shc:
+      description: Layout of the search head cluster
+      returned: always
+      type: complex
+      contains:
+        clustered:
+          description: If the host is a search head cluster member, the other facts are only set when it is
+          returned: always
+          type: bool
+        is_captain:
+          description: If the host is the captain
+          returned: always
+          type: bool
+        label:
+          description: Label of the host in the cluster
+          returned: when clustered
+          type: str
+        mgmt_uri:
+          description: Management uri of the host
+          returned: when clustered
+          type: str
+        captain:
+          description: Label and management uri of the captain
+          returned: when clustered
+          type: dict
+          sample: {"label": "sh1", "mgmt_uri": "https://sh1.example.com:8089"}
+        members:
+          description: Label, management uri and status of every member
+          returned: when clustered
+          type: list
+          sample: [{"label": "sh1", "mgmt_uri": "https://sh1.example.com:8089", "status": "Up"}]
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+
+from ansible.module_utils.splunk import SplunkRequest, splunk_request_argspec
+
+
+def main():
+
+    argspec = splunk_request_argspec()
+    # Only the cluster status is read, there is no collection to snapshot or
+    # splunk_data to return and every member reports the same layout
+    for key in ('snapshot_cache_dir', 'snapshot_cache_ttl', 'snapshot_cache_max_size', 'return_content', 'shc_captain_only'):
+        del argspec[key]
+
+    module = AnsibleModule(
+        argument_spec=argspec,
+        supports_check_mode=True
+    )
+
+    splunk_request = SplunkRequest(module)
+
+    shc = splunk_request.shc_status()
+    if shc is None:
+        facts = {'clustered': False, 'is_captain': False}
+    else:
+        facts = dict(shc, clustered=True)
+
+    module.exit_json(changed=False, ansible_facts={'splunk_shc': facts}, **splunk_request.metrics_content())
+
+if __name__ == '__main__':
+    main()
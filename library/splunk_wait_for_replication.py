@@ -0,0 +1,165 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'community'}
+
+
+DOCUMENTATION = '''
+---
+module: splunk_wait_for_replication
+short_description: Wait for changes made on the search head cluster captain to reach a member
+description:
+  - This module waits until the objects written by M(splunk_correlation_searches), M(splunk_data_input_monitors)
+    or M(splunk_data_input_networks) on the search head cluster captain show up on the member it runs against.
+  - Each poll lists the collections involved, one request per collection with a field filter on the fields that
+    were written. An object has replicated once the values it holds on the member for those fields hash to the
+    fingerprint they got on the captain, a deleted object once it is gone. Only configuration is compared, so the
+    members' clocks don't need to be in sync.
+  - Run it against every member at once, the forks spread the reads over the cluster.
+version_added: "2.8"
+options:
+  written:
+    description:
+      - The C(written) result of the list module that made the changes, the fields each object was sent and the
+        fingerprint of the values they got on the captain by collection rest path and object name, C(null) for
+        deleted objects.
+    type: dict
+    required: true
+  timeout:
+    description:
+      - Number of seconds to wait for before failing.
+    type: int
+    required: false
+    default: 300
+  poll_interval:
+    description:
+      - Number of seconds between two polls.
+    type: float
+    required: false
+    default: 2
+
+extends_documentation_fragment:
+  - splunk
+
+author: "Ansible Security Automation Team (https://github.com/ansible-security)"
+'''
+
+EXAMPLES = '''
+- name: find the search head cluster captain
+  splunk_shc_facts:
+
+- name: write the monitor inputs once, on the captain
+  splunk_data_input_monitors:
+    inputs: "{{ monitor_inputs }}"
+  when: ansible_facts.splunk_shc.is_captain
+  register: monitors
+
+- name: wait for the other members to catch up
+  splunk_wait_for_replication:
+    written: "{{ (ansible_play_hosts | map('extract', hostvars)
+                 | selectattr('ansible_facts.splunk_shc.is_captain') | first).monitors.written }}"
+  when: not ansible_facts.splunk_shc.is_captain
+'''
+
+RETURN = '''
+polls:
+  description: Number of polls made
+  returned: always
+  type: int
+waited:
+  description: Number of seconds waited
+  returned: always
+  type: float
+pending:
+  description: Objects that had not replicated yet when the timeout was hit, by collection rest path
+  returned: on failure
+  type: dict
+  sample: {"servicesNS/nobody/search/data/inputs/monitor": ["/var/log/messages"]}
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+
+from ansible.module_utils.splunk import SplunkRequest, splunk_request_argspec, content_fingerprint
+
+import time
+
+
+def replicated(entries, name, written):
+    """
+    If the listing entries of a member, entry name to content, show the
+    change the captain wrote to an object, written holding the fields it
+    was sent and the fingerprint of their values or None for a deletion
+    """
+    if written is None:
+        return name not in entries
+    if name not in entries:
+        return False
+    return content_fingerprint(entries[name], written['fields']) == written['fingerprint']
+
+
+def main():
+
+    argspec = dict(
+        written=dict(type='dict', required=True),
+        timeout=dict(type='int', required=False, default=300),
+        poll_interval=dict(type='float', required=False, default=2),
+    )
+
+    argspec.update(splunk_request_argspec())
+    # Every poll has to reach splunkd, there is no collection to snapshot or
+    # splunk_data to return and the captain has nothing to wait for
+    for key in ('snapshot_cache_dir', 'snapshot_cache_ttl', 'snapshot_cache_max_size', 'return_content', 'shc_captain_only'):
+        del argspec[key]
+
+    module = AnsibleModule(
+        argument_spec=argspec,
+        supports_check_mode=True
+    )
+
+    splunk_request = SplunkRequest(module)
+
+    pending = dict(
+        (rest_path, dict(objects)) for rest_path, objects in (module.params['written'] or {}).items() if objects
+    )
+    start = time.time()
+    polls = 0
+    while True:
+        polls += 1
+        for rest_path in list(pending):
+            # Only the fields written to the objects still pending are read,
+            # deletions alone only need the entry names and get a filter
+            # matching no content key
+            fields = sorted(set(
+                field for written in pending[rest_path].values() if written is not None for field in written['fields']
+            ))
+            entries = dict(
+                (entry['name'], entry.get('content') or {})
+                for entry in splunk_request.iter_collection(rest_path, fields=fields or ['updated'])
+            )
+            for name, updated in list(pending[rest_path].items()):
+                if replicated(entries, name, updated):
+                    del pending[rest_path][name]
+            if not pending[rest_path]:
+                del pending[rest_path]
+
+        waited = round(time.time() - start, 3)
+        if not pending:
+            module.exit_json(changed=False, msg="Replicated.", polls=polls, waited=waited,
+                             **splunk_request.metrics_content())
+        if waited + module.params['poll_interval'] > module.params['timeout']:
+            module.fail_json(msg="Timed out waiting for replication.", polls=polls, waited=waited,
+                             pending=dict((rest_path, sorted(pending[rest_path])) for rest_path in pending),
+                             **splunk_request.metrics_content())
+        time.sleep(module.params['poll_interval'])
+
+if __name__ == '__main__':
+    main()
@@ -4,14 +4,26 @@
 # (c) 2018, Adam Miller (admiller@redhat.com)
 # GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
 
-from ansible.module_utils.urls import CertificateError
-from ansible.module_utils.six.moves.urllib.parse import urlencode, quote_plus
+from ansible.module_utils.six.moves.urllib.parse import urlencode, quote_plus, unquote_plus, parse_qs
 from ansible.module_utils.connection import ConnectionError
-from ansible.module_utils.six.moves.urllib.error import HTTPError
 from ansible.module_utils.connection import Connection
-from ansible.module_utils._text import to_text
+from ansible.module_utils._text import to_bytes, to_text
 
+import hashlib
 import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+
+# ansible.module_utils.urls only re-exports this class, taking it from ssl
+# keeps urls and everything it imports out of every module payload
+try:
+    from ssl import CertificateError
+except ImportError:
+    CertificateError = ValueError
 
 def parse_splunk_args(module):
     """
@@ -33,11 +45,491 @@ def parse_splunk_args(module):
     except TypeError as e:
         module.fail_json(msg="Invalid data type provided for splunk module_util.parse_splunk_args: {0}".format(e))
 
+def splunk_request_argspec():
+    """
+    Argument specification of the options consumed by SplunkRequest itself,
+    merged into the argspec of every module
+    """
+    return dict(
+        snapshot_cache_dir=dict(type='path', required=False),
+        snapshot_cache_ttl=dict(type='int', required=False, default=300),
+        snapshot_cache_max_size=dict(type='int', required=False, default=100),
+        request_concurrency=dict(type='int', required=False, default=1),
+        request_rate_limit=dict(type='float', required=False, default=0),
+        return_content=dict(type='str', required=False, default='full', choices=['full', 'changed_fields', 'none']),
+        request_metrics=dict(type='bool', required=False, default=False),
+        request_metrics_log=dict(type='path', required=False),
+        request_retries=dict(type='int', required=False, default=3),
+        request_retry_delay=dict(type='float', required=False, default=1.0),
+        host_request_rate_limit=dict(type='float', required=False, default=0),
+        host_request_concurrency=dict(type='int', required=False, default=0),
+        host_limits_dir=dict(type='path', required=False),
+        shc_captain_only=dict(type='bool', required=False, default=False),
+    )
+
+# Keys splunkd returns as booleans no matter if they were sent as True, "1"
+# or "true"
+BOOLEAN_FIELDS = frozenset([
+    'action.correlationsearch.enabled', 'alert.suppress', 'check-path', 'check_indexed',
+    'disabled', 'dispatch.rt_backfill', 'followTail', 'is_scheduled', 'realtime_schedule',
+    'recursive', 'ssl',
+])
+
+# Enum keys whose casing differs between the module choices and splunkd
+CASE_INSENSITIVE_FIELDS = frozenset([
+    'action.notable.param.default_status', 'action.notable.param.security_domain',
+    'action.notable.param.severity', 'alert_comparator', 'alert_type', 'connection_host',
+    'schedule_priority',
+])
+
+# Keys holding a comma separated list whose order and spacing splunkd and
+# the modules don't agree on
+COMMA_LIST_FIELDS = frozenset([
+    'action.notable.param.recommended_actions', 'actions',
+])
+
+def _to_boolean(value):
+    text = to_text(value).strip().lower()
+    if text in ('1', 'true', 't', 'yes', 'y', 'on'):
+        return True
+    if text in ('0', 'false', 'f', 'no', 'n', 'off', '', 'none'):
+        return False
+    return text
+
+def _to_list(value):
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        items = value
+    else:
+        # List values reach splunkd either as json or as the python repr that
+        # urlencode makes of a list
+        text = to_text(value).strip()
+        try:
+            items = json.loads(text)
+        except ValueError:
+            items = None
+        if not isinstance(items, list):
+            items = text.strip('[]').split(',')
+    return sorted(set(to_text(item).strip().strip('\'"') for item in items) - set(['']))
+
+def _values_differ(key, current, desired):
+    """
+    Compare a value splunkd returned against the one a module would send once
+    both are canonicalized, so booleans, integers, lists and enum casing that
+    only differ in representation don't count as a change
+    """
+    if key in BOOLEAN_FIELDS or isinstance(current, bool) or isinstance(desired, bool):
+        return _to_boolean(current) != _to_boolean(desired)
+
+    if key in COMMA_LIST_FIELDS or isinstance(current, (list, tuple)) or isinstance(desired, (list, tuple)):
+        return _to_list(current) != _to_list(desired)
+
+    if isinstance(current, (int, float)) or isinstance(desired, (int, float)):
+        try:
+            return float(current) != float(desired)
+        except (TypeError, ValueError):
+            pass
+
+    current = u'' if current is None else to_text(current).strip()
+    desired = u'' if desired is None else to_text(desired).strip()
+    if key in CASE_INSENSITIVE_FIELDS:
+        return current.lower() != desired.lower()
+    return current != desired
+
+def updated_epoch(updated):
+    """
+    Seconds since the epoch of the updated timestamp of an entry, such as
+    2019-05-08T10:39:30-04:00, None when it can't be parsed
+    """
+    import calendar
+
+    text = to_text(updated or '').strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+
+    match = re.match(r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(\.\d+)?(Z|[+-]\d{2}:?\d{2})?$', text)
+    if not match:
+        return None
+
+    epoch = calendar.timegm(time.strptime(match.group(1), '%Y-%m-%dT%H:%M:%S'))
+    if match.group(2):
+        epoch += float(match.group(2))
+    offset = match.group(3)
+    if offset and offset != 'Z':
+        digits = offset[1:].replace(':', '')
+        seconds = int(digits[:2]) * 3600 + int(digits[2:]) * 60
+        epoch -= seconds if offset[0] == '+' else -seconds
+    return epoch
+
+def entry_updated(response):
+    """
+    The updated timestamp of the entry splunkd answered a write with, None
+    when the response holds no entry
+    """
+    entries = response.get('entry') if isinstance(response, dict) else None
+    return entries[0].get('updated') if entries else None
+
+def diff_content(content, data):
+    """
+    Compare the REST data a module wants to send against the content of an
+    existing entry, returning the keys that differ with their before and
+    after values. Keys splunkd did not return are left out and values are
+    canonicalized before they are compared.
+
+    A content of None stands for an entry about to be created and a data of
+    None for an entry about to be deleted
+    """
+    changes = {}
+    if data is None:
+        for key in content:
+            changes[key] = {'before': content[key], 'after': None}
+        return changes
+
+    for key in data:
+        if content is None:
+            changes[key] = {'before': None, 'after': data[key]}
+        elif key in content and _values_differ(key, content[key], data[key]):
+            changes[key] = {'before': content[key], 'after': data[key]}
+    return changes
+
+# Saved search key the fingerprint of the desired state a module last wrote
+# is kept in. savedsearches.conf keeps any action.<name>.param.<key> setting
+# and it has no effect as long as the action isn't listed in actions
+FINGERPRINT_FIELD = 'action.ansible.param.fingerprint'
+
+# Seconds an entry may show as updated after the time stamped in its
+# fingerprint without counting as changed outside of Ansible. The time is
+# stamped right before every attempt to send the write, this only covers the
+# one second resolution of updated timestamps, the error on splunkd's clock
+# and the time splunkd takes to apply the write
+FINGERPRINT_GRACE = 10
+
+# The splunkd time part of FINGERPRINT_FIELD in an urlencoded payload
+FINGERPRINT_STAMP = re.compile(r'((?:^|&){0}=[0-9a-f]+%40)[0-9]+'.format(re.escape(FINGERPRINT_FIELD)))
+
+def fingerprint(data):
+    """
+    Stable hash of the REST data a module renders for an object, independent
+    of key order
+    """
+    return hashlib.sha256(to_bytes(json.dumps(data, sort_keys=True, default=to_text))).hexdigest()
+
+def content_fingerprint(content, fields):
+    """
+    Stable hash of the values an entry content holds for fields, as splunkd
+    renders them. Fields the content lacks hash as None
+    """
+    return fingerprint(dict((field, content.get(field)) for field in fields))
+
+def written_state(response, payload):
+    """
+    What a write looks like once it has replicated to the other members of a
+    search head cluster: the fields of its urlencoded payload and the
+    content_fingerprint of the entry splunkd answered it with over those
+    fields. Configuration replicates as is, so unlike the updated timestamps
+    of the members it doesn't depend on their clocks
+    """
+    fields = sorted(parse_qs(to_text(payload or ''), keep_blank_values=True))
+    entries = response.get('entry') if isinstance(response, dict) else None
+    content = (entries[0].get('content') or {}) if entries else {}
+    return dict(fields=fields, fingerprint=content_fingerprint(content, fields))
+
+def fingerprint_value(digest, written_at):
+    """
+    The FINGERPRINT_FIELD value stamping digest on an entry, along with the
+    splunkd time it is written at
+    """
+    return '{0}@{1}'.format(digest, int(written_at))
+
+def fingerprint_matches(entry, digest):
+    """
+    True when an entry carries the fingerprint digest and was not updated
+    since the fingerprint was written, meaning it is still in the desired
+    state digest was computed from
+    """
+    value = to_text(entry.get('content', {}).get(FINGERPRINT_FIELD) or '')
+    stored, _, written_at = value.partition('@')
+    if not stored or stored != digest:
+        return False
+    try:
+        written_at = float(written_at)
+    except ValueError:
+        return False
+    updated = updated_epoch(entry.get('updated'))
+    return updated is not None and updated <= written_at + FINGERPRINT_GRACE
+
+def stamp_fingerprint(payload, written_at):
+    """
+    An urlencoded payload with the time of the fingerprint it carries, if
+    any, replaced by written_at
+    """
+    if not payload or FINGERPRINT_FIELD not in payload:
+        return payload
+    return FINGERPRINT_STAMP.sub(lambda match: '{0}{1}'.format(match.group(1), int(written_at)), to_text(payload))
+
+def fingerprint_changes(entry, digest, written_at):
+    """
+    The change of FINGERPRINT_FIELD stamping digest on entry, in the form
+    diff_content returns, empty when the entry already carries it. An entry
+    of None stands for an entry about to be created
+    """
+    if entry is not None and fingerprint_matches(entry, digest):
+        return {}
+    before = entry.get('content', {}).get(FINGERPRINT_FIELD) if entry else None
+    return {FINGERPRINT_FIELD: {'before': before, 'after': fingerprint_value(digest, written_at)}}
+
+class SplunkRequestError(Exception):
+    """
+    A request to splunkd failed, raised where the caller wants to handle the
+    error rather than fail the module
+    """
+    def __init__(self, msg, code=None):
+        super(SplunkRequestError, self).__init__(msg)
+        self.code = code
+
+# Status codes of a splunkd too busy to take a request, it did not act on it
+BUSY_CODES = frozenset([429, 503])
+
+# Status codes of a proxy that gave up on splunkd, which may have acted on it
+GATEWAY_CODES = frozenset([502, 504])
+
+# Longest wait in seconds between two attempts of a request
+RETRY_MAX_DELAY = 60
+
+# Headers of a request whose payload is a JSON document, such as a write to a
+# KV store collection, rather than urlencoded form data
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+def _retry_after(value):
+    """
+    Seconds a Retry-After header value asks to wait, given as a number of
+    seconds or an HTTP date, None when there is none or it can't be read
+    """
+    if not value:
+        return None
+    value = to_text(value).strip()
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    from email.utils import mktime_tz, parsedate_tz
+    date = parsedate_tz(value)
+    if date is None:
+        return None
+    return max(mktime_tz(date) - time.time(), 0)
+
+def _idempotent(method, payload):
+    """
+    If sending a request twice leaves splunkd the same as sending it once. A
+    POST naming the object creates it, any other write updates or deletes an
+    object that is already there
+    """
+    if method != 'POST':
+        return True
+    return 'name' not in parse_qs(to_text(payload or ''))
+
+class _AdaptiveLimit(object):
+    """
+    Cap on the requests in flight shared between threads, halved whenever
+    splunkd pushes back and raised by one again after as many successful
+    requests in a row as the cap, never above maximum
+    """
+    def __init__(self, maximum):
+        self.maximum = max(maximum, 1)
+        self.limit = self.maximum
+        self.active = 0
+        self.successes = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.active >= self.limit:
+                self.condition.wait()
+            self.active += 1
+
+    def release(self, busy):
+        with self.condition:
+            self.active -= 1
+            if busy:
+                self.limit = max(self.limit // 2, 1)
+                self.successes = 0
+            else:
+                self.successes += 1
+                if self.successes >= self.limit and self.limit < self.maximum:
+                    self.limit += 1
+                    self.successes = 0
+            self.condition.notify_all()
+
+class _Throttle(object):
+    """
+    Space out requests shared between threads so no more than rate of them
+    start every second, a rate of 0 means no limit
+    """
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.lock = threading.Lock()
+        self.next_start = 0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.time()
+            start = max(now, self.next_start)
+            self.next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+# Connections to the httpapi socket by socket path, the action plugins run
+# one module after the other in the same process and share them
+_CONNECTIONS = {}
+
+def _connection(socket_path):
+    if socket_path not in _CONNECTIONS:
+        _CONNECTIONS[socket_path] = Connection(socket_path)
+    return _CONNECTIONS[socket_path]
+
+# Options of the httpapi connection a direct session to splunkd is built from
+SESSION_OPTIONS = (
+    'host', 'port', 'remote_user', 'password', 'use_ssl', 'validate_certs', 'ca_path', 'client_cert',
+    'client_key', 'ciphers', 'use_proxy', 'persistent_command_timeout',
+)
+
+def _basic_auth(user, password):
+    import base64
+    return 'Basic {0}'.format(to_text(base64.b64encode(to_bytes('{0}:{1}'.format(user, password)))))
+
+class _DirectConnection(object):
+    """
+    Keep-alive HTTP(S) session straight to splunkd with the host and
+    credentials of the httpapi connection, sending requests the way the
+    splunk httpapi plugin does. ansible-connection answers the requests of
+    its socket one at a time, each worker of a batch gets one of these so
+    their requests are really in flight together.
+
+    The TLS options of the connection are honoured: certificate validation,
+    ca_path, the client certificate and key and ciphers. With use_proxy the
+    session goes through the proxy the environment names for splunkd, the
+    way the plugin's open_url does, tunnelling HTTPS with CONNECT
+    """
+    def __init__(self, options):
+        self.host = options['host']
+        self.use_ssl = bool(options.get('use_ssl'))
+        self.port = options.get('port') or (443 if self.use_ssl else 80)
+        self.validate_certs = options.get('validate_certs') is not False
+        self.ca_path = options.get('ca_path')
+        self.client_cert = options.get('client_cert')
+        self.client_key = options.get('client_key')
+        self.ciphers = options.get('ciphers')
+        self.timeout = options.get('persistent_command_timeout') or 30
+        self.headers = {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Authorization': _basic_auth(options['remote_user'], options['password']),
+        }
+        # Retry-After header of the last response, the persistent connection
+        # doesn't pass headers on
+        self.retry_after = None
+        self.proxy = self._proxy() if options.get('use_proxy') is not False else None
+        # Requests to a plain HTTP proxy carry the absolute url
+        self.prefix = ''
+        if self.proxy is not None and not self.use_ssl:
+            self.prefix = 'http://{0}:{1}'.format(self.host, self.port)
+        self.http = None
+
+    def _proxy(self):
+        """
+        (host, port, headers) of the proxy the environment names for
+        splunkd, None when there is none or splunkd bypasses it
+        """
+        from ansible.module_utils.six.moves.urllib.parse import urlsplit
+        from ansible.module_utils.six.moves.urllib.request import getproxies, proxy_bypass
+
+        url = getproxies().get('https' if self.use_ssl else 'http')
+        if not url or proxy_bypass(self.host):
+            return None
+        if '://' not in url:
+            url = 'http://' + url
+        parts = urlsplit(url)
+        headers = {}
+        if parts.username:
+            headers['Proxy-Authorization'] = _basic_auth(unquote_plus(parts.username), unquote_plus(parts.password or ''))
+        return parts.hostname, parts.port or 8080, headers
+
+    def _context(self):
+        import ssl
+        context = ssl.create_default_context(cafile=self.ca_path) if self.ca_path else ssl.create_default_context()
+        if not self.validate_certs:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        if self.client_cert:
+            context.load_cert_chain(self.client_cert, self.client_key)
+        if self.ciphers:
+            context.set_ciphers(':'.join(self.ciphers) if isinstance(self.ciphers, (list, tuple)) else self.ciphers)
+        return context
+
+    def _open(self):
+        from ansible.module_utils.six.moves import http_client
+        host, port = self.host, self.port
+        if self.proxy is not None:
+            host, port = self.proxy[0], self.proxy[1]
+        if not self.use_ssl:
+            http = http_client.HTTPConnection(host, port, timeout=self.timeout)
+        else:
+            http = http_client.HTTPSConnection(host, port, timeout=self.timeout, context=self._context())
+            if self.proxy is not None:
+                http.set_tunnel(self.host, self.port, headers=self.proxy[2])
+        return http
+
+    def send_request(self, method, path, payload=None, headers=None):
+        import socket
+        from ansible.module_utils.six.moves import http_client
+
+        body = to_bytes(payload) if payload else None
+        headers = dict(self.headers, **headers) if headers else self.headers
+        if self.prefix and self.proxy[2]:
+            headers = dict(headers, **self.proxy[2])
+        while True:
+            reused = self.http is not None
+            try:
+                if not reused:
+                    # A bad ca_path or client certificate fails here
+                    self.http = self._open()
+                self.http.request(method, self.prefix + path, body=body, headers=headers)
+                response = self.http.getresponse()
+                data = to_text(response.read())
+                self.retry_after = response.getheader('Retry-After')
+                break
+            except CertificateError:
+                self.close()
+                raise
+            except http_client.BadStatusLine:
+                # splunkd closed an idle keep-alive socket without reading
+                # the request, it is sent again on a new one
+                self.close()
+                if not reused:
+                    raise ConnectionError('splunkd closed the connection')
+            except (socket.error, http_client.HTTPException) as e:
+                self.close()
+                raise ConnectionError(to_text(e))
+
+        try:
+            return response.status, json.loads(data)
+        except ValueError:
+            return response.status, data
+
+    def close(self):
+        if self.http is not None:
+            self.http.close()
+            self.http = None
+
 class SplunkRequest(object):
-    def __init__(self, module, headers=None, keymap={}, not_rest_data_keys=[]):
+    def __init__(self, module, headers=None, keymap={}, not_rest_data_keys=[], fields=None):
 
         self.module = module
-        self.connection = Connection(self.module._socket_path)
+        self.connection = _connection(self.module._socket_path)
 
         # The Splunk REST API endpoints often use keys that aren't pythonic so
         # we need to handle that with a mapping to allow keys to be proper
@@ -46,19 +538,141 @@ class SplunkRequest(object):
 
         # This allows us to exclude specific argspec keys from being included by
         # the rest data that don't follow the splunk_* naming convention
-        self.not_rest_data_keys = not_rest_data_keys
+        self.not_rest_data_keys = list(not_rest_data_keys)
         self.not_rest_data_keys.append('validate_certs')
+        self.not_rest_data_keys.extend(splunk_request_argspec())
 
-    def _httpapi_error_handle(self, method, uri, payload=None):
+        # Content fields the module compares, entries are read with a field
+        # filter so splunkd only sends these back. The complete entries a
+        # module returns as splunk_data with return_content=full are read
+        # without one
+        self.fields = fields
+        if self.module.params.get('return_content', 'full') == 'full':
+            self.fields = None
 
-        try:
-            code, response = self.connection.send_request(method, uri, payload=payload)
-        except ConnectionError as e:
-            self.module.fail_json(msg="connection error occurred: {0}".format(e))
-        except CertificateError as e:
-            self.module.fail_json(msg="certificate error occurred: {0}".format(e))
-        except ValueError as e:
-            self.module.fail_json(msg="certificate not found: {0}".format(e))
+        # Opt-in controller side cache of collection snapshots
+        self.snapshot_cache = None
+        if self.module.params.get('snapshot_cache_dir'):
+            from ansible.module_utils.splunk_cache import SnapshotCache
+            self.snapshot_cache = SnapshotCache(
+                self.module.params['snapshot_cache_dir'],
+                ttl=self.module.params['snapshot_cache_ttl'],
+                max_size=self.module.params['snapshot_cache_max_size'] * 1024 * 1024,
+            )
+        self._host = None
+        self._options = None
+
+        # Opt-in limits on the requests to the host shared with every other
+        # module running on the controller
+        self.host_limiter = None
+        if self.module.params.get('host_request_rate_limit') or self.module.params.get('host_request_concurrency'):
+            from ansible.module_utils.splunk_limits import HostLimiter
+            self.host_limiter = HostLimiter(
+                self.module.params.get('host_limits_dir')
+                or os.path.join(tempfile.gettempdir(), 'ansible-splunk-limits'),
+                self.host,
+                rate=self.module.params.get('host_request_rate_limit'),
+                concurrency=self.module.params.get('host_request_concurrency'),
+            )
+
+        # Difference between splunkd's clock and ours, learned from the
+        # updated timestamp splunkd puts on every response
+        self._clock_offset = 0
+
+        # Opt-in per request timing and size bookkeeping
+        self.metrics = None
+        if self.module.params.get('request_metrics') or self.module.params.get('request_metrics_log'):
+            from ansible.module_utils.splunk_metrics import RequestMetrics
+            self.metrics = RequestMetrics(
+                log_path=self.module.params.get('request_metrics_log'),
+                context={'module': getattr(self.module, '_name', None), 'host': self.host},
+            )
+
+        # Configuration written on any search head cluster member replicates
+        # to the others, a task run against every member only acts on the
+        # captain and skips the rest
+        if self.module.params.get('shc_captain_only'):
+            shc = self.shc_status()
+            if shc is not None and not shc['is_captain']:
+                self.module.exit_json(
+                    changed=False, skipped=True, splunk_shc=shc,
+                    msg="{0} is not the search head cluster captain, {1} is.".format(shc['label'], shc['captain']['label'])
+                )
+
+    def _send_request(self, method, uri, payload=None, connection=None, limit=None, retries=None, headers=None):
+        """
+        Send a request over the httpapi connection and return the response,
+        raising SplunkRequestError on failure. headers replace the ones the
+        httpapi plugin sends by default, the plugin has to take a headers
+        argument in its send_request for that.
+
+        A request splunkd turned away as busy is sent again, up to retries
+        times, request_retries by default, after the wait its Retry-After
+        header asks for, or an exponential backoff with jitter when the
+        connection has none to tell, and so is one that hit a connection
+        error or a gateway timeout as long as sending it twice is harmless. A limit shared by
+        the threads of a batch is told about every attempt
+        """
+        if connection is None:
+            connection = self.connection
+
+        if retries is None:
+            retries = self.module.params.get('request_retries') or 0
+        extra = {'headers': headers} if headers else {}
+        attempt = 0
+        while True:
+            if limit is not None:
+                limit.acquire()
+            code = response = error = None
+            dropped = False
+            slot = None
+            if self.host_limiter is not None:
+                slot = self.host_limiter.acquire()
+            start = time.time()
+            try:
+                # A fingerprint is stamped with the time its write is sent,
+                # not the time the write was planned
+                code, response = connection.send_request(
+                    method, uri, payload=stamp_fingerprint(payload, self.server_time()), **extra
+                )
+            except ConnectionError as e:
+                if extra and "unexpected keyword argument 'headers'" in to_text(e):
+                    error = SplunkRequestError(
+                        "the httpapi plugin can't set the headers of a request, {0} needs them: {1}".format(uri, headers)
+                    )
+                else:
+                    dropped = True
+                    error = SplunkRequestError("connection error occurred: {0}".format(e))
+            except CertificateError as e:
+                error = SplunkRequestError("certificate error occurred: {0}".format(e))
+            except ValueError as e:
+                error = SplunkRequestError("certificate not found: {0}".format(e))
+            finally:
+                if self.host_limiter is not None:
+                    self.host_limiter.release(slot)
+            self._record_request(method, uri, start, code, response)
+
+            busy = dropped or code in BUSY_CODES or code in GATEWAY_CODES
+            if limit is not None:
+                limit.release(busy)
+            retry = code in BUSY_CODES or (busy and _idempotent(method, payload))
+            if not retry or attempt >= retries:
+                break
+            delay = None
+            if code in BUSY_CODES:
+                delay = _retry_after(getattr(connection, 'retry_after', None))
+            if delay is None:
+                delay = self._retry_delay(attempt)
+            time.sleep(min(delay, RETRY_MAX_DELAY))
+            attempt += 1
+
+        if error is not None:
+            raise error
+
+        if isinstance(response, dict) and response.get('updated'):
+            server_time = updated_epoch(response['updated'])
+            if server_time is not None:
+                self._clock_offset = server_time - time.time()
 
         if code == 404:
             if to_text(u'Object not found') in to_text(response) \
@@ -66,10 +680,126 @@ class SplunkRequest(object):
                 return {}
 
         if not (code >= 200 and code < 300):
-            self.module.fail_json(msg='Splunk httpapi returned error {0} with message {1}'.format(code, response))
+            raise SplunkRequestError('Splunk httpapi returned error {0} with message {1}'.format(code, response), code=code)
 
         return response
 
+    def _retry_delay(self, attempt):
+        """
+        Seconds to wait before the attempt after attempt, doubling from the
+        request_retry_delay param with half of it left to chance so threads
+        turned away together don't all come back at once
+        """
+        base = self.module.params.get('request_retry_delay')
+        if base is None:
+            base = 1.0
+        delay = min(base * 2 ** attempt, RETRY_MAX_DELAY)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _record_request(self, method, uri, start, code=None, response=None):
+        if self.metrics is None:
+            return
+        # A 404 is how splunkd says an object is absent, not a failure
+        self.metrics.record(
+            method, uri, code, time.time() - start, response,
+            failed=code is None or not (code >= 200 and code < 300 or code == 404),
+        )
+
+    def _httpapi_error_handle(self, method, uri, payload=None):
+
+        try:
+            return self._send_request(method, uri, payload=payload)
+        except SplunkRequestError as e:
+            self.module.fail_json(msg=to_text(e), **self.metrics_content())
+
+    @property
+    def host(self):
+        """
+        The splunkd host the httpapi connection talks to
+        """
+        if self._host is None:
+            try:
+                self._host = self.connection.get_option('host')
+            except ConnectionError:
+                self._host = self.module._socket_path
+        return self._host
+
+    def _session_options(self):
+        """
+        The options of the httpapi connection direct sessions to splunkd are
+        opened with, None when they can't be read or hold no credentials
+        """
+        if self._options is None:
+            try:
+                self._options = dict((name, self.connection.get_option(name)) for name in SESSION_OPTIONS)
+            except ConnectionError:
+                self._options = {}
+        if not self._options.get('host') or not self._options.get('remote_user') \
+                or self._options.get('password') is None:
+            return None
+        return self._options
+
+    def shc_status(self):
+        """
+        The search head cluster the host is a member of: its captain and
+        members, the label and management uri of the host itself and if it
+        is the captain. None when the host is not a cluster member
+        """
+        try:
+            status = self._send_request('GET', self._rest_url('services/shcluster/status'), retries=0)
+            member = self._send_request('GET', self._rest_url('services/shcluster/member/info'), retries=0)
+        except SplunkRequestError:
+            return None
+        if not status or not member:
+            return None
+
+        content = status['entry'][0]['content']
+        captain = content.get('captain') or {}
+        this = member['entry'][0]['content']
+        members = sorted(
+            (
+                {'label': peer.get('label'), 'mgmt_uri': peer.get('mgmt_uri'), 'status': peer.get('status')}
+                for peer in (content.get('peers') or {}).values()
+            ),
+            key=lambda peer: to_text(peer['label'])
+        )
+        return {
+            'captain': {'label': captain.get('label'), 'mgmt_uri': captain.get('mgmt_uri')},
+            'members': members,
+            'label': this.get('label'),
+            'mgmt_uri': this.get('mgmt_uri'),
+            'is_captain': bool(this.get('mgmt_uri')) and this.get('mgmt_uri') == captain.get('mgmt_uri'),
+        }
+
+    def server_time(self):
+        """
+        Seconds since the epoch by splunkd's clock, as far as the responses
+        seen so far tell, the time entries get as their updated timestamp
+        """
+        return time.time() + self._clock_offset
+
+    def result_content(self, splunk_data, changes=None):
+        """
+        The part of a module result describing the objects it handled, picked
+        by the return_content param: the full splunk_data, only the changed
+        fields with their before and after values, or nothing at all
+        """
+        content = self.metrics_content()
+        return_content = self.module.params.get('return_content', 'full')
+        if return_content == 'changed_fields':
+            content['changed_fields'] = changes or {}
+        elif return_content != 'none':
+            content['splunk_data'] = splunk_data
+        return content
+
+    def metrics_content(self):
+        """
+        The splunk_metrics part of a module result, when request_metrics is on
+        """
+        if self.metrics is None or not self.module.params.get('request_metrics'):
+            return {}
+        return {'splunk_metrics': self.metrics.summary()}
+
     def get(self, url, **kwargs):
         return self._httpapi_error_handle('GET', url, **kwargs)
 
@@ -83,22 +813,27 @@ class SplunkRequest(object):
         return self._httpapi_error_handle('DELETE', url, **kwargs)
 
 
-    def get_data(self):
+    def get_data(self, params=None):
         """
         Get the valid fields that should be passed to the REST API as urlencoded
         data so long as the argument specification to the module follows the
         convention:
             - the key to the argspec item does not start with splunk_
             - the key does not exist in the not_data_keys list
+
+        params defaults to the module params, bulk modules pass each item of
+        their list instead
         """
+        if params is None:
+            params = self.module.params
         try:
             splunk_data = {}
-            for param in self.module.params:
-                if (self.module.params[param]) != None and (param not in self.not_rest_data_keys):
+            for param in params:
+                if (params[param]) != None and (param not in self.not_rest_data_keys):
                     if param in self.keymap:
-                        splunk_data[self.keymap[param]] = self.module.params[param]
+                        splunk_data[self.keymap[param]] = params[param]
                     else:
-                        splunk_data[param] = self.module.params[param]
+                        splunk_data[param] = params[param]
             return splunk_data
 
 
@@ -108,19 +843,297 @@ class SplunkRequest(object):
     def get_urlencoded_data(self):
         return urlencode(self.get_data())
 
-    def get_by_path(self, rest_path):
+    def _rest_url(self, rest_path, query=None, fields=None):
+        """
+        Build the url for a rest path, always asking splunkd for json output
+        along with any extra query parameters and an f= filter for each of
+        fields
+        """
+        url = "/{0}?output_mode=json".format(rest_path)
+        params = list(query.items()) if isinstance(query, dict) else list(query or [])
+        for field in fields or []:
+            params.append(('f', field))
+        if params:
+            url += "&{0}".format(urlencode(params))
+        return url
+
+    def get_by_path(self, rest_path, query=None, fields=None):
         """
         GET attributes of a monitor by rest path
         """
 
-        return self.get("/{0}?output_mode=json".format(rest_path))
+        return self.get(self._rest_url(rest_path, query, fields))
+
+    def iter_collection(self, rest_path, page_size=1000, query=None, fields=None, missing_ok=False):
+        """
+        Yield the entries of a collection by rest path one at a time, walking
+        the collection one page of page_size entries at a time using
+        offset/count so that at most one page is held in memory. With
+        missing_ok a collection splunkd doesn't have yields nothing instead
+        of failing the module
+        """
+        offset = 0
+        while True:
+            page_query = list(query.items()) if isinstance(query, dict) else list(query or [])
+            page_query.extend([('offset', offset), ('count', page_size)])
+            if not missing_ok:
+                response = self.get_by_path(rest_path, query=page_query, fields=fields)
+            else:
+                try:
+                    response = self._send_request('GET', self._rest_url(rest_path, page_query, fields))
+                except SplunkRequestError as e:
+                    if e.code == 404:
+                        return
+                    self.module.fail_json(msg=to_text(e), **self.metrics_content())
+            page = response.get('entry', []) if response else []
+            offset += len(page)
+            total = response.get('paging', {}).get('total', offset) if response else offset
+            for entry in page:
+                yield entry
+            if not page or offset >= total:
+                return
+
+    def get_collection(self, rest_path, page_size=1000, query=None, fields=None):
+        """
+        GET every entry of a collection by rest path as a list
+        """
+        return list(self.iter_collection(rest_path, page_size=page_size, query=query, fields=fields))
+
+    def get_snapshot(self, rest_path, names=None, missing_ok=False):
+        """
+        GET every entry of a collection as a dict keyed by entry name, only
+        the entries named in names when it is given. With missing_ok a
+        collection splunkd doesn't have is empty.
+
+        With the snapshot cache enabled every read costs a single listing of
+        entry names and updated timestamps, after which only the entries that
+        changed since the snapshot are fetched again. A snapshot older than
+        the ttl is read again in full
+        """
+        if names is not None:
+            names = set(names)
+
+        if self.snapshot_cache is None:
+            # Entries are streamed page by page and the ones that were not
+            # asked for are dropped right away
+            return dict(
+                (entry['name'], entry) for entry in self.iter_collection(rest_path, fields=self.fields, missing_ok=missing_ok)
+                if names is None or entry['name'] in names
+            )
+
+        snapshot = self.snapshot_cache.load(self.host, rest_path, self.fields)
+        if snapshot is not None and not self.snapshot_cache.is_fresh(snapshot):
+            snapshot = None
+        if snapshot is None:
+            entries = dict(
+                (entry['name'], entry) for entry in self.iter_collection(rest_path, fields=self.fields, missing_ok=missing_ok)
+            )
+            self.snapshot_cache.save(self.host, rest_path, entries, fields=self.fields)
+        else:
+            entries = {}
+            stale = False
+            # The field filter matches no content key, leaving only the entry
+            # name and updated timestamp in the listing
+            for entry in self.iter_collection(rest_path, query={'f': 'updated'}, missing_ok=missing_ok):
+                cached = snapshot['entries'].get(entry['name'])
+                if cached is not None and cached.get('updated') == entry.get('updated'):
+                    entries[entry['name']] = cached
+                    continue
+                stale = True
+                response = self.get_by_path('{0}/{1}'.format(rest_path, quote_plus(entry['name'])), fields=self.fields)
+                if response:
+                    entries[entry['name']] = response['entry'][0]
+            if stale or len(entries) != len(snapshot['entries']):
+                # The snapshot keeps the time of its last full read
+                self.snapshot_cache.save(self.host, rest_path, entries, fetched=snapshot['fetched'], fields=self.fields)
+
+        if names is None:
+            return entries
+        return dict((name, entries[name]) for name in names if name in entries)
+
+    def get_fingerprints(self, rest_path, names=None):
+        """
+        GET the entries of a collection with FINGERPRINT_FIELD as their only
+        content key as a dict keyed by entry name, only the entries named in
+        names when it is given. A far smaller listing than get_snapshot that
+        tells which entries are still in the state they were last written in
+        """
+        if names is not None:
+            names = set(names)
+        return dict(
+            (entry['name'], entry) for entry in self.iter_collection(rest_path, fields=[FINGERPRINT_FIELD])
+            if names is None or entry['name'] in names
+        )
+
+    def get_by_name(self, rest_path, name):
+        """
+        GET a single entry of a collection by name, in the same form as
+        get_by_path, going through the snapshot cache when it is enabled
+        """
+        if self.snapshot_cache is None:
+            return self.get_by_path('{0}/{1}'.format(rest_path, quote_plus(name)), fields=self.fields)
+
+        entry = self.get_snapshot(rest_path).get(name)
+        if entry is None:
+            return {}
+        return {'entry': [entry]}
+
+    def _expire_snapshot(self, rest_paths):
+        """
+        Writes to rest_paths leave the snapshots of the collections they
+        touched stale, whether a rest path is a collection itself or one of
+        its entries. Every collection is expired at once, with one load and
+        save of each of its snapshots
+        """
+        if self.snapshot_cache is None or not rest_paths:
+            return
+        touched = {}
+        for rest_path in rest_paths:
+            collection, _, name = rest_path.rpartition('/')
+            touched.setdefault(rest_path, set())
+            touched.setdefault(collection, set()).add(unquote_plus(name))
+        self.snapshot_cache.expire(self.host, touched)
+
+    def run_batch(self, operations, concurrency=None, rate_limit=None, headers=None):
+        """
+        Run a list of (method, rest_path, payload) operations from a pool of
+        at most concurrency threads, starting at most rate_limit requests per
+        second. Both default to the request_concurrency and request_rate_limit
+        module params. An operation may carry a fourth item, the fields to
+        filter the response on. headers go with every request, as in
+        _send_request. While splunkd answers busy the requests in
+        flight drop, halving each time, and climb back as it recovers.
+
+        ansible-connection sends the requests of its socket one at a time, so
+        each thread opens a session of its own straight to splunkd with the
+        host and credentials of the httpapi connection. When those can't be
+        read, the operations are sent one after the other over the
+        persistent connection instead.
+
+        Returns one result dict per operation, in the same order, holding
+        either the response or the error message. A failed operation does not
+        stop the rest of the batch, it is up to the caller to report it.
+        """
+        if concurrency is None:
+            concurrency = self.module.params.get('request_concurrency') or 1
+        if rate_limit is None:
+            rate_limit = self.module.params.get('request_rate_limit') or 0
+
+        from ansible.module_utils.six.moves import queue
+
+        results = [None] * len(operations)
+        work = queue.Queue()
+        for index, operation in enumerate(operations):
+            method, rest_path, payload = operation[:3]
+            fields = operation[3] if len(operation) > 3 else None
+            work.put((index, method, rest_path, payload, fields))
+
+        throttle = _Throttle(rate_limit)
+        # Fewer requests are let through at once while splunkd is pushing back
+        limit = _AdaptiveLimit(concurrency)
+
+        workers = min(max(concurrency, 1), len(operations))
+        options = self._session_options() if workers > 1 else None
+        if options is None:
+            # Requests over the persistent connection are sent one at a time
+            # by ansible-connection whatever the number of threads
+            workers = 1
+
+        def worker():
+            connection = _DirectConnection(options) if options is not None else self.connection
+            try:
+                run(connection)
+            finally:
+                if options is not None:
+                    connection.close()
+
+        def run(connection):
+            while True:
+                try:
+                    index, method, rest_path, payload, fields = work.get_nowait()
+                except queue.Empty:
+                    return
+                throttle.wait()
+                result = {'method': method, 'path': rest_path, 'failed': False}
+                try:
+                    result['response'] = self._send_request(
+                        method, self._rest_url(rest_path, fields=fields), payload=payload, connection=connection,
+                        limit=limit, headers=headers
+                    )
+                except SplunkRequestError as e:
+                    result['failed'] = True
+                    result['msg'] = to_text(e)
+                results[index] = result
+
+        try:
+            if workers == 1:
+                worker()
+            else:
+                threads = []
+                for i in range(workers):
+                    thread = threading.Thread(target=worker)
+                    thread.daemon = True
+                    thread.start()
+                    threads.append(thread)
+                for thread in threads:
+                    thread.join()
+        finally:
+            # Collections written to are expired once the batch is done
+            self._expire_snapshot([operation[1] for operation in operations if operation[0] != 'GET'])
+
+        return results
+
+    def write_plan(self, plan_file, operations, names, updated, changes=None):
+        """
+        Serialize a list of (method, rest_path, payload) operations to
+        plan_file instead of running them, for splunk_apply_plan to run
+        later. names holds the object name of each operation, updated the
+        updated timestamp of every existing object the operations touch and
+        changes the field changes of each object, kept for review
+        """
+        plan = {
+            'host': self.host,
+            'created': time.time(),
+            'operations': [],
+        }
+        for name, (method, rest_path, payload) in zip(names, operations):
+            entry_path = rest_path
+            if name not in updated:
+                # A create posts to the collection, the new entry is named
+                # by the payload
+                entry_path = '{0}/{1}'.format(rest_path, quote_plus(parse_qs(payload)['name'][0]))
+            plan['operations'].append({
+                'name': name,
+                'method': method,
+                'path': rest_path,
+                'entry_path': entry_path,
+                'payload': payload,
+                'updated': updated.get(name),
+                'changes': (changes or {}).get(name, {}),
+            })
+
+        # Write to a temporary file and rename it into place so a plan is
+        # never left half written
+        directory = os.path.dirname(os.path.abspath(plan_file))
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(plan, f, indent=2, sort_keys=True)
+            os.rename(tmp_path, plan_file)
+        except (IOError, OSError) as e:
+            self.module.fail_json(msg="Unable to write plan file {0}: {1}".format(plan_file, to_text(e)))
+
+        return plan
 
     def delete_by_path(self, rest_path):
         """
         DELETE attributes of a monitor by rest path
         """
 
-        return self.delete("/{0}?output_mode=json".format(rest_path))
+        try:
+            return self.delete("/{0}?output_mode=json".format(rest_path))
+        finally:
+            self._expire_snapshot([rest_path])
 
     def create_update(self, rest_path, data=None):
         """
@@ -128,6 +1141,403 @@ class SplunkRequest(object):
         """
         if data == None:
             data = self.get_urlencoded_data()
-        return self.post("/{0}?output_mode=json".format(rest_path), payload=data)
+        try:
+            return self.post("/{0}?output_mode=json".format(rest_path), payload=data)
+        finally:
+            self._expire_snapshot([rest_path])
+
+
+class BulkChanges(object):
+    """
+    Bookkeeping the list modules share around the objects they converge.
+    Objects are known by kind, the rest path of their collection, and name,
+    and each change is reported under a key of the module's choosing.
+
+    With the state_ledger param set, objects the ledger shows in their
+    desired state are skipped without reading them. Writes are queued up as
+    the objects are diffed and, once they all are, either serialized to
+    the plan_file param or sent as one batch, keeping what each write left
+    on splunkd for replication checks and the ledger
+    """
+    def __init__(self, splunk_request):
+        self.splunk_request = splunk_request
+        self.module = splunk_request.module
+
+        self.ledger = None
+        self.digests = {}
 
+        self.operations = []
+        self.keys = []
+        self.objects = []
+        self.updated = {}
+        self.field_changes = {}
 
+        self.splunk_data = {}
+        self.errors = {}
+        self.written = {}
+
+    def open_ledger(self, kinds):
+        """
+        Read the ledger of kinds when state_ledger is set, a ledger that
+        can't be read is left out with a warning
+        """
+        if not self.module.params.get('state_ledger'):
+            return
+        from ansible.module_utils.splunk_ledger import StateLedger
+
+        ledger = StateLedger(self.splunk_request, self.module.params['state_ledger'], kinds)
+        ledger.load()
+        if ledger.error is not None:
+            self.module.warn("State ledger could not be read, going on without it: {0}".format(ledger.error))
+            return
+        self.ledger = ledger
+
+    def skipped(self, kind, digests, absent):
+        """
+        Names the ledger shows need no change: out of digests, a dict of the
+        name to the fingerprint of every object to keep, the ones still in
+        that state and out of absent, the names of the objects to remove,
+        the ones that don't exist. Nothing is skipped without a ledger
+        """
+        self.digests.setdefault(kind, {}).update(digests)
+        if self.ledger is None:
+            return set()
+        skipped = self.ledger.unchanged(kind, digests)
+        skipped.update(name for name in absent if not self.ledger.exists(kind, name))
+        return skipped
+
+    def snapshot(self, kind, names):
+        """
+        get_snapshot of the objects out of names that may exist, the ledger
+        listing tells which don't without reading them
+        """
+        names = [name for name in names if self.ledger is None or self.ledger.exists(kind, name)]
+        if not names:
+            return {}
+        return self.splunk_request.get_snapshot(kind, names=names)
+
+    def in_state(self, kind, name, updated):
+        """
+        An object found in its desired state as of its updated timestamp
+        """
+        if self.ledger is not None:
+            self.ledger.record(kind, name, self.digests[kind][name], updated)
+
+    def queue(self, key, kind, name, method, rest_path, payload, changes, updated=None):
+        """
+        Queue a write of the object kind/name, reported under key with its
+        field changes. updated is the timestamp of an object that exists
+        """
+        self.operations.append((method, rest_path, payload))
+        self.keys.append(key)
+        self.objects.append((kind, name))
+        self.field_changes[key] = changes
+        if updated is not None:
+            self.updated[key] = updated
+
+    def apply(self):
+        """
+        Write the plan, or send the queued writes outside of check mode, then
+        save the ledger. Failed writes end up in errors, the responses of the
+        others in splunk_data and what they left on splunkd in written
+        """
+        if self.module.params.get('plan_file'):
+            self.splunk_request.write_plan(
+                self.module.params['plan_file'], self.operations, self.keys, self.updated, self.field_changes
+            )
+            return
+        if self.module.check_mode:
+            return
+
+        if self.operations:
+            results = self.splunk_request.run_batch(self.operations)
+            for key, (kind, name), operation, result in zip(self.keys, self.objects, self.operations, results):
+                if result['failed']:
+                    self.errors[key] = result['msg']
+                    continue
+                self.splunk_data[key] = result['response']
+                deleted = result['method'] == 'DELETE'
+                self.written.setdefault(kind, {})[name] = None if deleted else written_state(result['response'], operation[2])
+                if self.ledger is not None:
+                    self.ledger.applied(kind, name, None if deleted else self.digests[kind][name], result['response'])
+
+        if self.ledger is not None:
+            for error in self.ledger.save():
+                self.module.warn("State ledger could not be saved: {0}".format(error))
+
+
+
+def monitor_input_argspec():
+    """
+    Argument specification of a single file/directory monitor data input,
+    shared by the modules that manage one input or a list of them
+    """
+    return dict(
+        name=dict(required=True, type='str'),
+        state=dict(choices=['present', 'absent'], required=True),
+        blacklist=dict(required=False, type='str', default=None),
+        check_indexed=dict(required=False, type='bool', default=None),
+        check_path=dict(required=False, type='bool', default=None),
+        crc_salt=dict(required=False, type='str', default=None),
+        disabled=dict(required=False, type='str', default=None),
+        followTail=dict(required=False, type='str', default=None),
+        host=dict(required=False, type='str', default=None),
+        host_segment=dict(required=False, type='int', default=None),
+        host_regex=dict(required=False, type='int', default=None),
+        ignore_older_than=dict(required=False, type='str', default=None),
+        index=dict(required=False, type='str', default=None),
+        recursive=dict(required=False, type='str', default=None),
+        rename_source=dict(required=False, type='str', default=None),
+        sourcetype=dict(required=False, type='str', default=None),
+        time_before_close=dict(required=False, type='int', default=None),
+        whitelist=dict(required=False, type='str', default=None),
+    )
+
+# REST content fields of a monitor input the modules compare
+MONITOR_INPUT_FIELDS = [
+    'blacklist', 'check_indexed', 'check-path', 'crc-salt', 'disabled', 'followTail', 'host',
+    'host_segment', 'host_regex', 'ignore-older-than', 'index', 'recursive', 'rename-source',
+    'sourcetype', 'time-before-close', 'whitelist',
+]
+
+# map of keys for the splunk REST API that aren't pythonic so we have to
+# handle the substitutes
+MONITOR_INPUT_KEYMAP = {
+    'check_index': 'check-index',
+    'check_path': 'check-path',
+    'crc_salt': 'crc-salt',
+    'ignore_older_than': 'ignore-older-than',
+    'rename_source': 'rename-source',
+    'time_before_close': 'time-before-close'
+
+}
+
+# map of the monitor input REST keys whose inputs.conf setting is named
+# differently, None for the keys that only steer the REST handler
+MONITOR_INPUT_CONF_KEYMAP = {
+    'check-index': None,
+    'check_indexed': None,
+    'check-path': None,
+    'crc-salt': 'crcSalt',
+    'ignore-older-than': 'ignoreOlderThan',
+    'rename-source': 'source',
+    'time-before-close': 'time_before_close',
+}
+
+def monitor_input_conf(params):
+    """
+    The inputs.conf settings of a monitor input stanza from its module
+    params, the way the REST handler would write them: each param goes
+    through MONITOR_INPUT_KEYMAP to its REST key, then MONITOR_INPUT_CONF_KEYMAP
+    to its setting name
+    """
+    settings = {}
+    for param, value in params.items():
+        if value is None or param in ('name', 'state'):
+            continue
+        key = MONITOR_INPUT_KEYMAP.get(param, param)
+        key = MONITOR_INPUT_CONF_KEYMAP.get(key, key)
+        if key is None:
+            continue
+        if isinstance(value, bool):
+            value = 'true' if value else 'false'
+        settings[key] = to_text(value)
+    return settings
+
+def network_input_argspec():
+    """
+    Argument specification of a single TCP/UDP network data input, shared by
+    the modules that manage one input or a list of them
+    """
+    return dict(
+        state=dict(required=False, choices=[ 'present', 'absent', 'enabled', 'disable' ], default='present', type='str'),
+        connection_host=dict(required=False, choices=['ip', 'dns', 'none'], default='none', type='str'),
+        host=dict(required=False, type='str', default=None),
+        index=dict(required=False, type='str', default=None),
+        name=dict(required=True, type='str'),
+        protocol=dict(required=True, type='str', choices=['tcp', 'udp']),
+        queue=dict(required=False, type='str', choices=['parsingQueue', 'indexQueue'], default='parsingQueue'),
+        rawTcpDoneTimeout=dict(required=False, type='int', default=10),
+        restrictToHost=dict(required=False, type='str', default=None),
+        ssl=dict(required=False, type='bool', default=None),
+        source=dict(required=False, type='str', default=None),
+        sourcetype=dict(required=False, type='str', default=None),
+        datatype=dict(required=False, choices=[ "cooked", "raw" ], default="raw")
+    )
+
+# REST content fields of a network input the modules compare
+NETWORK_INPUT_FIELDS = [
+    'connection_host', 'disabled', 'host', 'index', 'queue', 'rawTcpDoneTimeout',
+    'restrictToHost', 'ssl', 'source', 'sourcetype',
+]
+
+def correlation_search_argspec():
+    """
+    Argument specification of a single correlation search, shared by the
+    modules that manage one search or a list of them
+    """
+    return dict(
+        name=dict(required=True, type='str'),
+        description=dict(required=True, type='str'),
+        state=dict(choices=['present', 'absent'], required=True),
+        search=dict(required=True, type='str'),
+        app=dict(type="str", required=False, default="SplunkEnterpriseSecuritySuite"),
+        ui_dispatch_context=dict(type="str", required=False),
+        time_earliest=dict(type="str", required=False, default="-24h"),
+        time_latest=dict(type="str", required=False, default="now"),
+        cron_schedule=dict(type="str", required=False, default="*/5 * * * *"),
+        scheduling=dict(type="str", required=False, default="real-time", choices=["real-time", "continuous"]),
+        schedule_window=dict(type="str", required=False, default="0"),
+        schedule_priority=dict(type="str", required=False, default="Default", choices=["Default", "Higher", "Highest"]),
+        trigger_alert_when=dict(type="str", required=False, default="number of events",
+                                choices=["number of events", "number of results", "number of hosts", "number of sources"]),
+        trigger_alert_when_condition=dict(type="str", required=False, default="greater than",
+                                choices=["greater than", "less than", "equal to", "not equal to", "drops by", "rises by"]),
+        trigger_alert_when_value=dict(type="str", required=False, default="10"),
+        throttle_window_duration=dict(type="str", required=False),
+        throttle_fields_to_group_by=dict(type="str", required=False),
+        suppress_alert=dict(type='bool', required=False, default=False),
+        notable=dict(type='dict', required=False, options=notable_event_argspec()),
+    )
+
+def spl_lint_argspec():
+    """
+    Options of the SPL cost linter, shared by the correlation search modules.
+    The linter itself, splunk_spl, is only imported when it runs
+    """
+    return dict(
+        spl_lint=dict(type='str', required=False, default='none', choices=['none', 'warn', 'fail']),
+        spl_lint_ignore=dict(type='list', elements='str', required=False, default=[]),
+    )
+
+# REST content fields of a saved search that correlation_search_data() sets
+CORRELATION_SEARCH_FIELDS = [
+    'action.correlationsearch.enabled', 'action.correlationsearch.label', 'alert.suppress',
+    'alert_comparator', 'alert_threshold', 'alert_type', 'cron_schedule', 'description',
+    'dispatch.earliest_time', 'dispatch.latest_time', 'dispatch.rt_backfill', 'is_scheduled',
+    'realtime_schedule', 'request.ui_dispatch_app', 'request.ui_dispatch_context',
+    'schedule_priority', 'schedule_window', 'search', 'actions', 'action.notable.param.*',
+]
+
+def correlation_search_data(params, content=None):
+    """
+    Craft the saved search REST data for a correlation search from module
+    params. They overload the saved searches endpoint in the rest api and we
+    want to hide the nuance from the user
+
+    When params carry a notable action its params are merged in, with the
+    actions of the existing saved search content extended by notable
+    """
+    request_post_data = {}
+    request_post_data['name'] = params['name']
+    request_post_data['action.correlationsearch.enabled'] = "1"
+    request_post_data['is_scheduled'] = True
+    request_post_data['dispatch.rt_backfill'] = True
+    request_post_data['action.correlationsearch.label'] = params['name']
+    request_post_data['description'] = params['description']
+    request_post_data['search'] = params['search']
+    request_post_data['request.ui_dispatch_app'] = params['app']
+    if params['ui_dispatch_context']:
+        request_post_data['request.ui_dispatch_context'] = params['ui_dispatch_context']
+    request_post_data['dispatch.earliest_time'] = params['time_earliest']
+    request_post_data['dispatch.latest_time'] = params['time_latest']
+    request_post_data['cron_schedule'] = params['cron_schedule']
+    if params['scheduling'] == 'real-time':
+        request_post_data['realtime_schedule'] = True
+    else:
+        request_post_data['realtime_schedule'] = False
+    request_post_data['schedule_window'] = params['schedule_window']
+    request_post_data['schedule_priority'] = params['schedule_priority'].lower()
+    request_post_data['alert_type'] = params['trigger_alert_when']
+    request_post_data['alert_comparator'] = params['trigger_alert_when_condition']
+    request_post_data['alert_threshold'] = params['trigger_alert_when_value']
+    request_post_data['alert.suppress'] = params['suppress_alert']
+    if params.get('notable'):
+        request_post_data.update(notable_event_data(params['notable']))
+        request_post_data['actions'] = notable_actions(content.get('actions') if content else None)
+    return request_post_data
+
+def notable_event_argspec():
+    """
+    Argument specification of a notable event adaptive response, shared by
+    the notable event module and the notable option of correlation searches
+    """
+    return dict(
+        name=dict(required=True, type='str'),
+        description=dict(required=True, type='str'),
+        security_domain=dict(choices=['access', 'endpoint', 'network', 'threat', 'identity', 'audit'], required=False, default='threat'),
+        severity=dict(choices=['informational', 'low', 'medium', 'high', 'critical', 'unknown'], required=False, default='high'),
+        default_owner=dict(required=False, type='str'),
+        default_status=dict(choices=['unassigned', 'new', 'in progress', 'pending', 'resolved', 'closed', ''], required=False, default=''),
+        drill_down_name=dict(required=False, type='str'),
+        drill_down_search=dict(required=False, type='str'),
+        drill_down_earliest_offset=dict(required=False, type='str', default='$info_min_time$'),
+        drill_down_latest_offset=dict(required=False, type='str', default='$info_max_time$'),
+        investigation_profiles=dict(required=False, type='str'),
+        next_steps=dict(required=False, type='list', default=[]),
+        recommended_actions=dict(required=False, type='list', default=[]),
+        asset_extraction=dict(required=False, type='list', default=['src', 'dest', 'dvc', 'orig_host'], choices=['src', 'dest', 'dvc', 'orig_host']),
+        identity_extraction=dict(required=False, type='list', default=['user', 'src_user'], choices=['user', 'src_user']),
+    )
+
+def notable_event_data(params):
+    """
+    Craft the action.notable.param.* saved search REST data of a notable event
+    adaptive response from module params
+    """
+    request_post_data = {}
+
+    #FIXME  need to figure out how to properly support these, the possible values appear to
+    #       be dynamically created based on what the search is indexing
+    #request_post_data['action.notable.param.extract_assets'] = '[\"src\",\"dest\",\"dvc\",\"orig_host\"]'
+    #request_post_data['action.notable.param.extract_identities'] = [\"src_user\",\"user\"]
+    if params['next_steps']:
+        if len(params['next_steps']) == 1:
+            next_steps = "[[action|{0}]]".format(params['next_steps'][0])
+        else:
+            next_steps = ""
+            for next_step in params['next_steps']:
+                if next_steps:
+                    next_steps += "\n[[action|{0}]]".format(next_step)
+                else:
+                    next_steps = "[[action|{0}]]".format(next_step)
+
+        # NOTE: version:1 appears to be hard coded when you create this via the splunk web UI
+        #       but I don't know what it is/means because there's no docs on it
+        next_steps_dict = {"version": 1, "data": next_steps}
+        request_post_data['action.notable.param.next_steps'] = json.dumps(next_steps_dict)
+
+    if params['recommended_actions']:
+        if len(params['recommended_actions']) == 1:
+            request_post_data['action.notable.param.recommended_actions'] = params['recommended_actions'][0]
+        else:
+            request_post_data['action.notable.param.recommended_actions'] = ','.join(params['recommended_actions'])
+
+    request_post_data['action.notable.param.rule_description'] = params['description']
+    request_post_data['action.notable.param.rule_title'] = params['name']
+    request_post_data['action.notable.param.security_domain'] = params['security_domain']
+    request_post_data['action.notable.param.severity'] = params['severity']
+    request_post_data['action.notable.param.asset_extraction'] = params['asset_extraction']
+    request_post_data['action.notable.param.identity_extraction'] = params['identity_extraction']
+
+    # NOTE: this field appears to be hard coded when you create this via the splunk web UI
+    #       but I don't know what it is/means because there's no docs on it
+    request_post_data['action.notable.param.verbose'] = '0'
+
+    if params['default_owner']:
+        request_post_data['action.notable.param.default_owner'] = params['default_owner']
+
+    if params['default_status']:
+        request_post_data['action.notable.param.default_status'] = params['default_status']
+
+    return request_post_data
+
+def notable_actions(actions):
+    """
+    Add notable to the comma separated actions of a saved search, keeping the
+    actions it already has
+    """
+    actions = [action.strip() for action in (actions or '').split(',') if action.strip()]
+    if 'notable' not in actions:
+        actions.append('notable')
+    return ', '.join(actions)
@@ -0,0 +1,139 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from ansible.module_utils._text import to_bytes
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+
+class SnapshotCache(object):
+    """
+    On-disk cache of Splunk REST collection snapshots kept on the controller.
+    A snapshot is keyed by the splunkd host and the collection rest path, which
+    carries the servicesNS owner/app namespace, and stores every entry of the
+    collection along with its updated timestamp. Snapshots of the same
+    collection read with different field filters are kept apart
+    """
+
+    def __init__(self, directory, ttl=300, max_size=100 * 1024 * 1024):
+
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size = max_size
+
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+    def _key(self, host, rest_path):
+        return hashlib.sha1(to_bytes(u'{0}|{1}'.format(host, rest_path))).hexdigest()
+
+    def _path(self, host, rest_path, fields=None):
+        fields_key = hashlib.sha1(to_bytes(u','.join(sorted(fields or [])))).hexdigest()[:12]
+        return os.path.join(self.directory, '{0}-{1}.json'.format(self._key(host, rest_path), fields_key))
+
+    def load(self, host, rest_path, fields=None):
+        """
+        Load the snapshot of a collection, None if there isn't one
+        """
+        path = self._path(host, rest_path, fields)
+        try:
+            with open(path, 'r') as f:
+                snapshot = json.load(f)
+            # Touch it so eviction drops the least recently used snapshots first
+            os.utime(path, None)
+        except (IOError, OSError, ValueError):
+            return None
+
+        if snapshot.get('host') != host or snapshot.get('path') != rest_path \
+                or snapshot.get('fields') != sorted(fields or []):
+            return None
+        return snapshot
+
+    def save(self, host, rest_path, entries, fetched=None, fields=None):
+        """
+        Store the entries of a collection, keyed by entry name
+        """
+        snapshot = {
+            'host': host,
+            'path': rest_path,
+            'fields': sorted(fields or []),
+            'fetched': time.time() if fetched is None else fetched,
+            'entries': entries,
+        }
+
+        # Write to a temporary file and rename it into place so that parallel
+        # forks never read a partially written snapshot
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(snapshot, f)
+            os.rename(tmp_path, self._path(host, rest_path, fields))
+        except (IOError, OSError):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        self._evict()
+
+    def is_fresh(self, snapshot):
+        """
+        A snapshot younger than the ttl is checked against splunkd entry by
+        entry, an older one is read again in full
+        """
+        return time.time() - snapshot['fetched'] < self.ttl
+
+    def expire(self, host, touched):
+        """
+        Drop the entries written from every snapshot of the collections in
+        touched, a dict of rest path to the names of the entries written
+        under it, so the next read fetches them again. Each snapshot is
+        loaded and saved once however many of its entries were written
+        """
+        collections = dict(
+            (self._key(host, rest_path), (rest_path, names)) for rest_path, names in touched.items()
+        )
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json'):
+                continue
+            key = filename.split('-', 1)[0]
+            if key not in collections:
+                continue
+            rest_path, names = collections[key]
+            try:
+                with open(os.path.join(self.directory, filename), 'r') as f:
+                    snapshot = json.load(f)
+            except (IOError, OSError, ValueError):
+                continue
+            for name in names:
+                snapshot['entries'].pop(name, None)
+            self.save(host, rest_path, snapshot['entries'], fetched=snapshot.get('fetched', 0), fields=snapshot.get('fields'))
+
+    def _evict(self):
+        snapshots = []
+        total = 0
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            snapshots.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        for mtime, size, path in sorted(snapshots):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
@@ -0,0 +1,178 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from ansible.module_utils.six.moves.urllib.parse import urlencode, quote_plus
+from ansible.module_utils.splunk import JSON_HEADERS, SplunkRequestError, entry_updated
+from ansible.module_utils._text import to_bytes, to_text
+
+import hashlib
+import json
+
+# App whose KV store holds the ledger collection
+LEDGER_APP = 'SplunkEnterpriseSecuritySuite'
+
+# Most documents splunkd takes in one batch_save, its
+# max_documents_per_batch_save default
+BATCH_SAVE_SIZE = 1000
+
+
+class StateLedger(object):
+    """
+    Ledger of the objects a module manages, kept in a Splunk KV store
+    collection. Each record holds the fingerprint of the desired state last
+    applied to an object and the updated timestamp splunkd gave the object
+    right after, so an object whose fingerprint and updated timestamp both
+    still match is known to be in the desired state without reading it.
+
+    Records are grouped by kind, the rest path of the collection the object
+    lives in. The records of every kind a module touches are read with one
+    GET and checked against one listing of updated timestamps per kind
+    """
+
+    def __init__(self, splunk_request, collection, kinds, app=LEDGER_APP):
+
+        self.splunk_request = splunk_request
+        self.collection = collection
+        self.kinds = list(kinds)
+        self.config_path = 'servicesNS/nobody/{0}/storage/collections/config'.format(quote_plus(app))
+        self.data_path = 'servicesNS/nobody/{0}/storage/collections/data/{1}'.format(quote_plus(app), quote_plus(collection))
+
+        self.records = None
+        self.missing = False
+        self.error = None
+        self.updated = {}
+        self.pending = {}
+        self.forgotten = set()
+
+    def _key(self, kind, name):
+        return hashlib.sha1(to_bytes(u'{0}\n{1}'.format(kind, name))).hexdigest()
+
+    def load(self):
+        """
+        GET the records of the ledger kinds, once. A missing collection is an
+        empty ledger, it is created the first time the ledger is saved. When
+        the KV store can't be read, such as while it is still starting up,
+        the ledger is left empty and error holds why
+        """
+        if self.records is not None:
+            return
+        self.records = {}
+
+        query = {'$or': [{'kind': kind} for kind in self.kinds]}
+        url = self.splunk_request._rest_url(self.data_path, query={'query': json.dumps(query, sort_keys=True)})
+        try:
+            response = self.splunk_request._send_request('GET', url)
+        except SplunkRequestError as e:
+            if e.code != 404:
+                self.error = to_text(e)
+                return
+            response = None
+        if not isinstance(response, list):
+            self.missing = True
+            return
+
+        for record in response:
+            self.records[record.get('_key')] = record
+
+    def unchanged(self, kind, digests):
+        """
+        Names out of digests, a dict of entry name to fingerprint, whose
+        ledger record shows they are still in the state digest was computed
+        from: same fingerprint and the same updated timestamp as right after
+        the last write. Lists the updated timestamps of kind along the way.
+        Nothing is unchanged when the ledger could not be read
+        """
+        self.load()
+        if self.error is not None:
+            return set()
+
+        # The field filter matches no content key, leaving only the entry
+        # name and updated timestamp, small enough to list in one page
+        self.updated[kind] = dict(
+            (entry['name'], entry.get('updated'))
+            for entry in self.splunk_request.iter_collection(kind, page_size=0, query={'f': 'updated'})
+        )
+
+        unchanged = set()
+        for name, digest in digests.items():
+            record = self.records.get(self._key(kind, name))
+            if record is None or name not in self.updated[kind]:
+                continue
+            if record.get('fingerprint') == digest and record.get('updated') == self.updated[kind][name]:
+                unchanged.add(name)
+        return unchanged
+
+    def exists(self, kind, name):
+        """
+        If the listing of kind done by unchanged holds an entry named name
+        """
+        return name in self.updated.get(kind, {})
+
+    def record(self, kind, name, digest, updated):
+        """
+        Queue the record of an entry that is in the desired state digest was
+        computed from as of its updated timestamp
+        """
+        if not updated:
+            self.forget(kind, name)
+            return
+        key = self._key(kind, name)
+        current = (self.records or {}).get(key)
+        if current is not None and current.get('fingerprint') == digest and current.get('updated') == updated:
+            return
+        self.forgotten.discard(key)
+        self.pending[key] = {'_key': key, 'kind': kind, 'name': name, 'fingerprint': digest, 'updated': updated}
+
+    def applied(self, kind, name, digest, response):
+        """
+        Queue the record of an entry written with the desired state digest
+        was computed from, taking its updated timestamp from the response to
+        the write. A digest of None stands for a deleted entry
+        """
+        if digest is None:
+            self.forget(kind, name)
+            return
+        self.record(kind, name, digest, entry_updated(response))
+
+    def forget(self, kind, name):
+        """
+        Queue the removal of the record of an entry
+        """
+        key = self._key(kind, name)
+        self.pending.pop(key, None)
+        if key in (self.records or {}):
+            self.forgotten.add(key)
+
+    def save(self):
+        """
+        Write the queued records back to the KV store, returns the error
+        messages of the requests that failed. The KV store only takes JSON
+        documents sent as such, the writes go out with a JSON content type
+        """
+        if not self.pending and not self.forgotten:
+            return []
+
+        if self.missing:
+            try:
+                self.splunk_request._send_request(
+                    'POST', self.splunk_request._rest_url(self.config_path), payload=urlencode({'name': self.collection})
+                )
+            except SplunkRequestError as e:
+                return [to_text(e)]
+            self.missing = False
+
+        records = list(self.pending.values())
+        operations = [
+            ('POST', '{0}/batch_save'.format(self.data_path), json.dumps(records[start:start + BATCH_SAVE_SIZE]))
+            for start in range(0, len(records), BATCH_SAVE_SIZE)
+        ]
+        operations.extend(('DELETE', '{0}/{1}'.format(self.data_path, key), None) for key in sorted(self.forgotten))
+
+        results = self.splunk_request.run_batch(operations, headers=JSON_HEADERS)
+        errors = [result['msg'] for result in results if result['failed']]
+        self.pending = {}
+        self.forgotten = set()
+        return errors
@@ -0,0 +1,101 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from ansible.module_utils._text import to_bytes, to_text
+
+import fcntl
+import hashlib
+import os
+import random
+import time
+
+# Seconds between two looks for a free in-flight slot
+SLOT_POLL_INTERVAL = 0.01
+
+
+class HostLimiter(object):
+    """
+    Limits on the requests sent to one splunkd host, shared by every module
+    running on the controller at the same time whatever fork or thread it
+    runs in. State lives in small files under directory, locked with flock:
+
+    - a schedule file holding the time the next request may start, each
+      request moves it on by 1 / rate seconds like _Throttle does in memory
+    - one lock file per in-flight slot, a request holds the lock of a slot
+      for as long as it runs. The kernel drops the lock of a process that
+      dies so a slot is never lost
+    """
+
+    def __init__(self, directory, host, rate=0, concurrency=0):
+
+        self.interval = 1.0 / rate if rate else 0
+        self.concurrency = concurrency or 0
+
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory, 0o700)
+            except OSError:
+                # Another fork made it first
+                if not os.path.isdir(directory):
+                    raise
+        key = hashlib.sha1(to_bytes(host)).hexdigest()[:16]
+        self.schedule_path = os.path.join(directory, '{0}.schedule'.format(key))
+        self.slot_paths = [os.path.join(directory, '{0}.slot{1}'.format(key, i)) for i in range(self.concurrency)]
+
+    def _wait_turn(self):
+        """
+        Reserve the next start time in the shared schedule and sleep until it
+        """
+        fd = os.open(self.schedule_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                next_start = float(to_text(os.read(fd, 64)).strip() or 0)
+            except ValueError:
+                next_start = 0
+            now = time.time()
+            start = max(now, next_start)
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, to_bytes(repr(start + self.interval)))
+        finally:
+            # Closing the file drops the lock
+            os.close(fd)
+        if start > now:
+            time.sleep(start - now)
+
+    def _take_slot(self):
+        """
+        Lock a free in-flight slot, waiting for one to free up, and return
+        its open file
+        """
+        while True:
+            first = random.randrange(self.concurrency)
+            for i in range(self.concurrency):
+                path = self.slot_paths[(first + i) % self.concurrency]
+                fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except (IOError, OSError):
+                    os.close(fd)
+                    continue
+                return fd
+            time.sleep(SLOT_POLL_INTERVAL * (1 + random.random()))
+
+    def acquire(self):
+        """
+        Wait until a request may be sent to the host, returns the slot to
+        hand back to release once it is done
+        """
+        if self.interval:
+            self._wait_turn()
+        if self.concurrency:
+            return self._take_slot()
+        return None
+
+    def release(self, slot):
+        if slot is not None:
+            os.close(slot)
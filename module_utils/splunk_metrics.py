@@ -0,0 +1,93 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from ansible.module_utils._text import to_text
+
+import json
+import math
+import threading
+import time
+
+
+def _percentile(values, percent):
+    """
+    Nearest rank percentile of an already sorted list
+    """
+    if not values:
+        return 0
+    rank = int(math.ceil(percent / 100.0 * len(values))) - 1
+    return values[min(max(rank, 0), len(values) - 1)]
+
+
+def response_size(response):
+    """
+    Size in bytes of a response as splunkd sent it, the httpapi connection
+    only hands back the decoded json so it is serialized again to measure it
+    """
+    if isinstance(response, (dict, list)):
+        return len(json.dumps(response, separators=(',', ':')))
+    return len(to_text(response or ''))
+
+
+class RequestMetrics(object):
+    """
+    Timing and size of every REST call a module makes. Records are kept in
+    memory for the module result and, when a log path is given, appended to
+    a JSON-lines file on the controller so REST cost can be followed across
+    runs. Records may come from the batch worker threads
+    """
+
+    def __init__(self, log_path=None, context=None):
+
+        self.log_path = log_path
+        self.context = context or {}
+        self.records = []
+        self.lock = threading.Lock()
+
+    def record(self, method, path, status, latency, response, failed=False):
+        record = {
+            'method': method,
+            'path': path.split('?', 1)[0],
+            'status': status,
+            'latency': round(latency, 6),
+            'bytes': response_size(response),
+            'failed': failed,
+        }
+        with self.lock:
+            self.records.append(record)
+            if self.log_path:
+                line = dict(self.context)
+                line.update(record)
+                line['time'] = time.time()
+                try:
+                    with open(self.log_path, 'a') as f:
+                        f.write(json.dumps(line) + '\n')
+                except (IOError, OSError):
+                    # Metrics must never fail the task
+                    pass
+
+    def summary(self):
+        """
+        Aggregate of the recorded calls, returned as splunk_metrics
+        """
+        with self.lock:
+            records = list(self.records)
+
+        latencies = sorted(r['latency'] for r in records)
+        methods = {}
+        for r in records:
+            methods[r['method']] = methods.get(r['method'], 0) + 1
+
+        return {
+            'requests': len(records),
+            'methods': methods,
+            'failed': len([r for r in records if r['failed']]),
+            'latency_total': round(sum(latencies), 6),
+            'latency_p50': _percentile(latencies, 50),
+            'latency_p95': _percentile(latencies, 95),
+            'latency_max': latencies[-1] if latencies else 0,
+            'bytes': sum(r['bytes'] for r in records),
+        }
@@ -0,0 +1,396 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from ansible.module_utils._text import to_bytes
+
+import hashlib
+import heapq
+import math
+import re
+
+# Lowest and highest value of each cron field: minute, hour, day of month,
+# month and day of week
+CRON_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+
+# Names cron takes for the months and days of the week, in either case
+CRON_NAMES = [
+    {}, {}, {},
+    dict((name, number) for number, name in enumerate(
+        ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], 1)),
+    dict((name, number) for number, name in enumerate(['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat'])),
+]
+
+# Average number of days in a month, for schedules restricted to some days
+# of the month
+DAYS_PER_MONTH = 30.44
+
+# Seconds in each unit of a Splunk relative time modifier
+TIME_UNITS = {}
+for _names, _seconds in [
+    (('s', 'sec', 'secs', 'second', 'seconds'), 1),
+    (('m', 'min', 'mins', 'minute', 'minutes'), 60),
+    (('h', 'hr', 'hrs', 'hour', 'hours'), 3600),
+    (('d', 'day', 'days'), 86400),
+    (('w', 'week', 'weeks'), 7 * 86400),
+    (('mon', 'month', 'months'), 30 * 86400),
+    (('q', 'qtr', 'qtrs', 'quarter', 'quarters'), 90 * 86400),
+    (('y', 'yr', 'yrs', 'year', 'years'), 365 * 86400),
+]:
+    TIME_UNITS.update((name, _seconds) for name in _names)
+
+RELATIVE_TIME = re.compile(r'([+-])(\d*)([a-z]+)')
+
+MINUTES_PER_DAY = 1440
+
+# Widest schedule_window in minutes stagger gives a search
+STAGGER_MAX_WINDOW = 30
+
+# Minutes past the hours it runs at stagger moves a search running hourly
+# or less often, which keeps it in its hour
+STAGGER_MAX_OFFSET = 60
+
+# Order the scheduler starts the searches due at the same time in, by
+# schedule_priority
+SCHEDULE_PRIORITIES = {'highest': 0, 'higher': 1, 'default': 2}
+
+
+class CronSchedule(object):
+    """
+    A five field cron expression the way the Splunk scheduler reads it,
+    each field expanded to the set of values it fires on. Months and days of
+    the week may be given by their three letter names. Like cron, a
+    search restricted on both the day of month and the day of week runs on
+    the days matching either
+    """
+
+    def __init__(self, expression):
+
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError("{0}: a cron schedule has five fields".format(expression))
+
+        self.expression = expression
+        self.fields = fields
+        self.minutes, self.hours, self.days, self.months, self.weekdays = [
+            self._expand(field, low, high, names) for field, (low, high), names in zip(fields, CRON_RANGES, CRON_NAMES)
+        ]
+        # Sunday is both 0 and 7
+        if 7 in self.weekdays:
+            self.weekdays.discard(7)
+            self.weekdays.add(0)
+
+    def _value(self, text, names):
+        return names[text.lower()] if text.lower() in names else int(text)
+
+    def _expand(self, field, low, high, names):
+        values = set()
+        for part in field.split(','):
+            step = None
+            if '/' in part:
+                part, step = part.split('/', 1)
+                step = int(step)
+                if step < 1:
+                    raise ValueError("{0}: step of {1} out of range".format(self.expression, field))
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = [self._value(value, names) for value in part.split('-', 1)]
+            else:
+                start = self._value(part, names)
+                end = high if step else start
+            # Day of week 7 is another name for Sunday
+            if start < low or end > (7 if high == 6 else high) or start > end:
+                raise ValueError("{0}: {1} out of range".format(self.expression, field))
+            values.update(range(start, end + 1, step or 1))
+        return values
+
+    def minutes_of_day(self):
+        """
+        Sorted minutes of the day the schedule fires at, on the days it runs
+        """
+        return sorted(hour * 60 + minute for hour in self.hours for minute in self.minutes)
+
+    def day_fraction(self):
+        """
+        Share of the days of a year the schedule runs on
+        """
+        every_day, every_weekday = self.fields[2] == '*', self.fields[4] == '*'
+        if every_day and every_weekday:
+            fraction = 1.0
+        elif every_day:
+            fraction = len(self.weekdays) / 7.0
+        elif every_weekday:
+            fraction = min(1.0, len(self.days) / DAYS_PER_MONTH)
+        else:
+            fraction = min(1.0, len(self.weekdays) / 7.0 + len(self.days) / DAYS_PER_MONTH)
+        return fraction * len(self.months) / 12.0
+
+    def period(self):
+        """
+        Average seconds between two runs
+        """
+        return 86400.0 / (len(self.minutes) * len(self.hours) * self.day_fraction())
+
+    def regular_period(self):
+        """
+        Minutes between two runs when the schedule fires at a fixed interval
+        all day long and that interval divides the hour or is whole hours
+        dividing the day, the schedules a cron expression can shift. None
+        for any other schedule
+        """
+        minutes = self.minutes_of_day()
+        if len(minutes) == 1:
+            return MINUTES_PER_DAY
+        period = minutes[1] - minutes[0]
+        gaps = [b - a for a, b in zip(minutes, minutes[1:])] + [MINUTES_PER_DAY - minutes[-1] + minutes[0]]
+        if any(gap != period for gap in gaps):
+            return None
+        if 60 % period and (period % 60 or 24 % (period // 60)):
+            return None
+        return period
+
+    def at_offset(self, offset):
+        """
+        Cron expression of the same regular schedule moved offset minutes
+        into its interval when that is under an hour, to minute offset of
+        the hours it runs at otherwise. The hour and day fields of a
+        schedule of an hour or more are kept as they are
+        """
+        period = self.regular_period()
+        if period < 60:
+            minute = '*/{0}'.format(period) if not offset else '{0}-59/{1}'.format(offset, period)
+            return ' '.join([minute, '*'] + self.fields[2:])
+        return ' '.join([str(offset)] + self.fields[1:])
+
+    def minutes_at_offset(self, offset):
+        """
+        Minutes of the day the schedule at_offset returns fires at
+        """
+        period = self.regular_period()
+        if period < 60:
+            return list(range(offset, MINUTES_PER_DAY, period))
+        return sorted(hour * 60 + offset for hour in self.hours)
+
+
+def parse_cron(expression):
+    """
+    CronSchedule of a cron expression, None when it isn't one
+    """
+    try:
+        return CronSchedule(expression or '')
+    except ValueError:
+        return None
+
+
+def launch_histogram(expressions):
+    """
+    Searches launched in each minute of the day by a list of cron
+    expressions, the ones that can't be read are left out
+    """
+    histogram = [0] * MINUTES_PER_DAY
+    for expression in expressions:
+        schedule = parse_cron(expression)
+        if schedule is not None:
+            for minute in schedule.minutes_of_day():
+                histogram[minute] += 1
+    return histogram
+
+
+def histogram_summary(histogram):
+    return {
+        'peak': max(histogram),
+        'mean': round(sum(histogram) / float(len(histogram)), 2),
+        'busy_minutes': len([launches for launches in histogram if launches]),
+        'launches_per_minute': histogram,
+    }
+
+
+def stagger(schedules):
+    """
+    Spread the launches of a set of searches evenly over the day. Takes a
+    dict of search name to cron expression and returns the new expression
+    of each search whose schedule fires at a regular interval, keeping that
+    interval. A search running more than once an hour only moves within
+    its interval, the others only move within STAGGER_MAX_OFFSET minutes of
+    the hours they run at, so a daily report stays in its hour
+
+    Searches are placed from the shortest interval to the longest, which
+    have the most room to fill the gaps, and by a hash of their name within
+    an interval. Each starts from the offset its hash points at and moves
+    on to the next one until none of its launch minutes is at the even
+    share of launches per minute, so the placement only depends on the
+    name and on the searches placed before it: adding or removing a search
+    only moves the few searches that had to move on past its minutes
+    """
+    load = [0] * MINUTES_PER_DAY
+    movable = []
+    for name in sorted(schedules):
+        schedule = parse_cron(schedules[name])
+        if schedule is None:
+            continue
+        period = schedule.regular_period()
+        if period is None or period == 1:
+            # Schedules left where they are still take up their minutes
+            for minute in schedule.minutes_of_day():
+                load[minute] += 1
+            continue
+        digest = int(hashlib.sha1(to_bytes(name)).hexdigest(), 16)
+        movable.append((period, digest, name, schedule))
+
+    launches = sum(load) + sum(MINUTES_PER_DAY // period for period, digest, name, schedule in movable)
+    share = int(math.ceil(launches / float(MINUTES_PER_DAY)))
+
+    staggered = {}
+    for period, digest, name, schedule in sorted(movable):
+        span = min(period, STAGGER_MAX_OFFSET)
+        preferred = digest % span
+        best, best_peak = None, None
+        for step in range(span):
+            offset = (preferred + step) % span
+            peak = max(load[minute] for minute in schedule.minutes_at_offset(offset))
+            if peak < share:
+                best = offset
+                break
+            if best_peak is None or peak < best_peak:
+                best, best_peak = offset, peak
+        for minute in schedule.minutes_at_offset(best):
+            load[minute] += 1
+        staggered[name] = schedule.at_offset(best)
+    return staggered
+
+
+def stagger_window(expression):
+    """
+    schedule_window for a staggered search, half its interval in minutes
+    up to STAGGER_MAX_WINDOW, letting the scheduler push a run back while
+    it is busy without running into the next one
+    """
+    schedule = parse_cron(expression)
+    period = schedule.regular_period() if schedule is not None else None
+    if not period:
+        return None
+    return min(period // 2, STAGGER_MAX_WINDOW) or None
+
+
+def is_realtime(modifier):
+    """
+    If a dispatch time modifier makes a real-time search
+    """
+    return (modifier or '').strip().lower().startswith('rt')
+
+
+def time_offset(modifier):
+    """
+    Seconds from now a relative time modifier such as -24h@h, now or rt-5m
+    points at, leaving out the snap to a unit which moves it by less than
+    that unit. None for absolute times and modifiers that can't be read
+    """
+    text = (modifier or '').strip().lower()
+    if text.startswith('rt'):
+        text = text[2:]
+    text = text.split('@', 1)[0]
+    if text in ('', 'now'):
+        return 0
+
+    offset = 0
+    position = 0
+    for match in RELATIVE_TIME.finditer(text):
+        if match.start() != position or match.group(3) not in TIME_UNITS:
+            return None
+        amount = int(match.group(2) or 1) * TIME_UNITS[match.group(3)]
+        offset += amount if match.group(1) == '+' else -amount
+        position = match.end()
+    if position != len(text):
+        return None
+    return offset
+
+
+def simulate_scheduler(searches, limit):
+    """
+    Play a day of the search scheduler with limit searches running at once.
+    Each search is a dict of name, cron_schedule, run_duration in seconds,
+    schedule_priority, realtime_schedule and schedule_window in minutes.
+
+    Runs due at the same time start by schedule_priority, searches without
+    a schedule window first. A real-time scheduled run that finds no free
+    slot waits for one until the end of its schedule window and is skipped
+    after, as it is when the previous run of the same search is still
+    going. A continuous scheduled run is never skipped, it waits for a free
+    slot and for its previous run however long it takes. Day restrictions
+    of the schedules are left out, the day played is one every search runs
+    """
+    launches = []
+    for index, search in enumerate(searches):
+        schedule = parse_cron(search['cron_schedule'])
+        if schedule is not None:
+            launches.extend((minute * 60, index) for minute in schedule.minutes_of_day())
+    launches.sort()
+
+    stats = [dict(runs=0, started=0, skipped=0, delayed=0, delay=0.0) for search in searches]
+    running = []
+    in_flight = set()
+    pending = []
+    peak = 0
+    i = 0
+    while i < len(launches) or pending:
+        upcoming = []
+        if i < len(launches):
+            upcoming.append(launches[i][0])
+        if running:
+            upcoming.append(running[0][0])
+        if not upcoming:
+            break
+        now = min(upcoming)
+
+        while running and running[0][0] <= now:
+            in_flight.discard(heapq.heappop(running)[1])
+        while i < len(launches) and launches[i][0] <= now:
+            due, index = launches[i]
+            search = searches[index]
+            stats[index]['runs'] += 1
+            rank = SCHEDULE_PRIORITIES.get(str(search['schedule_priority']).lower(), SCHEDULE_PRIORITIES['default'])
+            heapq.heappush(pending, (rank, bool(search['schedule_window']), due, index))
+            i += 1
+
+        held = []
+        while pending and len(running) < limit:
+            item = heapq.heappop(pending)
+            due, index = item[2], item[3]
+            search = searches[index]
+            if search['realtime_schedule']:
+                if now > due + search['schedule_window'] * 60 or index in in_flight:
+                    stats[index]['skipped'] += 1
+                    continue
+            elif index in in_flight:
+                held.append(item)
+                continue
+            heapq.heappush(running, (now + search['run_duration'], index))
+            in_flight.add(index)
+            stats[index]['started'] += 1
+            if now > due:
+                stats[index]['delayed'] += 1
+                stats[index]['delay'] += now - due
+        for item in held:
+            heapq.heappush(pending, item)
+        peak = max(peak, len(running))
+
+    for item in pending:
+        stats[item[3]]['skipped'] += 1
+
+    runs = sum(stat['runs'] for stat in stats)
+    skipped = sum(stat['skipped'] for stat in stats)
+    slot_seconds = sum(stat['started'] * search['run_duration'] for stat, search in zip(stats, searches))
+    return {
+        'limit': limit,
+        'runs': runs,
+        'skipped': skipped,
+        'skip_ratio': round(float(skipped) / runs, 4) if runs else 0.0,
+        'delayed': sum(stat['delayed'] for stat in stats),
+        'delay_mean': round(sum(stat['delay'] for stat in stats) / max(1, sum(stat['started'] for stat in stats)), 2),
+        'peak_running': peak,
+        'utilization': round(slot_seconds / float(limit * 86400), 4) if limit else 0.0,
+        'searches': dict((search['name'], stat) for search, stat in zip(searches, stats)),
+    }
@@ -0,0 +1,333 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from ansible.module_utils.splunk_schedule import parse_cron, is_realtime, time_offset
+
+# Characters that end a bare word of SPL
+SPL_DELIMITERS = frozenset('"`|[](),=<>!')
+
+# Commands that read the raw events of a data model where tstats could read
+# its acceleration summaries
+DATAMODEL_COMMANDS = frozenset(['datamodel', 'from', 'pivot'])
+
+# Costly commands and why
+COSTLY_COMMANDS = {
+    'transaction': 'transaction keeps every open transaction in memory, stats by the grouping fields is far cheaper',
+    'join': 'join runs a subsearch capped at 50000 results, stats over both datasets is cheaper and complete',
+    'map': 'map dispatches one search per input result',
+}
+
+# Fields kept in the index that tstats can filter and group on
+INDEXED_FIELDS = frozenset(['index', 'sourcetype', 'source', 'host', 'splunk_server', '_time', '_indextime'])
+
+# Statistical functions tstats supports over indexed fields
+TSTATS_FUNCTIONS = frozenset(['count', 'dc', 'distinct_count', 'earliest', 'latest', 'max', 'min', 'values'])
+
+# Transforming commands a raw search followed by nothing else could be
+# turned into tstats
+TSTATS_COMMANDS = frozenset(['chart', 'stats', 'timechart'])
+
+# Dispatch window this many times wider than the time between two runs of a
+# search has each event read this many times over
+WIDE_WINDOW_RATIO = 6
+
+SEVERITIES = ['info', 'warning', 'error']
+
+
+def tokenize(spl):
+    """
+    Split SPL into (kind, text) tokens: 'string' for quoted strings without
+    their quotes, 'macro' for backtick macros, 'op' for pipes, brackets,
+    parenthesis, commas and comparison operators and 'word' for the rest
+    """
+    tokens = []
+    i = 0
+    while i < len(spl):
+        char = spl[i]
+        if char.isspace():
+            i += 1
+        elif char == '"':
+            end = i + 1
+            while end < len(spl) and spl[end] != '"':
+                end += 2 if spl[end] == '\\' else 1
+            tokens.append(('string', spl[i + 1:end]))
+            i = end + 1
+        elif char == '`':
+            end = spl.find('`', i + 1)
+            end = len(spl) if end == -1 else end
+            tokens.append(('macro', spl[i + 1:end]))
+            i = end + 1
+        elif char in '!<>=':
+            end = i + 2 if spl[i + 1:i + 2] == '=' else i + 1
+            tokens.append(('op', spl[i:end]))
+            i = end
+        elif char in SPL_DELIMITERS:
+            tokens.append(('op', char))
+            i += 1
+        else:
+            end = i
+            while end < len(spl) and not spl[end].isspace() and spl[end] not in SPL_DELIMITERS:
+                end += 1
+            tokens.append(('word', spl[i:end]))
+            i = end
+    return tokens
+
+
+def split_pipeline(tokens):
+    """
+    Split the tokens of a search into its commands, each a list of tokens,
+    and its subsearches, each a list of tokens left for another
+    split_pipeline. A search that starts with a pipe starts with a
+    generating command, any other with an implicit search command which is
+    given its name here
+    """
+    commands = [[]]
+    subsearches = []
+    depth = 0
+    for token in tokens:
+        if depth:
+            if token == ('op', ']'):
+                depth -= 1
+                if not depth:
+                    continue
+            elif token == ('op', '['):
+                depth += 1
+            subsearches[-1].append(token)
+        elif token == ('op', '['):
+            depth = 1
+            subsearches.append([])
+        elif token == ('op', '|'):
+            commands.append([])
+        else:
+            commands[-1].append(token)
+
+    if not commands[0]:
+        commands.pop(0)
+    elif command_name(commands[0]) != 'search':
+        commands[0].insert(0, ('word', 'search'))
+    return [command for command in commands if command], subsearches
+
+
+def command_name(command):
+    kind, text = command[0]
+    return text.lower() if kind == 'word' else ''
+
+
+def _leading_wildcard(text):
+    return text.startswith('*') and text.strip('*') != ''
+
+
+def _base_search_terms(command):
+    """
+    The (field, values) pairs of a search command, field is None for free
+    text terms. Values of field IN (...) lists are all kept
+    """
+    terms = []
+    i = 1
+    while i < len(command):
+        kind, text = command[i]
+        following = command[i + 1] if i + 1 < len(command) else (None, None)
+        if kind in ('word', 'string') and following[0] == 'op' and following[1] in ('=', '==', '!='):
+            value = command[i + 2] if i + 2 < len(command) else ('word', '')
+            terms.append((text.lower(), [value[1]] if value[0] in ('word', 'string') else []))
+            i += 3
+        elif kind == 'word' and following[0] == 'word' and following[1].upper() == 'IN':
+            values = []
+            i += 2
+            if i < len(command) and command[i] == ('op', '('):
+                i += 1
+                while i < len(command) and command[i] != ('op', ')'):
+                    if command[i][0] in ('word', 'string'):
+                        values.append(command[i][1])
+                    i += 1
+            terms.append((text.lower(), values))
+            i += 1
+        elif kind == 'word' and text.upper() in ('AND', 'OR', 'NOT'):
+            i += 1
+        elif kind in ('word', 'string'):
+            terms.append((None, [text]))
+            i += 1
+        else:
+            if kind == 'macro':
+                terms.append((None, []))
+            i += 1
+    return terms
+
+
+def _tstats_candidate(commands):
+    """
+    If a raw search filtering only on indexed fields, followed by a single
+    transforming command over indexed fields, could run as tstats
+    """
+    if len(commands) != 2 or command_name(commands[0]) != 'search' or command_name(commands[1]) not in TSTATS_COMMANDS:
+        return False
+
+    for field, values in _base_search_terms(commands[0]):
+        if field is None:
+            return False
+        if field not in INDEXED_FIELDS and field not in ('earliest', 'latest'):
+            return False
+
+    command = commands[1]
+    for i, (kind, text) in enumerate(command[1:], 1):
+        previous = command[i - 1]
+        following = command[i + 1] if i + 1 < len(command) else (None, None)
+        if kind != 'word' or text.lower() == 'by':
+            continue
+        if following == ('op', '='):
+            # An option of the command such as span=1h
+            continue
+        if previous == ('op', '=') or previous[1].lower() == 'as':
+            continue
+        if following == ('op', '('):
+            if text.lower() not in TSTATS_FUNCTIONS:
+                return False
+        elif text.lower() == 'as':
+            continue
+        elif text.lower() not in INDEXED_FIELDS and not (text.lower() == 'count' and previous[1] != '('):
+            return False
+    return True
+
+
+def lint_pipeline(tokens, subsearch=False):
+    """
+    Findings of the SPL cost rules over a search, given as its tokens, and
+    the subsearches it holds
+    """
+    findings = []
+    commands, subsearches = split_pipeline(tokens)
+    if not commands:
+        return findings
+    where = 'subsearch: ' if subsearch else ''
+
+    first = command_name(commands[0])
+    if first == 'search':
+        terms = _base_search_terms(commands[0])
+        indexes = [value for field, values in terms if field == 'index' for value in values]
+        constrained = any(
+            kind == 'macro' or (kind == 'word' and text.lower() == 'eventtype')
+            for kind, text in commands[0]
+        )
+        if not indexes and not constrained:
+            findings.append(dict(rule='no-index', severity='warning', msg=(
+                '{0}the search names no index, so it reads the default indexes of the user it runs as'.format(where)
+            )))
+        elif any(value.strip('*') == '' for value in indexes):
+            findings.append(dict(rule='no-index', severity='warning', msg=(
+                '{0}index=* reads every index, name the indexes the events live in'.format(where)
+            )))
+
+        wildcards = sorted(set(value for field, values in terms if field != 'index' for value in values if _leading_wildcard(value)))
+        if wildcards:
+            findings.append(dict(rule='leading-wildcard', severity='warning', msg=(
+                '{0}{1} start with a wildcard, the whole index lexicon is scanned to match them'.format(where, ', '.join(wildcards))
+            )))
+    elif first in DATAMODEL_COMMANDS:
+        findings.append(dict(rule='tstats', severity='info', msg=(
+            '{0}{1} reads the raw events of the data model, tstats from datamodel= reads its acceleration summaries'.format(where, first)
+        )))
+
+    if _tstats_candidate(commands):
+        findings.append(dict(rule='tstats', severity='info', msg=(
+            '{0}the search only filters and groups on indexed fields, tstats answers it without reading raw events'.format(where)
+        )))
+
+    for command in commands:
+        name = command_name(command)
+        if name in COSTLY_COMMANDS:
+            findings.append(dict(rule=name, severity='warning', msg='{0}{1}'.format(where, COSTLY_COMMANDS[name])))
+
+    for tokens in subsearches:
+        findings.extend(lint_pipeline(tokens, subsearch=True))
+    return findings
+
+
+def lint_search(search, time_earliest=None, time_latest=None, cron_schedule=None):
+    """
+    Findings of the SPL cost rules over a scheduled search, each a dict of
+    rule, severity and msg.
+
+    The correlation search defaults, -24h every five minutes, read each event
+    288 times over and are reported by wide-window like any other window that
+    wide: a search only needs to read the interval since its last run plus
+    the indexing lag of its events
+    """
+    findings = lint_pipeline(tokenize(search or ''))
+
+    if is_realtime(time_earliest) or is_realtime(time_latest):
+        findings.append(dict(rule='realtime', severity='error', msg=(
+            'real-time searches hold a search slot on every indexer for as long as they run'
+        )))
+        return findings
+
+    if (time_earliest or '').strip() in ('', '0'):
+        findings.append(dict(rule='wide-window', severity='error', msg=(
+            'the search reads all time on every run, set time_earliest'
+        )))
+        return findings
+
+    earliest, latest = time_offset(time_earliest), time_offset(time_latest)
+    schedule = parse_cron(cron_schedule)
+    if schedule is None:
+        findings.append(dict(rule='cron', severity='info', msg=(
+            'cron_schedule "{0}" can\'t be read, the dispatch window was not checked against it'.format(cron_schedule)
+        )))
+    elif earliest is not None and latest is not None:
+        window = latest - earliest
+        period = schedule.period()
+        if window > WIDE_WINDOW_RATIO * period:
+            findings.append(dict(rule='wide-window', severity='warning', msg=(
+                'the search reads {0} of events every {1}, each event is read {2} times over'.format(
+                    time_earliest + (' to ' + time_latest if latest else ''),
+                    format_period(period), int(window // period)
+                )
+            )))
+    return findings
+
+
+def format_period(seconds):
+    for unit, size in (('d', 86400), ('h', 3600), ('m', 60)):
+        if seconds >= size and seconds % size == 0:
+            return '{0}{1}'.format(int(seconds // size), unit)
+    return '{0}s'.format(int(seconds))
+
+
+def lint_correlation_search(params):
+    """
+    Findings of the SPL cost rules over the params of a correlation search
+    """
+    return lint_search(params['search'], params['time_earliest'], params['time_latest'], params['cron_schedule'])
+
+
+def spl_lint_gate(module, searches):
+    """
+    Lint the SPL of the present searches before anything is sent to
+    Splunk. Every finding is a warning with spl_lint=warn, with
+    spl_lint=fail the module fails on any warning or error finding
+    """
+    mode = module.params['spl_lint']
+    if mode == 'none':
+        return
+
+    ignore = set(module.params['spl_lint_ignore'])
+    findings = {}
+    for search in searches:
+        if search['state'] == 'absent':
+            continue
+        found = [finding for finding in lint_correlation_search(search) if finding['rule'] not in ignore]
+        if found:
+            findings[search['name']] = found
+
+    failing = [
+        name for name in sorted(findings)
+        if any(SEVERITIES.index(finding['severity']) >= SEVERITIES.index('warning') for finding in findings[name])
+    ]
+    if mode == 'fail' and failing:
+        module.fail_json(msg="SPL lint failed for {0}.".format(', '.join(failing)), spl_lint=findings)
+
+    for name in sorted(findings):
+        for finding in findings[name]:
+            module.warn("{0}: [{1}] {2} ({3})".format(name, finding['severity'], finding['msg'], finding['rule']))
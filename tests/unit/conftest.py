@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import json
+import os
+import sys
+import time
+
+import pytest
+
+import ansible.module_utils
+from ansible.module_utils import basic
+from ansible.module_utils._text import to_bytes, to_text
+
+ROLE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Let the tests import ansible.module_utils.splunk* from the role, the way
+# Ansible resolves them for the modules
+if os.path.join(ROLE_DIR, 'module_utils') not in ansible.module_utils.__path__:
+    ansible.module_utils.__path__.append(os.path.join(ROLE_DIR, 'module_utils'))
+
+# The modules themselves and the stand-in splunkd of the benchmarks
+for path in (os.path.join(ROLE_DIR, 'library'), os.path.join(ROLE_DIR, 'benchmarks')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture
+def splunkd(monkeypatch):
+    """
+    A FakeSplunkd the modules talk to in-process, through a stand-in for the
+    httpapi connection that answers every request from it. The stand-in
+    exposes no credentials, so batches go over it one request at a time.
+    The method, path and payload of each request are kept in sent
+    """
+    from fake_splunkd import FakeSplunkd
+    import ansible.module_utils.splunk as splunk
+
+    fake = FakeSplunkd(padding_keys=0)
+    fake.sent = []
+
+    class Connection(object):
+        def __init__(self, socket_path):
+            self.socket_path = socket_path
+
+        def get_option(self, name):
+            return None
+
+        def send_request(self, method, path, payload=None, headers=None):
+            fake.sent.append((method, path.split('?')[0].lstrip('/'), payload))
+            content_type = (headers or {}).get('Content-Type', 'application/x-www-form-urlencoded')
+            code, response = fake.handle(method, '/' + path.lstrip('/'), to_text(payload) if payload else '', content_type)
+            # A copy, like a response decoded off the wire
+            response = json.loads(json.dumps(response))
+            if isinstance(response, dict) and 'entry' in response:
+                response['updated'] = '{0:.6f}'.format(time.time())
+            return code, response
+
+    monkeypatch.setattr(splunk, 'Connection', Connection)
+    monkeypatch.setattr(splunk, '_CONNECTIONS', {})
+    return fake
+
+
+@pytest.fixture
+def run_module(splunkd, capsys, monkeypatch):
+    """
+    Run the main() of a module against splunkd and return its json result
+    """
+    def run(name, args, check_mode=False):
+        args = dict(args, _ansible_check_mode=check_mode, _ansible_remote_tmp='/tmp', _ansible_keep_remote_files=False)
+        monkeypatch.setattr(basic, '_ANSIBLE_ARGS', to_bytes(json.dumps({'ANSIBLE_MODULE_ARGS': args})))
+        if hasattr(basic, '_ANSIBLE_PROFILE'):
+            monkeypatch.setattr(basic, '_ANSIBLE_PROFILE', 'legacy')
+        monkeypatch.setattr(basic.AnsibleModule, '_socket_path', '/dev/null', raising=False)
+        module = __import__(name)
+        capsys.readouterr()
+        with pytest.raises(SystemExit):
+            module.main()
+        return json.loads(capsys.readouterr().out)
+    return run
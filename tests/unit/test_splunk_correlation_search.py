@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+SEARCHES = 'servicesNS/nobody/SplunkEnterpriseSecuritySuite/saved/searches'
+
+
+def search_args(tmpdir, **kwargs):
+    args = dict(
+        name='Web Uptime Alert',
+        description='Web servers that stopped answering',
+        search='index=web sourcetype=access_combined | stats count by host',
+        state='present',
+        snapshot_cache_dir=str(tmpdir),
+    )
+    args.update(kwargs)
+    return args
+
+
+def test_delete_then_look_up_again(run_module, splunkd, tmpdir):
+    assert run_module('splunk_correlation_search', search_args(tmpdir))['changed']
+    assert 'Web Uptime Alert' in splunkd.collections[SEARCHES]
+
+    result = run_module('splunk_correlation_search', search_args(tmpdir, state='absent'))
+    assert result['changed']
+    assert 'Web Uptime Alert' not in splunkd.collections[SEARCHES]
+    assert splunkd.sent[-1][:2] == ('DELETE', SEARCHES + '/Web+Uptime+Alert')
+
+    # The cached snapshot of the collection went with the delete
+    assert not run_module('splunk_correlation_search', search_args(tmpdir, state='absent'))['changed']
+    result = run_module('splunk_correlation_search', search_args(tmpdir))
+    assert result['changed']
+    assert 'Web Uptime Alert' in splunkd.collections[SEARCHES]
+
+
+def test_snapshot_sees_changes_made_outside(run_module, splunkd, tmpdir):
+    run_module('splunk_correlation_search', search_args(tmpdir))
+    assert not run_module('splunk_correlation_search', search_args(tmpdir))['changed']
+
+    # Edited in Splunk Web within the snapshot ttl
+    splunkd.seed(SEARCHES, 'Web Uptime Alert', {'description': 'edited by hand'})
+    del splunkd.sent[:]
+    result = run_module('splunk_correlation_search', search_args(tmpdir), check_mode=True)
+    assert result['changed']
+    # One listing of updated timestamps and one read of the entry that changed
+    assert [(method, path) for method, path, payload in splunkd.sent] == [
+        ('GET', SEARCHES), ('GET', SEARCHES + '/Web+Uptime+Alert'),
+    ]
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+INPUTS = 'servicesNS/nobody/search/data/inputs'
+
+
+def test_network_inputs(run_module, splunkd):
+    splunkd.seed(INPUTS + '/tcp/raw', '9001', {'index': 'network', 'disabled': False})
+    splunkd.seed(INPUTS + '/udp', '514', {'index': 'syslog', 'disabled': False})
+
+    facts = run_module('splunk_es_facts', dict(gather_subset=['network_inputs']))['ansible_facts']['splunk_es']
+    assert sorted(facts['network_inputs']) == ['tcp/raw/9001', 'udp/514']
+    assert facts['network_inputs']['udp/514']['index'] == 'syslog'
+    assert ('GET', INPUTS + '/udp') in [(method, path) for method, path, payload in splunkd.sent]
+
+
+def test_missing_network_collection_is_empty(run_module, splunkd):
+    splunkd.seed(INPUTS + '/tcp/raw', '9001', {'index': 'network'})
+    del splunkd.collections[INPUTS + '/tcp/cooked']
+
+    result = run_module('splunk_es_facts', dict(gather_subset=['network_inputs']))
+    assert not result.get('failed')
+    assert sorted(result['ansible_facts']['splunk_es']['network_inputs']) == ['tcp/raw/9001']
+
+    # And in incremental mode
+    result = run_module('splunk_es_facts', dict(gather_subset=['network_inputs'], since='0'))
+    assert not result.get('failed')
+    assert sorted(result['ansible_facts']['splunk_es']['network_inputs']) == ['tcp/raw/9001']
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from ansible.module_utils.connection import ConnectionError
+
+INPUTS = 'servicesNS/nobody/search/data/inputs'
+MONITORS = INPUTS + '/monitor'
+
+
+def monitor_args(**kwargs):
+    args = dict(
+        inputs=[dict(name='/var/log/demo.log', index='main'), dict(name='/var/log/other.log', index='main')],
+        state_ledger='ansible_state',
+    )
+    args.update(kwargs)
+    return args
+
+
+def test_ledger_saved_as_json_and_skips_converged_run(run_module, splunkd):
+    result = run_module('splunk_data_input_monitors', monitor_args())
+    assert result['changed']
+    assert not result.get('warnings')
+    # The fake splunkd turns away a batch_save that isn't sent as JSON
+    assert len(splunkd.kvstore['ansible_state']) == 2
+
+    del splunkd.sent[:]
+    result = run_module('splunk_data_input_monitors', monitor_args())
+    assert not result['changed']
+    assert [method for method, path, payload in splunkd.sent] == ['GET', 'GET']
+
+
+def test_ledger_needs_plugin_taking_headers(run_module, splunkd, monkeypatch):
+    import ansible.module_utils.splunk as splunk
+
+    send_request = splunk.Connection.send_request
+    refused = []
+
+    def form_only(self, method, path, payload=None, **kwargs):
+        # What the JSON-RPC call to a plugin without a headers argument raises
+        if kwargs:
+            refused.append(path)
+            raise ConnectionError("send_request() got an unexpected keyword argument 'headers'")
+        return send_request(self, method, path, payload=payload)
+
+    monkeypatch.setattr(splunk.Connection, 'send_request', form_only)
+
+    result = run_module('splunk_data_input_monitors', monitor_args(request_retries=3))
+    assert result['changed']
+    assert sorted(splunkd.collections[MONITORS]) == ['/var/log/demo.log', '/var/log/other.log']
+    assert not splunkd.kvstore['ansible_state']
+    assert len(result['warnings']) == 1
+    assert "can't set the headers" in str(result['warnings'][0])
+    # Not retried as a dropped connection
+    assert len(refused) == 1
+
+
+def test_ledger_keeps_network_inputs_by_collection(run_module, splunkd):
+    args = dict(
+        inputs=[
+            dict(name='9001', protocol='tcp', datatype='raw', index='network'),
+            dict(name='9001', protocol='tcp', datatype='cooked', state='disabled'),
+            dict(name='9002', protocol='tcp', datatype='raw', state='absent'),
+        ],
+        state_ledger='ansible_state',
+    )
+    result = run_module('splunk_data_input_networks', args)
+    assert sorted(result['changes']) == ['tcp/cooked/9001', 'tcp/raw/9001']
+    assert sorted(result['written']) == [INPUTS + '/tcp/cooked', INPUTS + '/tcp/raw']
+    assert len(splunkd.kvstore['ansible_state']) == 2
+
+    del splunkd.sent[:]
+    result = run_module('splunk_data_input_networks', args)
+    assert not result['changed']
+    # The ledger, then the updated timestamps of each collection
+    assert [method for method, path, payload in splunkd.sent] == ['GET', 'GET', 'GET']
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import pytest
+
+from ansible.module_utils.splunk_schedule import (
+    histogram_summary, launch_histogram, parse_cron, simulate_scheduler, stagger, stagger_window,
+)
+
+
+def test_parse_cron_fields():
+    schedule = parse_cron('*/15 8-17 * * 1-5')
+    assert sorted(schedule.minutes) == [0, 15, 30, 45]
+    assert sorted(schedule.hours) == list(range(8, 18))
+    assert sorted(schedule.weekdays) == [1, 2, 3, 4, 5]
+    assert schedule.regular_period() is None
+
+
+@pytest.mark.parametrize('names, numbers', [
+    ('0 6 * JAN-MAR MON-FRI', '0 6 * 1-3 1-5'),
+    ('0 6 * jan,jul sun', '0 6 * 1,7 0'),
+    ('0 6 * * SAT,SUN', '0 6 * * 6,0'),
+])
+def test_parse_cron_names(names, numbers):
+    named, numbered = parse_cron(names), parse_cron(numbers)
+    assert named.months == numbered.months
+    assert named.weekdays == numbered.weekdays
+    assert named.period() == numbered.period()
+
+
+@pytest.mark.parametrize('expression', [None, '', '* * * *', '61 * * * *', '0 0 * * FOO', '*/0 * * * *'])
+def test_parse_cron_invalid(expression):
+    assert parse_cron(expression) is None
+
+
+@pytest.mark.parametrize('expression, period', [
+    ('*/5 * * * *', 5),
+    ('7 * * * *', 60),
+    ('0 */4 * * *', 240),
+    ('30 2 * * *', 1440),
+    ('*/7 * * * *', None),
+    ('0 9,17 * * *', None),
+])
+def test_regular_period(expression, period):
+    assert parse_cron(expression).regular_period() == period
+
+
+@pytest.mark.parametrize('expression, offset, shifted', [
+    ('*/5 * * * *', 0, '*/5 * * * *'),
+    ('*/5 * * * *', 3, '3-59/5 * * * *'),
+    ('0 * * * *', 42, '42 * * * *'),
+    ('0 */4 * * 1-5', 10, '10 */4 * * 1-5'),
+    ('0 0 * * *', 15, '15 0 * * *'),
+    ('0 2 * * *', 42, '42 2 * * *'),
+    ('30 9 * * 1-5', 5, '5 9 * * 1-5'),
+])
+def test_at_offset(expression, offset, shifted):
+    schedule = parse_cron(expression)
+    assert schedule.at_offset(offset) == shifted
+    assert schedule.minutes_at_offset(offset) == parse_cron(shifted).minutes_of_day()
+
+
+def _searches(count):
+    schedules = {}
+    for i in range(count):
+        schedules['five minute search {0}'.format(i)] = '*/5 * * * *'
+        schedules['hourly search {0}'.format(i)] = '0 * * * *'
+    schedules['daily search'] = '0 3 * * MON-FRI'
+    return schedules
+
+
+def test_stagger_keeps_periods_and_flattens_peak():
+    schedules = _searches(50)
+    staggered = stagger(schedules)
+
+    assert sorted(staggered) == sorted(schedules)
+    for name, expression in staggered.items():
+        before, after = parse_cron(schedules[name]), parse_cron(expression)
+        assert after.regular_period() == before.regular_period()
+        assert after.fields[2:] == before.fields[2:]
+
+    before = launch_histogram(schedules.values())
+    after = launch_histogram(staggered.values())
+    assert sum(after) == sum(before)
+    assert histogram_summary(before)['peak'] == 101
+    # 50 * 288 + 50 * 24 + 1 launches over 1440 minutes, 11 a minute at most
+    assert histogram_summary(after)['peak'] == 11
+
+
+def test_stagger_keeps_hourly_and_daily_searches_in_their_hours():
+    schedules = dict(('search {0}'.format(i), '*/5 * * * *') for i in range(40))
+    schedules.update({
+        'nightly': '0 2 * * *',
+        'weekday report': '0 9 * * 1-5',
+        'every four hours': '30 */4 * * *',
+    })
+    staggered = stagger(schedules)
+    for name in ('nightly', 'weekday report', 'every four hours'):
+        before, after = parse_cron(schedules[name]), parse_cron(staggered[name])
+        assert after.fields[1:] == before.fields[1:]
+        assert after.hours == before.hours
+
+
+def test_stagger_is_deterministic_and_stable():
+    schedules = _searches(20)
+    staggered = stagger(schedules)
+    assert stagger(dict(schedules)) == staggered
+
+    # Adding a search only moves the few searches that have to make room
+    schedules['one more search'] = '*/5 * * * *'
+    moved = [name for name, expression in stagger(schedules).items() if staggered.get(name, expression) != expression]
+    assert len(moved) <= 3
+
+
+def test_stagger_leaves_irregular_and_unreadable_schedules():
+    schedules = {'irregular': '0 9,17 * * *', 'unreadable': 'every five minutes', 'regular': '*/10 * * * *'}
+    assert sorted(stagger(schedules)) == ['regular']
+
+
+@pytest.mark.parametrize('expression, window', [
+    ('*/5 * * * *', 2),
+    ('0 * * * *', 30),
+    ('0 0 * * *', 30),
+    ('0 9,17 * * *', None),
+    ('bogus', None),
+])
+def test_stagger_window(expression, window):
+    assert stagger_window(expression) == window
+
+
+def _scheduled(name, cron_schedule='0 * * * *', run_duration=600, realtime=True, window=0, priority='default'):
+    return dict(name=name, cron_schedule=cron_schedule, run_duration=run_duration, realtime_schedule=realtime,
+                schedule_window=window, schedule_priority=priority)
+
+
+def test_simulate_scheduler_skips_real_time_runs_beyond_limit():
+    searches = [_scheduled('a'), _scheduled('b'), _scheduled('c')]
+    outcome = simulate_scheduler(searches, 2)
+
+    assert outcome['runs'] == 72
+    assert outcome['peak_running'] == 2
+    # The third search due at the top of every hour finds no free slot
+    assert outcome['skipped'] == 24
+    assert outcome['skip_ratio'] == 0.3333
+    assert outcome['searches']['c'] == dict(runs=24, started=0, skipped=24, delayed=0, delay=0.0)
+    assert outcome['utilization'] == round(48 * 600 / (2 * 86400.0), 4)
+
+
+def test_simulate_scheduler_priority():
+    searches = [_scheduled('a'), _scheduled('b'), _scheduled('c', priority='Highest')]
+    outcome = simulate_scheduler(searches, 2)
+    assert outcome['searches']['c']['skipped'] == 0
+    assert outcome['searches']['b']['skipped'] == 24
+
+
+def test_simulate_scheduler_schedule_window_and_continuous():
+    # A window wider than the wait lets the run start late instead
+    outcome = simulate_scheduler([_scheduled('a'), _scheduled('b'), _scheduled('c', window=15)], 2)
+    assert outcome['skipped'] == 0
+    assert outcome['searches']['c']['delayed'] == 24
+
+    # Continuous runs are never skipped, they wait for a slot
+    outcome = simulate_scheduler([_scheduled(name, realtime=False) for name in 'abc'], 2)
+    assert outcome['skipped'] == 0
+    assert outcome['delayed'] == 24
+    assert outcome['delay_mean'] == 200.0
+
+
+def test_simulate_scheduler_run_longer_than_interval():
+    # Every other run finds the previous one still going
+    outcome = simulate_scheduler([_scheduled('slow', cron_schedule='*/5 * * * *', run_duration=400)], 5)
+    assert outcome['runs'] == 288
+    assert outcome['skipped'] == 144
+    assert outcome['peak_running'] == 1
+
+
+def test_simulate_scheduler_staggered_peak():
+    searches = [_scheduled('search {0}'.format(i), cron_schedule='*/5 * * * *', run_duration=30) for i in range(20)]
+    crowded = simulate_scheduler(searches, 4)
+    assert crowded['peak_running'] == 4
+    assert crowded['skipped'] == 16 * 288
+
+    staggered = stagger(dict((search['name'], search['cron_schedule']) for search in searches))
+    for search in searches:
+        search['cron_schedule'] = staggered[search['name']]
+    spread = simulate_scheduler(searches, 4)
+    assert spread['skipped'] == 0
+    assert spread['peak_running'] == 4
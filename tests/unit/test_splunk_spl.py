@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+# (c) 2018, Adam Miller (admiller@redhat.com)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import pytest
+
+from ansible.module_utils.splunk import correlation_search_argspec
+from ansible.module_utils.splunk_spl import (
+    _tstats_candidate, lint_correlation_search, lint_search, split_pipeline, tokenize,
+)
+
+
+def rules(findings):
+    return sorted(finding['rule'] for finding in findings)
+
+
+def test_tokenize():
+    assert tokenize('index=main "a \\"quoted\\" value" `macro(1)` | stats count by host') == [
+        ('word', 'index'), ('op', '='), ('word', 'main'),
+        ('string', 'a \\"quoted\\" value'),
+        ('macro', 'macro(1)'),
+        ('op', '|'), ('word', 'stats'), ('word', 'count'), ('word', 'by'), ('word', 'host'),
+    ]
+
+
+def test_tokenize_operators():
+    assert tokenize('a!=1 b>=2 c<3 [search x]') == [
+        ('word', 'a'), ('op', '!='), ('word', '1'),
+        ('word', 'b'), ('op', '>='), ('word', '2'),
+        ('word', 'c'), ('op', '<'), ('word', '3'),
+        ('op', '['), ('word', 'search'), ('word', 'x'), ('op', ']'),
+    ]
+
+
+def test_split_pipeline_implicit_search():
+    commands, subsearches = split_pipeline(tokenize('index=main | stats count'))
+    assert [command[0][1] for command in commands] == ['search', 'stats']
+    assert subsearches == []
+
+
+def test_split_pipeline_explicit_search_and_generating_command():
+    commands, subsearches = split_pipeline(tokenize('search index=main | head 5'))
+    assert [command[0][1] for command in commands] == ['search', 'head']
+    assert commands[0].count(('word', 'search')) == 1
+
+    commands, subsearches = split_pipeline(tokenize('| tstats count where index=main'))
+    assert [command[0][1] for command in commands] == ['tstats']
+
+
+def test_split_pipeline_subsearches():
+    commands, subsearches = split_pipeline(tokenize('index=a [search index=b [search index=c] | fields host] | stats count'))
+    assert [command[0][1] for command in commands] == ['search', 'stats']
+    assert len(subsearches) == 1
+    inner_commands, inner_subsearches = split_pipeline(subsearches[0])
+    assert [command[0][1] for command in inner_commands] == ['search', 'fields']
+    assert inner_subsearches == [tokenize('search index=c')]
+
+
+@pytest.mark.parametrize('search, candidate', [
+    ('index=main sourcetype=fw | stats count by host', True),
+    ('index=main sourcetype IN (fw, proxy) | stats dc(host) as hosts by sourcetype', True),
+    ('index=main | timechart span=1h count by sourcetype', True),
+    ('index=main action=blocked | stats count by host', False),
+    ('index=main failed | stats count by host', False),
+    ('index=main | stats avg(bytes) by host', False),
+    ('index=main | stats count by user', False),
+    ('index=main | stats count by host | where count > 5', False),
+])
+def test_tstats_candidate(search, candidate):
+    commands, subsearches = split_pipeline(tokenize(search))
+    assert _tstats_candidate(commands) is candidate
+
+
+@pytest.mark.parametrize('search, expected', [
+    ('index=main sourcetype=fw action=blocked | stats count by src', []),
+    ('sourcetype=fw action=blocked', ['no-index']),
+    ('index=* sourcetype=fw action=blocked', ['no-index']),
+    ('`firewall` action=blocked', []),
+    ('eventtype=fw_blocked', []),
+    ('index=main user=*admin', ['leading-wildcard']),
+    ('index=main *admin', ['leading-wildcard']),
+    ('index=main | transaction host', ['transaction']),
+    ('index=main | join host [search index=other | fields host]', ['join']),
+    ('index=main [search sourcetype=x | fields host]', ['no-index']),
+    ('| datamodel Network_Traffic search', ['tstats']),
+    ('index=main sourcetype=fw | stats count by host', ['tstats']),
+])
+def test_lint_pipeline_rules(search, expected):
+    assert rules(lint_search(search, '-10m', 'now', '*/5 * * * *')) == expected
+
+
+@pytest.mark.parametrize('earliest, latest, cron, expected', [
+    ('-10m', 'now', '*/5 * * * *', []),
+    ('-30m@m', 'now', '*/5 * * * *', []),
+    ('-31m', 'now', '*/5 * * * *', ['wide-window']),
+    ('-24h', 'now', '0 * * * *', ['wide-window']),
+    ('-24h', 'now', '0 3 * * *', []),
+    ('-7d', '-6d', '0 3 * * *', []),
+    ('-10m', 'now', '*/5 * * JAN-MAR MON-FRI', []),
+    ('-24h', 'now', '*/5 * * * MON-FRI', ['wide-window']),
+    ('0', 'now', '*/5 * * * *', ['wide-window']),
+    ('', 'now', '*/5 * * * *', ['wide-window']),
+    ('rt-5m', 'rt', '*/5 * * * *', ['realtime']),
+    ('-10m', 'now', 'every five minutes', ['cron']),
+])
+def test_lint_search_window(earliest, latest, cron, expected):
+    assert rules(lint_search('index=main action=blocked', earliest, latest, cron)) == expected
+
+
+def test_lint_search_severities():
+    findings = dict((finding['rule'], finding) for finding in lint_search(
+        'sourcetype=fw | transaction host', '-24h', 'now', '*/5 * * * *'
+    ))
+    assert findings['no-index']['severity'] == 'warning'
+    assert findings['transaction']['severity'] == 'warning'
+    assert findings['wide-window']['severity'] == 'warning'
+    assert '288 times' in findings['wide-window']['msg']
+
+
+def test_lint_correlation_search_defaults():
+    # The module defaults read a day of events every five minutes, which the
+    # wide-window rule reports on purpose
+    params = dict(
+        (key, spec.get('default')) for key, spec in correlation_search_argspec().items()
+    )
+    params.update(name='default search', search='index=main action=blocked')
+    assert (params['time_earliest'], params['time_latest'], params['cron_schedule']) == ('-24h', 'now', '*/5 * * * *')
+    assert rules(lint_correlation_search(params)) == ['wide-window']
+
+    params['time_earliest'] = '-10m'
+    assert rules(lint_correlation_search(params)) == []